@@ -31,8 +31,8 @@ def run_streamlit_app():
     except Exception as e:
         print(f"An error occurred while trying to run the Streamlit app: {e}")
 
-def setup_database():
-    """Runs the database setup script."""
+def setup_database(extra_args=None):
+    """Runs the database setup script. `extra_args` are passed through (e.g. --users 1000)."""
     print("Attempting to run database setup script...")
     db_setup_script_path = os.path.join("src", "scripts", "setup_database.py")
     
@@ -42,7 +42,8 @@ def setup_database():
 
     db_setup_command = [
         sys.executable,
-        db_setup_script_path
+        db_setup_script_path,
+        *(extra_args or []),
     ]
     try:
         print(f"Executing: {' '.join(db_setup_command)}")
@@ -55,6 +56,56 @@ def setup_database():
     except Exception as e:
         print(f"An error occurred during database setup: {e}")
 
+def advise_indexes(extra_args=None):
+    """Runs the index advisor over the query log. `extra_args` are passed through (e.g. --apply)."""
+    print("Attempting to run index advisor...")
+    advisor_script_path = os.path.join("src", "scripts", "advise_indexes.py")
+    advisor_command = [
+        sys.executable,
+        advisor_script_path,
+        *(extra_args or []),
+    ]
+    try:
+        print(f"Executing: {' '.join(advisor_command)}")
+        process = subprocess.Popen(advisor_command, cwd=PROJECT_ROOT)
+        process.wait()
+    except Exception as e:
+        print(f"An error occurred while running the index advisor: {e}")
+
+def run_batch(extra_args=None):
+    """Answers a JSONL file of questions. `extra_args` are passed through (e.g. --input questions.jsonl)."""
+    print("Attempting to run batch questions...")
+    batch_script_path = os.path.join("src", "scripts", "run_batch.py")
+    batch_command = [
+        sys.executable,
+        batch_script_path,
+        *(extra_args or []),
+    ]
+    try:
+        print(f"Executing: {' '.join(batch_command)}")
+        process = subprocess.Popen(batch_command, cwd=PROJECT_ROOT)
+        process.wait()
+    except Exception as e:
+        print(f"An error occurred while running the batch: {e}")
+
+def run_server(extra_args=None):
+    """Starts the HTTP API. `extra_args` are passed through (e.g. --port 8000 --workers 16)."""
+    print("Attempting to launch HTTP server...")
+    server_script_path = os.path.join("src", "server.py")
+    server_command = [
+        sys.executable,
+        server_script_path,
+        *(extra_args or []),
+    ]
+    try:
+        print(f"Executing: {' '.join(server_command)}")
+        process = subprocess.Popen(server_command, cwd=PROJECT_ROOT)
+        process.wait()
+    except KeyboardInterrupt:
+        process.wait()
+    except Exception as e:
+        print(f"An error occurred while running the HTTP server: {e}")
+
 def run_cli_chat():
     """Launches the command-line interface for the chat application."""
     print("Attempting to launch CLI chat app...")
@@ -85,20 +136,33 @@ def main():
     parser = argparse.ArgumentParser(description="text2SQL Project Management CLI.")
     parser.add_argument(
         "action",
-        choices=["run_app", "setup_db", "run_cli"],
+        choices=["run_app", "setup_db", "run_cli", "advise_indexes", "run_batch", "run_server"],
         help="The action to perform: 'run_app' to start the Streamlit UI, "
              "'setup_db' to initialize/reset the database, "
-             "'run_cli' to start the command-line chat interface."
+             "'run_cli' to start the command-line chat interface, "
+             "'advise_indexes' to get index recommendations for the queries run so far, "
+             "'run_batch' to answer a JSONL file of questions (--input questions.jsonl), "
+             "'run_server' to start the HTTP API."
     )
 
-    args = parser.parse_args()
+    # Unrecognized options are forwarded to the action's script, e.g.
+    # `python main.py setup_db --users 1000000 --days 365 --seed 42`.
+    args, extra_args = parser.parse_known_args()
+    if extra_args and args.action not in ("setup_db", "advise_indexes", "run_batch", "run_server"):
+        parser.error(f"unrecognized arguments: {' '.join(extra_args)}")
 
     if args.action == "run_app":
         run_streamlit_app()
     elif args.action == "setup_db":
-        setup_database()
+        setup_database(extra_args)
     elif args.action == "run_cli":
         run_cli_chat()
+    elif args.action == "advise_indexes":
+        advise_indexes(extra_args)
+    elif args.action == "run_batch":
+        run_batch(extra_args)
+    elif args.action == "run_server":
+        run_server(extra_args)
     else:
         print(f"Unknown action: {args.action}")
         parser.print_help()
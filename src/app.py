@@ -5,9 +5,8 @@ sys.path.append("./")
 
 import uuid
 import streamlit as st
-from core.graph import compiled_graph # Your compiled LangGraph
-from core.graph_components import State # Your state definition
-from langchain_core.messages import HumanMessage, AIMessage
+from core.results import QueryResult
+from core.history import ConversationHistory, get_summarizer
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -17,7 +16,8 @@ st.title("text2SQL Wizard 🧙‍♂️")
 if "messages" not in st.session_state:
     st.session_state.messages = []
 if "langgraph_chat_history" not in st.session_state:
-    st.session_state.langgraph_chat_history = []
+    # Bounded history for the prompts: recent turns verbatim, older ones summarized.
+    st.session_state.langgraph_chat_history = ConversationHistory(summarizer=get_summarizer())
 if "conversation_id" not in st.session_state:
     st.session_state.conversation_id = str(uuid.uuid4())
 
@@ -29,6 +29,12 @@ for message in st.session_state.messages:
         if message["role"] == "assistant" and message.get("sql_query"):
             with st.expander("View Generated SQL/Attempt"):
                 st.code(message["sql_query"], language="sql", wrap_lines=True, line_numbers=True)
+        if message["role"] == "assistant" and message.get("query_result"):
+            with st.expander("View Result Table"):
+                st.dataframe(message["query_result"].to_dict())
+        if message["role"] == "assistant" and message.get("trace"):
+            with st.expander("View Timing Breakdown"):
+                st.dataframe(message["trace"])
 
 # Get user input
 if prompt := st.chat_input("Ask a question about your data..."):
@@ -40,24 +46,39 @@ if prompt := st.chat_input("Ask a question about your data..."):
         message_placeholder = st.empty()
         message_placeholder.markdown("Thinking...")
 
+        # Imported on the first question, so the page renders before LangGraph/LangChain load.
+        from core.graph import get_compiled_graph
+        from core.graph_components import new_question_input
+        from core.tracing import tracer
+        compiled_graph = get_compiled_graph()
+
         # Prepare input for the graph
-        graph_input = {
-            "question": prompt,
-            "chat_history": st.session_state.langgraph_chat_history.copy()
-        }
+        graph_input = new_question_input(prompt, st.session_state.langgraph_chat_history.messages())
         config = {"configurable": {"thread_id": st.session_state.conversation_id}}
 
         full_response = ""
         generated_sql_query = ""
+        query_result = None
+        trace_rows = None
         try:
             final_graph_output = None
-            # Stream the graph execution
-            for step in compiled_graph.stream(graph_input, config=config, stream_mode="values"):
-                final_graph_output = step
+            streamed_answer = ""
+            # Stream the graph execution: state snapshots, plus the answer's tokens as the LLM writes them
+            for mode, step in compiled_graph.stream(graph_input, config=config, stream_mode=["values", "messages"]):
+                if mode == "values":
+                    final_graph_output = step
+                    continue
+                message_chunk, metadata = step
+                if metadata.get("langgraph_node") == "generate_answer" and isinstance(message_chunk.content, str):
+                    streamed_answer += message_chunk.content
+                    message_placeholder.markdown(streamed_answer + "▌")
             # Refined streaming to capture final answer:
             if final_graph_output:
                 full_response = final_graph_output.get("answer", "Sorry, I couldn't formulate a final answer.")
                 generated_sql_query = final_graph_output.get("query", "No SQL query information available.")
+                # The structured result lets us show a real table without re-running SQL.
+                if isinstance(final_graph_output.get("result"), QueryResult):
+                    query_result = final_graph_output["result"]
             else:
                 full_response = "Sorry, there was an issue processing your request."
                 generated_sql_query = "No graph output received."
@@ -68,6 +89,27 @@ if prompt := st.chat_input("Ask a question about your data..."):
             if generated_sql_query:
                 with st.expander("View Generated SQL/Attempt"):
                     st.code(generated_sql_query, language="sql", wrap_lines=True, line_numbers=True, )
+            if query_result is not None and query_result.row_count:
+                with st.expander("View Result Table"):
+                    st.dataframe(query_result.to_dict())
+                    if query_result.truncated:
+                        st.caption(f"Showing the first {query_result.row_count} rows.")
+            trace = tracer.last_trace(st.session_state.conversation_id)
+            if trace is not None:
+                trace_rows = [
+                    {
+                        "node": span.node,
+                        "ms": round(span.duration_ms, 1),
+                        "prompt tokens": span.prompt_tokens,
+                        "completion tokens": span.completion_tokens,
+                        "retry": span.retry_count,
+                        "rows": span.result_rows,
+                    }
+                    for span in trace.spans
+                ]
+                with st.expander("View Timing Breakdown"):
+                    st.dataframe(trace_rows)
+                    st.caption(f"Total: {trace.total_ms:.0f} ms")
 
         except Exception as e:
             full_response = f"An error occurred: {str(e)}"
@@ -82,8 +124,9 @@ if prompt := st.chat_input("Ask a question about your data..."):
         st.session_state.messages.append({
             "role": "assistant",
             "content": full_response,
-            "sql_query": generated_sql_query
+            "sql_query": generated_sql_query,
+            "query_result": query_result if query_result is not None and query_result.row_count else None,
+            "trace": trace_rows,
         })
 
-        st.session_state.langgraph_chat_history.append(HumanMessage(content=prompt))
-        st.session_state.langgraph_chat_history.append(AIMessage(content=full_response))
+        st.session_state.langgraph_chat_history.add_turn(prompt, full_response)
@@ -0,0 +1,101 @@
+import re
+from typing import Any, Collection, List, Optional
+
+from .results import QueryResult
+
+# Result shapes that can be answered locally, without an LLM call.
+EMPTY_RESULT = "empty"
+SCALAR_RESULT = "scalar"
+SINGLE_ROW_RESULT = "single_row"
+SHORT_LIST_RESULT = "short_list"
+ALL_SHAPES = (EMPTY_RESULT, SCALAR_RESULT, SINGLE_ROW_RESULT, SHORT_LIST_RESULT)
+
+_AGGREGATE_RE = re.compile(r"^\s*(?P<func>\w+)\s*\(\s*(?P<arg>.*?)\s*\)\s*$", re.DOTALL)
+_AGGREGATE_LABELS = {
+    "sum": "total",
+    "count": "number of",
+    "avg": "average",
+    "min": "minimum",
+    "max": "maximum",
+}
+
+
+def column_label(column: str) -> str:
+    """Readable name for a result column: `SUM(t.total_revenue)` -> "total revenue"."""
+    match = _AGGREGATE_RE.match(column)
+    if match is None:
+        return column.rsplit(".", 1)[-1].replace("_", " ").strip()
+    func, arg = match.group("func").lower(), match.group("arg")
+    if arg == "*":
+        return "count"
+    inner = column_label(arg.removeprefix("DISTINCT ").removeprefix("distinct "))
+    prefix = _AGGREGATE_LABELS.get(func)
+    if prefix is None or inner.startswith(prefix):
+        return inner
+    return f"{prefix} {inner}"
+
+
+def format_value(value: Any) -> str:
+    if value is None:
+        return "n/a"
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, int):
+        return f"{value:,}"
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e15:
+            return f"{value:,.0f}"
+        return f"{value:,.2f}" if abs(value) >= 1 else f"{value:.4g}"
+    return str(value)
+
+
+def result_shape(result: QueryResult, max_rows: int, max_columns: int) -> Optional[str]:
+    """The template shape of a result, or None when it should go to the LLM."""
+    if result.truncated:
+        return None
+    rows = list(result.rows())
+    # Aggregates over no rows return a single all-NULL row.
+    if not rows or (len(rows) == 1 and all(v is None for v in rows[0])):
+        return EMPTY_RESULT
+    if len(result.columns) > max_columns:
+        return None
+    if len(rows) == 1:
+        return SCALAR_RESULT if len(result.columns) == 1 else SINGLE_ROW_RESULT
+    if len(rows) <= max_rows:
+        return SHORT_LIST_RESULT
+    return None
+
+
+def _markdown_table(labels: List[str], rows: List[tuple]) -> str:
+    lines = ["| " + " | ".join(labels) + " |", "|" + "---|" * len(labels)]
+    lines += ["| " + " | ".join(format_value(v) for v in row) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+def render_template_answer(
+    result: QueryResult,
+    shapes: Collection[str] = ALL_SHAPES,
+    max_rows: int = 10,
+    max_columns: int = 4,
+) -> Optional[str]:
+    """
+    Answers simple results (empty, one value, one row, a few short rows) from templates.
+    Returns None when the result's shape is not in `shapes`, so the LLM writes the answer.
+    """
+    shape = result_shape(result, max_rows, max_columns)
+    if shape is None or shape not in shapes:
+        return None
+    labels = [column_label(c) for c in result.columns]
+    rows = list(result.rows())
+
+    if shape == EMPTY_RESULT:
+        return "No data was found matching your question."
+    if shape == SCALAR_RESULT:
+        return f"The {labels[0]} is {format_value(rows[0][0])}."
+    if shape == SINGLE_ROW_RESULT:
+        return "Here is the result:\n" + "\n".join(
+            f"- **{label}**: {format_value(value)}" for label, value in zip(labels, rows[0])
+        )
+    if len(labels) == 1:
+        return f"Found {len(rows)} results:\n" + "\n".join(f"- {format_value(row[0])}" for row in rows)
+    return f"Found {len(rows)} results:\n\n" + _markdown_table(labels, rows)
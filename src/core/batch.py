@@ -0,0 +1,183 @@
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .cache import normalize_question
+from .config import BATCH_CONCURRENCY, BATCH_QUESTION_TIMEOUT_SECONDS
+from .results import QueryResult
+
+
+# --- Batch Input ---
+@dataclass
+class BatchItem:
+    """One line of the input file. `id` defaults to the 1-based line number."""
+    id: Any
+    question: str
+
+
+def load_questions(lines: Iterable[str]) -> List[BatchItem]:
+    """
+    Parses JSONL questions: each line is an object with a "question" (and optional "id")
+    or a bare JSON string. Blank lines are skipped.
+    """
+    items = []
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {line_number}: invalid JSON ({e.msg}).") from e
+        if isinstance(record, str):
+            record = {"question": record}
+        if not isinstance(record, dict) or not str(record.get("question") or "").strip():
+            raise ValueError(f"Line {line_number}: expected a \"question\".")
+        items.append(BatchItem(id=record.get("id", line_number), question=record["question"]))
+    return items
+
+
+# --- Batch Report ---
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+@dataclass
+class BatchReport:
+    questions: int = 0
+    unique: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    elapsed_s: float = 0.0
+    latencies_ms: List[float] = field(default_factory=list)  # per unique question
+
+    @property
+    def throughput(self) -> float:
+        """Questions answered per second, duplicates included."""
+        return self.questions / self.elapsed_s if self.elapsed_s else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "questions": self.questions,
+            "unique": self.unique,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "questions_per_s": round(self.throughput, 2),
+            "p50_ms": round(_percentile(self.latencies_ms, 50), 1),
+            "p95_ms": round(_percentile(self.latencies_ms, 95), 1),
+        }
+
+
+def format_report(report: BatchReport) -> str:
+    summary = report.to_dict()
+    return (
+        f"Questions: {summary['questions']} ({summary['unique']} unique), "
+        f"errors: {summary['errors']}, timeouts: {summary['timeouts']}\n"
+        f"Elapsed: {summary['elapsed_s']:.2f}s, throughput: {summary['questions_per_s']:.1f} questions/s, "
+        f"latency p50 {summary['p50_ms']:.0f} ms / p95 {summary['p95_ms']:.0f} ms"
+    )
+
+
+# --- Batch Runner ---
+def _default_input(question: str) -> Dict[str, Any]:
+    from .graph_components import new_question_input
+
+    return new_question_input(question, [])
+
+
+class BatchRunner:
+    """
+    Answers a batch of questions with the async graph. Identical questions (after
+    `normalize_question`) run once; at most `concurrency` questions are in flight.
+    The graph nodes share the module-level schema, question->SQL and result caches,
+    so similar questions in a batch also reuse each other's work.
+    """
+
+    def __init__(
+        self,
+        graph,
+        concurrency: int = BATCH_CONCURRENCY,
+        timeout: Optional[float] = BATCH_QUESTION_TIMEOUT_SECONDS,
+        make_input: Callable[[str], Dict[str, Any]] = _default_input,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self._graph = graph
+        self._concurrency = concurrency
+        self._timeout = timeout
+        self._make_input = make_input
+
+    async def _answer(self, semaphore: asyncio.Semaphore, question: str) -> Dict[str, Any]:
+        async with semaphore:
+            # Batch questions are one-off conversations; their checkpoints are dropped afterwards.
+            thread_id = f"batch-{uuid.uuid4()}"
+            config = {"configurable": {"thread_id": thread_id}}
+            start = time.perf_counter()
+            try:
+                state = await asyncio.wait_for(
+                    self._graph.ainvoke(self._make_input(question), config=config), self._timeout
+                )
+                outcome = record_from_state(state)
+            except asyncio.TimeoutError:
+                error = f"No answer within {self._timeout:g}s."
+                outcome = {"status": "timeout", "error": error, "error_kind": "timeout"}
+            except Exception as e:
+                outcome = {"status": "error", "error": f"{type(e).__name__}: {e}", "error_kind": "exception"}
+            outcome["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+            checkpointer = getattr(self._graph, "checkpointer", None)
+            if checkpointer is not None:
+                checkpointer.delete_thread(thread_id)
+            return outcome
+
+    async def run(self, items: List[BatchItem], on_result: Callable[[Dict[str, Any]], None]) -> BatchReport:
+        """
+        Answers `items`, calling `on_result` with one record per item as soon as its
+        answer is ready (completion order, not input order).
+        """
+        groups: Dict[str, List[BatchItem]] = {}
+        for item in items:
+            groups.setdefault(normalize_question(item.question), []).append(item)
+
+        report = BatchReport(questions=len(items), unique=len(groups))
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def answer_group(group: List[BatchItem]) -> None:
+            outcome = await self._answer(semaphore, group[0].question)
+            report.latencies_ms.append(outcome["latency_ms"])
+            report.errors += len(group) * (outcome["status"] == "error")
+            report.timeouts += len(group) * (outcome["status"] == "timeout")
+            for item in group:
+                duplicate_of = None if item is group[0] else group[0].id
+                on_result({"id": item.id, "question": item.question, **outcome, "duplicate_of": duplicate_of})
+
+        start = time.perf_counter()
+        await asyncio.gather(*(answer_group(group) for group in groups.values()))
+        report.elapsed_s = time.perf_counter() - start
+        return report
+
+
+def record_from_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """The answer, SQL and status of a finished question, as written to the output."""
+    result = state.get("result")
+    record = {
+        "status": "ok",
+        "answer": state.get("answer"),
+        "sql": state.get("query"),
+        "rows": result.row_count if isinstance(result, QueryResult) else None,
+        "error": None,
+        "error_kind": None,
+    }
+    if state.get("clarification_needed"):
+        record["status"] = "clarification"
+    elif state.get("error_message"):
+        record["status"] = "error"
+        record["error"] = state["error_message"]
+        record["error_kind"] = state.get("error_kind")
+    return record
@@ -0,0 +1,372 @@
+import hashlib
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from .database import get_db_file_identity
+from .sql_utils import canonicalize_sql
+
+if TYPE_CHECKING:
+    from langchain_community.utilities import SQLDatabase
+
+
+# --- Schema Snapshot Cache ---
+@dataclass(frozen=True)
+class SchemaSnapshot:
+    """The schema as of one database file identity, as handed to a graph node."""
+
+    table_info: str
+    table_columns: Dict[str, List[str]]
+    dialect: str
+    fingerprint: str
+
+
+class SchemaCache:
+    """
+    Caches the rendered `get_table_info()` output of a SQLDatabase.
+
+    The snapshot is keyed on the database file's identity (path, mtime, schema_version),
+    so it is rebuilt only when the file changes. When the schema itself changes, the
+    SQLDatabase is re-created through `db_factory` so its reflected metadata is fresh.
+    With `db=None` the first SQLDatabase also comes from `db_factory`, on first use.
+
+    Every lookup checks the file identity (a stat and a PRAGMA read) and counts as one
+    hit, so a node that needs several parts of the schema takes one `snapshot()`.
+    """
+
+    def __init__(
+        self,
+        db: "SQLDatabase | None",
+        db_path: str,
+        db_factory: "Callable[[], SQLDatabase] | None" = None,
+    ):
+        self._db = db
+        self._db_path = db_path
+        self._db_factory = db_factory
+        self._lock = threading.Lock()
+        self._identity: tuple | None = None
+        self._snapshot: SchemaSnapshot | None = None
+        self._table_infos: Dict[str, str] | None = None
+        self.hits = 0
+        self.rebuilds = 0
+
+    def _compute_fingerprint(self) -> str:
+        """Hashes the DDL in sqlite_master; stable across data-only changes."""
+        conn = sqlite3.connect(f"file:{self._db_path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                "SELECT type, name, sql FROM sqlite_master ORDER BY type, name"
+            ).fetchall()
+        finally:
+            conn.close()
+        return hashlib.sha256(repr(rows).encode("utf-8")).hexdigest()[:16]
+
+    def _read_table_columns(self) -> Dict[str, List[str]]:
+        """
+        Table (and view) name -> column names, lower-cased, for every table in the file,
+        including ones hidden from the LLM.
+        """
+        conn = sqlite3.connect(f"file:{self._db_path}?mode=ro", uri=True)
+        try:
+            names = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') "
+                    "AND name NOT LIKE 'sqlite_%'"
+                )
+            ]
+            return {
+                name.lower(): [
+                    row[1].lower()
+                    for row in conn.execute(f'PRAGMA table_info("{name}")')
+                ]
+                for name in names
+            }
+        finally:
+            conn.close()
+
+    def _refresh(self) -> SchemaSnapshot:
+        identity = get_db_file_identity(self._db_path)
+        if identity == self._identity:
+            self.hits += 1
+            return self._snapshot
+
+        schema_changed = (
+            self._identity is not None and identity[2] != self._identity[2]
+        )
+        if self._db is None:
+            self._db = self._db_factory()
+        elif schema_changed and self._db_factory is not None:
+            print("Schema version changed. Re-reflecting database metadata.")
+            self._db = self._db_factory()
+
+        self._snapshot = SchemaSnapshot(
+            table_info=self._db.get_table_info(),
+            table_columns=self._read_table_columns(),
+            dialect=self._db.dialect,
+            fingerprint=self._compute_fingerprint(),
+        )
+        self._table_infos = None
+        self._identity = identity
+        self.rebuilds += 1
+        print(f"Schema cache rebuilt (hits={self.hits}, rebuilds={self.rebuilds}).")
+        return self._snapshot
+
+    def snapshot(self) -> SchemaSnapshot:
+        """The current schema, rebuilt if the database file changed."""
+        with self._lock:
+            return self._refresh()
+
+    def get_table_info(self) -> str:
+        """Returns the cached table info, rebuilding it if the database file changed."""
+        return self.snapshot().table_info
+
+    def get_table_infos(self) -> Dict[str, str]:
+        """
+        Table name -> that table's info, in the same format as `get_table_info()`, for
+        rendering a subset of the schema. Built on first use after each rebuild.
+        """
+        with self._lock:
+            self._refresh()
+            if self._table_infos is None:
+                self._table_infos = {
+                    table: self._db.get_table_info([table])
+                    for table in self._db.get_usable_table_names()
+                }
+            return self._table_infos
+
+    def get_table_columns(self) -> Dict[str, List[str]]:
+        """
+        Table (and view) name -> column names, lower-cased, for every table in the file,
+        including ones hidden from the LLM. Read with PRAGMA table_info after each rebuild.
+        """
+        return self.snapshot().table_columns
+
+    @property
+    def dialect(self) -> str:
+        return self.snapshot().dialect
+
+    @property
+    def fingerprint(self) -> str:
+        """Short hash identifying the current schema (ignores data changes)."""
+        return self.snapshot().fingerprint
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "rebuilds": self.rebuilds}
+
+
+# --- Question -> SQL Cache ---
+# Words that point back at earlier turns ("what about *those* users?").
+_CONTEXT_MARKERS = re.compile(
+    r"\b(it|its|they|them|their|these|those|that|this|he|she|his|her|same|"
+    r"previous|above|earlier|again|also|instead|else|what about|how about)\b"
+)
+
+
+def normalize_question(question: str) -> str:
+    """Lower-cases, drops punctuation and collapses whitespace."""
+    text = re.sub(r"[^\w\s'-]", " ", question.lower())
+    return " ".join(text.split())
+
+
+def is_context_dependent(question: str, chat_history: List) -> bool:
+    """
+    A question is treated as context-dependent when there is prior conversation and it
+    either refers back to it or is too short to stand on its own.
+    """
+    if not chat_history:
+        return False
+    normalized = normalize_question(question)
+    return bool(_CONTEXT_MARKERS.search(normalized)) or len(normalized.split()) <= 3
+
+
+def make_query_cache_key(question: str, current_date: str, schema_fingerprint: str) -> str:
+    raw = f"{normalize_question(question)}|{current_date}|{schema_fingerprint}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class QueryCache:
+    """
+    LRU + TTL cache mapping a question key to previously generated SQL.
+
+    Entries live in memory; when `persist_path` is given they are also written to a
+    small SQLite store so the cache survives restarts.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 24 * 3600,
+        persist_path: Optional[str] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._store: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        if persist_path:
+            self._store = sqlite3.connect(persist_path, check_same_thread=False)
+            self._store.execute(
+                "CREATE TABLE IF NOT EXISTS query_cache ("
+                "key TEXT PRIMARY KEY, query TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._store.commit()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return now - created_at > self.ttl_seconds
+
+    def _load_from_store(self, key: str, now: float) -> Optional[tuple[str, float]]:
+        row = self._store.execute(
+            "SELECT query, created_at FROM query_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if self._expired(row[1], now):
+            self._store.execute("DELETE FROM query_cache WHERE key = ?", (key,))
+            self._store.commit()
+            return None
+        self._store.execute(
+            "UPDATE query_cache SET last_used = ? WHERE key = ?", (now, key)
+        )
+        self._store.commit()
+        return row[0], row[1]
+
+    def _insert_in_memory(self, key: str, entry: tuple[str, float]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[1], now):
+                del self._entries[key]
+                entry = None
+            if entry is None and self._store is not None:
+                entry = self._load_from_store(key, now)
+                if entry is not None:
+                    self._insert_in_memory(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, query: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._insert_in_memory(key, (query, now))
+            if self._store is not None:
+                self._store.execute(
+                    "INSERT OR REPLACE INTO query_cache (key, query, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, query, now, now),
+                )
+                # Keep the persistent store bounded as well, dropping least recently used rows.
+                self._store.execute(
+                    "DELETE FROM query_cache WHERE key NOT IN ("
+                    "SELECT key FROM query_cache ORDER BY last_used DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+                self._store.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._store is not None:
+                self._store.execute("DELETE FROM query_cache")
+                self._store.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+# --- Result-Set Cache ---
+def estimate_result_size(value: Any) -> int:
+    """Approximate in-memory size of a cached result, in bytes."""
+    if isinstance(value, str):
+        return sys.getsizeof(value)
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """
+    Bounded cache of query results keyed on (canonical SQL, data version token).
+
+    Eviction is LRU by total estimated size rather than entry count, so a few large
+    result sets cannot push memory use past `max_bytes`. Results larger than
+    `max_entry_bytes` are never cached.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entry_bytes: int = 8 * 1024 * 1024,
+        sizeof: Callable[[Any], int] = estimate_result_size,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._sizeof = sizeof
+        self._entries: "OrderedDict[tuple, tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(sql: str, data_version_token: tuple) -> tuple:
+        return (canonicalize_sql(sql), data_version_token)
+
+    def get(self, key: tuple) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: tuple, value: Any) -> None:
+        size = self._sizeof(value)
+        if size > self.max_entry_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+        }
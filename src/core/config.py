@@ -1,2 +1,174 @@
+import os
+
 DEFAULT_TOP_K_RESULTS = 10
-DEFAULT_MAX_RETRIES_FOR_QUERY_EXECUTION = 3
\ No newline at end of file
+DEFAULT_MAX_RETRIES_FOR_QUERY_EXECUTION = 3
+# Upper bound on SQL queries running at once for the async pipeline.
+DEFAULT_SQL_EXECUTOR_WORKERS = 8
+
+# --- Result size caps ---
+# Hard caps on what a single query may pull into memory (and into the answer prompt),
+# even if the LLM ignores the LIMIT {top_k} instruction. Rows beyond the cap are not read.
+DEFAULT_MAX_RESULT_ROWS = DEFAULT_TOP_K_RESULTS * 50
+DEFAULT_MAX_RESULT_BYTES = 1024 * 1024
+DEFAULT_RESULT_FETCH_BATCH_SIZE = 100
+
+# --- Query budgets ---
+# Enforced through sqlite3's progress handler; a query over budget is interrupted
+# and reported back to the retry loop as a structured error.
+DEFAULT_QUERY_TIMEOUT_SECONDS = 10.0
+DEFAULT_QUERY_MAX_VM_INSTRUCTIONS = 2_000_000_000
+# How many SQLite VM instructions run between progress handler calls.
+QUERY_PROGRESS_HANDLER_INTERVAL = 10_000
+
+# --- Question -> SQL cache ---
+QUERY_CACHE_MAX_ENTRIES = 512
+QUERY_CACHE_TTL_SECONDS = 24 * 3600
+# Path to a SQLite file for a cache that survives restarts; None keeps it in memory only.
+QUERY_CACHE_PERSIST_PATH = None
+
+# --- Result-set cache ---
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Results bigger than this are never cached.
+RESULT_CACHE_MAX_ENTRY_BYTES = 8 * 1024 * 1024
+
+# --- Read-only execution pool ---
+# Generated queries run on a pool of read-only connections, one checked out per query,
+# so concurrent conversations don't serialize on a single connection.
+SQLITE_POOL_SIZE = DEFAULT_SQL_EXECUTOR_WORKERS
+SQLITE_POOL_CHECKOUT_TIMEOUT_SECONDS = 30.0
+# Applied to every pooled connection. cache_size < 0 is in KiB.
+SQLITE_EXECUTION_PRAGMAS = {
+    "cache_size": -64 * 1024,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+# --- Large database (mmap) mode ---
+# For multi-GB databases: execution connections map the file into memory and share
+# one page cache, and the hot tables are pre-read at startup. Enable with DB_MMAP_MODE=1.
+DB_MMAP_MODE = os.environ.get("DB_MMAP_MODE", "").lower() in ("1", "true", "yes")
+# Overrides SQLITE_EXECUTION_PRAGMAS in mmap mode. SQLite silently caps mmap_size at its
+# compile-time SQLITE_MAX_MMAP_SIZE (often 2 GiB).
+SQLITE_MMAP_MODE_PRAGMAS = {
+    "mmap_size": 64 * 1024 * 1024 * 1024,
+    "cache_size": -512 * 1024,
+}
+DB_WARMUP_TABLES = ["user_activity", "user_game_summary"]
+
+# --- Schema pruning ---
+# Only the tables/columns relevant to the question (BM25 over names and descriptions in
+# core/schema_pruning.py) go into the query-generation prompt; retries get the full schema.
+SCHEMA_PRUNING_ENABLED = True
+# Tables scoring below this share of the best-matching table are left out.
+SCHEMA_PRUNING_MIN_SCORE_RATIO = 0.3
+# Earlier user messages included when matching, so follow-ups keep their tables.
+SCHEMA_PRUNING_HISTORY_TURNS = 2
+
+# --- Rollup routing ---
+# Aggregate queries over the base tables are rewritten to read the daily rollup tables
+# (built by src/scripts/refresh_rollups.py) when the rewrite is equivalent and fresh.
+ROLLUP_ROUTING_ENABLED = True
+
+# --- SQL validation ---
+# Generated SQL is checked before it runs (core/sql_validation.py): a single read-only
+# SELECT, known tables and columns, and an EXPLAIN QUERY PLAN cost estimate. Rejected
+# queries go back to write_query with the error, without touching the data.
+SQL_VALIDATION_ENABLED = True
+# Nested full table scans over more row combinations than this are rejected as cross joins.
+SQL_VALIDATION_MAX_CROSS_JOIN_ROWS = 1_000_000
+# Queries estimated to visit more rows than this are rejected (None: no limit).
+SQL_VALIDATION_MAX_ESTIMATED_ROWS = None
+
+# --- Speculative retries ---
+# When a query fails, the serial loop asks write_query for one fix at a time. With
+# SPECULATIVE_RETRY_MODE set, the retry asks for SPECULATIVE_RETRY_CANDIDATES fixes at
+# once ("fan_out": one LLM call each, in parallel; "multi": one call returning all of
+# them), validates and runs them concurrently and keeps the first that succeeds.
+SPECULATIVE_RETRY_MODE = os.environ.get("SPECULATIVE_RETRY_MODE", "off")
+SPECULATIVE_RETRY_CANDIDATES = int(os.environ.get("SPECULATIVE_RETRY_CANDIDATES", "3"))
+
+# --- Query log / index advisor ---
+# Every executed query is recorded here (count and latency) for the index advisor
+# (`python main.py advise_indexes`). Set QUERY_LOG_PATH="" to disable recording.
+QUERY_LOG_PATH = os.environ.get(
+    "QUERY_LOG_PATH",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        "data",
+        "query_log.db",
+    ),
+)
+# Recommend an index only if it removes at least this share of the affected latency.
+INDEX_ADVISOR_MIN_SAVED_FRACTION = 0.2
+
+# --- Tracing ---
+# Each question gets a per-node trace (wall time, LLM tokens, retries, result size),
+# shown by the CLI and the Streamlit app. When TRACE_EXPORT_PATH is set, finished
+# traces are also appended to that file as JSON lines.
+TRACING_ENABLED = True
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH") or None
+
+# --- Answer templates ---
+# Simple results are answered from the templates in core/answer_templates.py instead of
+# a second LLM call. ANSWER_TEMPLATE_SHAPES lists the shapes answered locally
+# (comma-separated: empty, scalar, single_row, short_list); set it to "" to always use the LLM.
+# short_list is off by default: a bare table loses the summary the LLM writes for lists.
+ANSWER_TEMPLATE_SHAPES = tuple(
+    shape.strip()
+    for shape in os.environ.get("ANSWER_TEMPLATE_SHAPES", "empty,scalar,single_row").split(",")
+    if shape.strip()
+)
+# Larger results (or any truncated result) always go to the LLM.
+ANSWER_TEMPLATE_MAX_ROWS = 10
+ANSWER_TEMPLATE_MAX_COLUMNS = 4
+
+# --- Chat history window ---
+# The front ends keep the last HISTORY_MAX_VERBATIM_TURNS question/answer turns verbatim
+# and fold older ones into a rolling summary (core/history.py), so the history in the
+# prompts stays within HISTORY_TOKEN_BUDGET (estimated at ~4 characters per token).
+HISTORY_MAX_VERBATIM_TURNS = 4
+HISTORY_TOKEN_BUDGET = 1500
+HISTORY_SUMMARY_TOKEN_BUDGET = 300
+# "extractive" (one line per folded turn, no LLM call) or "llm" (the LLM rewrites the summary).
+HISTORY_SUMMARIZER = os.environ.get("HISTORY_SUMMARIZER", "extractive")
+
+# --- Checkpointer ---
+# Conversation state is checkpointed to SQLite (core/checkpoint.py) so it survives
+# restarts and doesn't accumulate in memory. CHECKPOINTER=memory uses LangGraph's
+# InMemorySaver instead.
+CHECKPOINTER = os.environ.get("CHECKPOINTER", "sqlite")
+CHECKPOINT_DB_PATH = os.environ.get(
+    "CHECKPOINT_DB_PATH",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        "data",
+        "checkpoints.db",
+    ),
+)
+# Checkpoints kept per conversation; a new question only needs the latest one.
+CHECKPOINT_KEEP_LAST = 4
+# Conversations idle for longer than this are deleted (None keeps them forever).
+CHECKPOINT_TTL_SECONDS = 7 * 24 * 3600
+CHECKPOINT_PRUNE_INTERVAL_SECONDS = 600
+# Serialized checkpoints at least this large are zlib-compressed.
+CHECKPOINT_COMPRESS_MIN_BYTES = 256
+
+# --- Batch questions ---
+# `python main.py run_batch` answers at most BATCH_CONCURRENCY questions at once;
+# a question without an answer after BATCH_QUESTION_TIMEOUT_SECONDS is reported as a timeout.
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+BATCH_QUESTION_TIMEOUT_SECONDS = 120.0
+
+# --- HTTP server ---
+# `python main.py run_server` answers at most SERVER_WORKERS questions at once on one
+# event loop; up to SERVER_MAX_QUEUE more wait for a slot and the rest get 503. A request
+# (queueing included) without an answer after SERVER_REQUEST_TIMEOUT_SECONDS gets 504.
+SERVER_HOST = os.environ.get("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.environ.get("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", "16"))
+SERVER_MAX_QUEUE = int(os.environ.get("SERVER_MAX_QUEUE", "64"))
+SERVER_REQUEST_TIMEOUT_SECONDS = 60.0
+# Conversation histories kept in memory (least recently used are dropped; a dropped
+# conversation continues from its last checkpointed turn).
+SERVER_MAX_CONVERSATIONS = 1000
+SERVER_MAX_BODY_BYTES = 64 * 1024
@@ -1,5 +1,24 @@
 import os
-from langchain_community.utilities import SQLDatabase
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+from .config import (
+    SQLITE_POOL_SIZE,
+    SQLITE_POOL_CHECKOUT_TIMEOUT_SECONDS,
+    SQLITE_EXECUTION_PRAGMAS,
+    DB_MMAP_MODE,
+    SQLITE_MMAP_MODE_PRAGMAS,
+    DB_WARMUP_TABLES,
+)
+from .rollups import ROLLUP_TABLE_NAMES
+
+if TYPE_CHECKING:
+    from langchain_community.utilities import SQLDatabase
 
 # --- Database Path Configuration ---
 # This logic should be consistent with the setup_database.py script
@@ -15,28 +34,283 @@ DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 DB_PATH = os.path.join(DATA_DIR, DB_FILE_NAME)
 
 
-def get_sqlite_uri() -> str:
-    """
-    Constructs the SQLite URI for SQLAlchemy.
-    Ensures the database file exists.
-    """
-    if not os.path.exists(DB_PATH):
+def ensure_database_exists(db_path: str = DB_PATH) -> None:
+    if not os.path.exists(db_path):
         # Suggest running the setup script if the DB doesn't exist.
         # In a real app, you might have more robust error handling or setup triggers.
         error_message = (
-            f"Database file not found at {DB_PATH}. "
+            f"Database file not found at {db_path}. "
             f"Please run the database setup script (e.g., python src/scripts/setup_database.py) "
             "to create and populate the database."
         )
         raise FileNotFoundError(error_message)
+
+
+def get_sqlite_uri() -> str:
+    """
+    Constructs the SQLite URI for SQLAlchemy.
+    Ensures the database file exists.
+    """
+    ensure_database_exists(DB_PATH)
     return f"sqlite:///{DB_PATH}"
 
 
-def get_db_instance() -> SQLDatabase:
+def get_schema_version(db_path: str = DB_PATH) -> int:
+    """
+    Reads SQLite's `PRAGMA schema_version`, which is bumped on every schema change.
+    Opens a short-lived read-only connection so it is safe to call from any thread.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA schema_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def get_db_file_identity(db_path: str = DB_PATH) -> tuple:
+    """
+    Returns (path, mtime_ns, schema_version) for the database file.
+    Any change to the file or its schema produces a different identity.
+    """
+    stat = os.stat(db_path)
+    return (db_path, stat.st_mtime_ns, get_schema_version(db_path))
+
+
+class DataVersionProbe:
+    """
+    Reports a token that changes whenever the database contents change.
+
+    `PRAGMA data_version` only moves when *other* connections commit, so it has to be
+    read from the same long-lived connection every time. It is combined with the file's
+    mtime and size, which also catches writes that replace the file outright.
+    In WAL mode commits land in the -wal file and may not touch the main file's mtime,
+    which is why the pragma is needed. The connection is opened on the first `token()`.
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        self._db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def token(self) -> tuple:
+        with self._lock:
+            if self._conn is None:
+                ensure_database_exists(self._db_path)
+                self._conn = sqlite3.connect(
+                    f"file:{self._db_path}?mode=ro", uri=True, check_same_thread=False
+                )
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        stat = os.stat(self._db_path)
+        return (stat.st_mtime_ns, stat.st_size, data_version)
+
+
+class ReadOnlyConnectionPool:
+    """
+    Fixed-size pool of read-only sqlite3 connections for executing generated queries.
+
+    Connections are opened with `mode=ro`, `PRAGMA query_only` and the configured
+    pragmas (cache_size, mmap_size, temp_store). They run in autocommit mode, so no read
+    transaction outlives a query and WAL checkpoints are never held back. Each
+    checkout gets a connection to itself. When all are busy the caller waits, and
+    wait times are recorded in `stats()`.
+
+    With `shared_cache=True` the connections share one page cache (`cache=shared`), so
+    pages read by one query, or by `warm_up`, are reused by every other connection.
+    """
+
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        size: int = SQLITE_POOL_SIZE,
+        pragmas: Optional[Dict[str, object]] = None,
+        checkout_timeout: float = SQLITE_POOL_CHECKOUT_TIMEOUT_SECONDS,
+        shared_cache: bool = False,
+    ):
+        self.db_path = db_path
+        self.size = size
+        self.pragmas = SQLITE_EXECUTION_PRAGMAS if pragmas is None else pragmas
+        self.shared_cache = shared_cache
+        self.checkout_timeout = checkout_timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = f"file:{self.db_path}?mode=ro"
+        if self.shared_cache:
+            uri += "&cache=shared"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            check_same_thread=False,  # Connections move between executor threads
+            isolation_level=None,
+        )
+        conn.execute("PRAGMA query_only = ON")
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.checkout_timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"No database connection became available within {self.checkout_timeout}s "
+                f"(pool size {self.size})."
+            ) from None
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Checks out a connection for the duration of the `with` block."""
+        start = time.perf_counter()
+        conn = self._acquire()
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        if waited >= 0.01:
+            print(f"Waited {waited * 1000:.1f} ms for a database connection.")
+        try:
+            yield conn
+        finally:
+            conn.set_progress_handler(None, 0)
+            self._idle.put(conn)
+
+    def warm_up(self, tables: List[str]) -> Dict[str, float]:
+        """
+        Pre-reads every page of the given tables and of their primary-key index (if the
+        key is not the rowid) so later aggregate queries hit memory instead of disk.
+        Returns seconds spent per table.
+        """
+        timings = {}
+        with self.connection() as conn:
+            for table in tables:
+                start = time.perf_counter()
+                columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+                if not columns:
+                    continue
+                # INDEXED BY makes COUNT(*) walk the primary-key index itself rather than
+                # whichever index is smallest.
+                for _, index, _, origin, _ in conn.execute(f'PRAGMA index_list("{table}")').fetchall():
+                    if origin == "pk":
+                        conn.execute(f'SELECT COUNT(*) FROM "{table}" INDEXED BY "{index}"').fetchone()
+                # Summing the last column's length forces a full pass over the table b-tree.
+                conn.execute(
+                    f'SELECT SUM(LENGTH("{columns[-1]}")) FROM "{table}"'
+                ).fetchone()
+                timings[table] = time.perf_counter() - start
+                print(f"Warmed up '{table}' in {timings[table]:.2f}s.")
+        return timings
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._created,
+                "idle": self._idle.qsize(),
+                "checkouts": self.checkouts,
+                "avg_wait_ms": (
+                    self.total_wait_seconds / self.checkouts * 1000 if self.checkouts else 0.0
+                ),
+                "max_wait_ms": self.max_wait_seconds * 1000,
+            }
+
+
+_execution_pools: Dict[str, ReadOnlyConnectionPool] = {}
+_execution_pools_lock = threading.Lock()
+
+
+def get_execution_pool(db_path: str = DB_PATH) -> ReadOnlyConnectionPool:
+    """
+    Returns the shared read-only pool for a database file, creating it on first use.
+    In mmap mode the main database gets memory-mapped, shared-cache connections, and its
+    hot tables are pre-read when the pool is created. The pool is built and warmed
+    outside the lock, so other database files are not held up by the warm-up scan;
+    if two threads race to create the same pool, the loser's is closed.
+    """
+    with _execution_pools_lock:
+        pool = _execution_pools.get(db_path)
+    if pool is not None:
+        return pool
+
+    if DB_MMAP_MODE and db_path == DB_PATH:
+        pool = ReadOnlyConnectionPool(
+            db_path,
+            pragmas={**SQLITE_EXECUTION_PRAGMAS, **SQLITE_MMAP_MODE_PRAGMAS},
+            shared_cache=True,
+        )
+        # Large databases: pull the hot tables into memory before the first query.
+        pool.warm_up(DB_WARMUP_TABLES)
+    else:
+        pool = ReadOnlyConnectionPool(db_path)
+
+    with _execution_pools_lock:
+        shared = _execution_pools.setdefault(db_path, pool)
+    if shared is not pool:
+        pool.close()
+    return shared
+
+
+def _internal_tables(db_path: str = DB_PATH) -> List[str]:
+    """Rollup tables present in the database; queries are routed to them transparently."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        placeholders = ", ".join("?" * len(ROLLUP_TABLE_NAMES))
+        return [
+            row[0]
+            for row in conn.execute(
+                f"SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})",
+                ROLLUP_TABLE_NAMES,
+            )
+        ]
+    finally:
+        conn.close()
+
+
+def get_db_instance() -> "SQLDatabase":
+    # Imported here: langchain_community and SQLAlchemy are slow to import.
+    from langchain_community.utilities import SQLDatabase
+
     DB_URI = get_sqlite_uri()
     # db_path = "sqlite:///../data/data_query_assistant.db"
-    db = SQLDatabase.from_uri(database_uri=DB_URI)
+    # The LLM writes SQL against the base tables only.
+    db = SQLDatabase.from_uri(database_uri=DB_URI, ignore_tables=_internal_tables())
     return db
 
 
-db_instance = get_db_instance()
+@lru_cache(maxsize=None)
+def get_shared_db() -> "SQLDatabase":
+    """A SQLDatabase shared across callers, reflected on first use."""
+    return get_db_instance()
+
+
+def __getattr__(name):
+    # `db_instance` is reflected on first access rather than at import time.
+    if name == "db_instance":
+        return get_shared_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
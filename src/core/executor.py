@@ -0,0 +1,247 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from .config import (
+    DEFAULT_SQL_EXECUTOR_WORKERS,
+    DEFAULT_MAX_RESULT_ROWS,
+    DEFAULT_MAX_RESULT_BYTES,
+    DEFAULT_RESULT_FETCH_BATCH_SIZE,
+    DEFAULT_QUERY_TIMEOUT_SECONDS,
+    DEFAULT_QUERY_MAX_VM_INSTRUCTIONS,
+    QUERY_PROGRESS_HANDLER_INTERVAL,
+)
+from .database import get_execution_pool, DB_PATH
+from .results import QueryResult
+
+
+# --- Bounded SQL Executor ---
+# SQLite calls block, so the async pipeline hands them to a fixed-size thread pool.
+# This keeps the event loop free for LLM round-trips while capping how many
+# queries hit the database at once.
+sql_executor = ThreadPoolExecutor(
+    max_workers=DEFAULT_SQL_EXECUTOR_WORKERS, thread_name_prefix="sql-executor"
+)
+
+
+async def run_in_sql_executor(func: Callable[..., Any], *args: Any) -> Any:
+    """Runs a blocking database call on the bounded SQL executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(sql_executor, func, *args)
+
+
+# --- Query Budgets & Cancellation ---
+class QueryExecutionError(Exception):
+    """
+    A query stopped by the executor rather than by SQLite itself.
+    `kind` is one of "timeout", "instruction_budget" or "cancelled".
+    """
+
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+
+class QueryGuard:
+    """
+    Enforces a wall-clock and VM-instruction budget on one query via the progress
+    handler, and lets another thread cancel it through `cancel()`. The clock starts
+    when the guard is attached to a connection, so time spent queued on the executor
+    or waiting for a pooled connection does not count against the budget.
+    """
+
+    def __init__(
+        self,
+        timeout_seconds: float = DEFAULT_QUERY_TIMEOUT_SECONDS,
+        max_instructions: int = DEFAULT_QUERY_MAX_VM_INSTRUCTIONS,
+        interval: int = QUERY_PROGRESS_HANDLER_INTERVAL,
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.max_instructions = max_instructions
+        self.interval = interval
+        self.instructions = 0
+        self.reason: Optional[str] = None
+        self._deadline: Optional[float] = None  # Set by attach()
+        self._cancelled = False
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def attach(self, conn: sqlite3.Connection) -> None:
+        # A guard may cover several queries in turn (a rollup query, then its fallback);
+        # each gets the full budget. A cancellation carries over.
+        with self._lock:
+            self._conn = conn
+            self._deadline = time.monotonic() + self.timeout_seconds
+            self.instructions = 0
+            if not self._cancelled:
+                self.reason = None
+            conn.set_progress_handler(self._on_progress, self.interval)
+
+    def detach(self) -> None:
+        # Pooled connections are reused, so a late cancel() must not reach the next query.
+        with self._lock:
+            self._conn = None
+
+    def _on_progress(self) -> int:
+        # A non-zero return value makes SQLite abort the statement.
+        self.instructions += self.interval
+        if self._cancelled:
+            self.reason = "cancelled"
+        elif self._deadline is not None and time.monotonic() > self._deadline:
+            self.reason = "timeout"
+        elif self.instructions > self.max_instructions:
+            self.reason = "instruction_budget"
+        return 1 if self.reason else 0
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled = True
+            self.reason = "cancelled"
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def error(self) -> QueryExecutionError:
+        if self.reason == "timeout":
+            return QueryExecutionError(
+                "timeout",
+                f"Query exceeded the {self.timeout_seconds:g}s time budget and was stopped. "
+                "Write a cheaper query: avoid cross joins and filter on date ranges.",
+            )
+        if self.reason == "instruction_budget":
+            return QueryExecutionError(
+                "instruction_budget",
+                f"Query exceeded the budget of {self.max_instructions} SQLite VM instructions "
+                "and was stopped. Write a cheaper query: avoid cross joins and filter early.",
+            )
+        return QueryExecutionError("cancelled", "Query was cancelled by the caller.")
+
+
+_active_guards: Dict[str, Set[QueryGuard]] = {}
+_cancelled_keys: Set[str] = set()
+_guards_lock = threading.Lock()
+
+
+def cancel_queries(cancel_key: str) -> None:
+    """
+    Cancels the question identified by `cancel_key` (the graph's thread_id): queries
+    already running are interrupted and later ones are refused until the flag is cleared.
+    """
+    with _guards_lock:
+        _cancelled_keys.add(cancel_key)
+        guards = list(_active_guards.get(cancel_key, ()))
+    for guard in guards:
+        guard.cancel()
+    print(f"Cancellation requested for {cancel_key} ({len(guards)} running queries).")
+
+
+def is_cancelled(cancel_key: Optional[str]) -> bool:
+    with _guards_lock:
+        return cancel_key in _cancelled_keys
+
+
+def clear_cancellation(cancel_key: Optional[str]) -> None:
+    with _guards_lock:
+        _cancelled_keys.discard(cancel_key)
+
+
+def _register_guard(cancel_key: Optional[str], guard: QueryGuard) -> None:
+    if cancel_key is None:
+        return
+    with _guards_lock:
+        _active_guards.setdefault(cancel_key, set()).add(guard)
+        if cancel_key in _cancelled_keys:
+            guard.cancel()
+
+
+def _unregister_guard(cancel_key: Optional[str], guard: QueryGuard) -> None:
+    if cancel_key is None:
+        return
+    with _guards_lock:
+        guards = _active_guards.get(cancel_key)
+        if guards is not None:
+            guards.discard(guard)
+            if not guards:
+                del _active_guards[cancel_key]
+
+
+def _row_size(row: Tuple) -> int:
+    """Rough byte size of a row: string/blob lengths plus 8 bytes per other value."""
+    return sum(len(v) if isinstance(v, (str, bytes)) else 8 for v in row)
+
+
+def execute_sql(
+    query: str,
+    db_path: str = DB_PATH,
+    max_rows: int = DEFAULT_MAX_RESULT_ROWS,
+    max_bytes: int = DEFAULT_MAX_RESULT_BYTES,
+    batch_size: int = DEFAULT_RESULT_FETCH_BATCH_SIZE,
+    guard: Optional[QueryGuard] = None,
+    cancel_key: Optional[str] = None,
+) -> QueryResult:
+    """
+    Runs a query on a pooled read-only connection and returns its columnar result.
+
+    Rows are pulled from the cursor in batches with `fetchmany` and reading stops as
+    soon as `max_rows` or `max_bytes` is reached, so an unbounded SELECT never holds
+    more than the cap in memory. The result is flagged as truncated in that case.
+
+    The query runs under a QueryGuard (time and instruction budget). Passing a
+    `cancel_key` makes it cancellable through `cancel_queries(cancel_key)`.
+    """
+    with get_execution_pool(db_path).connection() as conn:
+        return execute_on_connection(conn, query, max_rows, max_bytes, batch_size, guard, cancel_key)
+
+
+def execute_on_connection(
+    conn: sqlite3.Connection,
+    query: str,
+    max_rows: int = DEFAULT_MAX_RESULT_ROWS,
+    max_bytes: int = DEFAULT_MAX_RESULT_BYTES,
+    batch_size: int = DEFAULT_RESULT_FETCH_BATCH_SIZE,
+    guard: Optional[QueryGuard] = None,
+    cancel_key: Optional[str] = None,
+) -> QueryResult:
+    """
+    `execute_sql` on a connection the caller provides, with the same caps and guard.
+    The caller is responsible for making the connection read-only.
+    """
+    guard = guard or QueryGuard()
+    guard.attach(conn)
+    _register_guard(cancel_key, guard)
+    cursor = None
+    try:
+        cursor = conn.execute(query)
+        columns = [description[0] for description in cursor.description or []]
+        rows = []
+        total_bytes = 0
+        truncated = False
+        while True:
+            batch = cursor.fetchmany(min(batch_size, max_rows - len(rows)) or 1)
+            if not batch:
+                break
+            for row in batch:
+                total_bytes += _row_size(row)
+                if len(rows) >= max_rows or total_bytes > max_bytes:
+                    truncated = True
+                    break
+                rows.append(row)
+            if truncated:
+                break
+        if truncated:
+            print(
+                f"Result truncated at {len(rows)} rows "
+                f"(caps: {max_rows} rows, {max_bytes} bytes)."
+            )
+        return QueryResult.from_rows(columns, rows, truncated=truncated)
+    except sqlite3.OperationalError as e:
+        if guard.reason is not None:
+            raise guard.error() from e
+        raise
+    finally:
+        _unregister_guard(cancel_key, guard)
+        guard.detach()
+        if cursor is not None:
+            cursor.close()  # Resets a partially read statement before reuse
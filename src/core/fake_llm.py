@@ -0,0 +1,183 @@
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, get_origin, get_type_hints
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+
+
+DEFAULT_FAKE_SQL = "SELECT COUNT(*) FROM user_activity"
+
+# The question and attempt number inside a retry prompt (see _build_query_generation_messages).
+_RETRY_PROMPT_RE = re.compile(
+    r"^Previous attempt to answer the question: '(?P<question>.*)' failed with .*"
+    r"This is attempt (?P<attempt>\d+)\.$",
+    re.DOTALL,
+)
+# Speculative retries in "multi" mode ask for several queries in one call.
+_CANDIDATES_RE = re.compile(r"Return (?P<count>\d+) alternative corrected queries")
+_ANSWER_QUESTION_RE = re.compile(r"^Original User Question: (?P<question>.*)$", re.MULTILINE)
+
+
+def _recording_key(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+def load_recordings(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Reads recorded exchanges from a JSON list of
+    `{"question": ..., "sql": "..." or ["attempt 1", "attempt 2", ...], "answer": ...}`.
+    """
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    return {_recording_key(entry["question"]): entry for entry in entries}
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Offline stand-in for the Gemini chat model.
+
+    Query-generation prompts are answered with canned SQL (matched on a substring of
+    the question), answer prompts with a short echo of the result. A fixed `latency`
+    is slept before every response (the time to first token) and `token_latency` per
+    streamed word after it, so concurrency and streaming can be benchmarked without
+    network.
+
+    `recordings` (see `load_recordings`) replay whole exchanges: the SQL for each
+    attempt of a question, so retries get the next recorded query, and its answer.
+    Recorded SQL may be a `CLARIFICATION_NEEDED: ...` reply.
+    """
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+    queries: Dict[str, str] = {}
+    default_query: str = DEFAULT_FAKE_SQL
+    recordings: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        system_text = messages[0].content if messages else ""
+        last_text = messages[-1].content if messages else ""
+        if "SQL generation engine" in system_text:
+            question, attempt = last_text.removeprefix("Question: "), 1
+            retry = _RETRY_PROMPT_RE.match(question)
+            if retry:
+                question, attempt = retry.group("question"), int(retry.group("attempt"))
+            candidates = _CANDIDATES_RE.search(last_text)
+            if candidates:
+                # Attempts `attempt`, `attempt + 1`, ... as a JSON list (see with_structured_output).
+                count = int(candidates.group("count"))
+                return json.dumps([self._query_for(question, attempt + i) for i in range(count)])
+            return self._query_for(question, attempt)
+        asked = _ANSWER_QUESTION_RE.search(last_text)
+        recording = self.recordings.get(_recording_key(asked.group("question"))) if asked else None
+        if recording is not None and "answer" in recording:
+            return recording["answer"]
+        result = last_text.split("Result from SQL Query:", 1)[-1]
+        result = result.split("Based on all the above", 1)[0].strip()
+        return f"Here is what I found: {result}"
+
+    def _query_for(self, question: str, attempt: int) -> str:
+        recording = self.recordings.get(_recording_key(question))
+        if recording is not None and "sql" in recording:
+            attempts = recording["sql"] if isinstance(recording["sql"], list) else [recording["sql"]]
+            return attempts[min(attempt, len(attempts)) - 1]
+        for fragment, query in self.queries.items():
+            if fragment.lower() in question.lower():
+                return query
+        return self.default_query
+
+    def _message(self, messages: List[BaseMessage]) -> AIMessage:
+        content = self._respond(messages)
+        # Rough token counts (~4 characters per token) so tracing has numbers offline.
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        output_tokens = len(content) // 4
+        return AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+
+    def _chunks(self, messages: List[BaseMessage]) -> List[ChatGenerationChunk]:
+        """The response split into words; the last chunk carries the usage metadata."""
+        message = self._message(messages)
+        words = re.findall(r"\s*\S+", message.content) or [message.content]
+        chunks = [AIMessageChunk(content=word) for word in words]
+        chunks[-1] = AIMessageChunk(content=words[-1], usage_metadata=message.usage_metadata)
+        return [ChatGenerationChunk(message=chunk) for chunk in chunks]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._message(messages)
+        delay = self.latency + self.token_latency * max(len(message.content.split()) - 1, 0)
+        if delay:
+            time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._message(messages)
+        delay = self.latency + self.token_latency * max(len(message.content.split()) - 1, 0)
+        if delay:
+            await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        for i, chunk in enumerate(self._chunks(messages)):
+            delay = self.latency if i == 0 else self.token_latency
+            if delay:
+                time.sleep(delay)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        for i, chunk in enumerate(self._chunks(messages)):
+            delay = self.latency if i == 0 else self.token_latency
+            if delay:
+                await asyncio.sleep(delay)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> Runnable:
+        """
+        Wraps the raw text into a dict keyed by the schema's single field; list fields
+        are parsed from the JSON list the model returns for them.
+        """
+        field_name = next(iter(schema.__annotations__))
+        is_list = get_origin(get_type_hints(schema)[field_name]) is list
+        parse = json.loads if is_list else (lambda content: content)
+        return self | RunnableLambda(lambda message: {field_name: parse(message.content)})
@@ -1,17 +1,53 @@
+from functools import lru_cache
+
 from langgraph.graph import START, StateGraph, END
 from langgraph.checkpoint.memory import InMemorySaver
-from .graph_components import State, write_query, execute_query, generate_answer
-from .config import DEFAULT_MAX_RETRIES_FOR_QUERY_EXECUTION
+from .checkpoint import SQLiteCheckpointSaver
+from .graph_components import (
+    State,
+    write_query,
+    validate_query,
+    rewrite_query,
+    execute_query,
+    generate_answer,
+    speculative_retry,
+    awrite_query,
+    avalidate_query,
+    arewrite_query,
+    aexecute_query,
+    agenerate_answer,
+    aspeculative_retry,
+)
+from .config import (
+    DEFAULT_MAX_RETRIES_FOR_QUERY_EXECUTION,
+    TRACING_ENABLED,
+    CHECKPOINTER,
+    CHECKPOINT_DB_PATH,
+    CHECKPOINT_KEEP_LAST,
+    CHECKPOINT_TTL_SECONDS,
+    CHECKPOINT_PRUNE_INTERVAL_SECONDS,
+    CHECKPOINT_COMPRESS_MIN_BYTES,
+    SPECULATIVE_RETRY_MODE,
+)
+from .sql_validation import VALIDATION_ERROR_KINDS
+from .speculative import SPECULATIVE_RETRY_MODES
+from .tracing import traced, tracer
+
+
 # --- Conditional Edge Logic ---
 def should_retry_or_proceed(state: State) -> str:
     """
     Determines the next step after query execution.
     - If an error occurred and retries are not exhausted, go back to 'write_query'.
-    - Otherwise (success or retries exhausted), proceed to 'generate_answer'.
+    - Otherwise (success, cancellation or retries exhausted), proceed to 'generate_answer'.
     """
     error_message = state.get("error_message")
     retry_count = state.get("retry_count", 0)
 
+    if error_message and state.get("error_kind") == "cancelled":
+        print("Question was cancelled. Not retrying.")
+        return "proceed_to_answer"
+
     if error_message and retry_count < DEFAULT_MAX_RETRIES_FOR_QUERY_EXECUTION:
         print(f"Execution failed (attempt {retry_count}/{DEFAULT_MAX_RETRIES_FOR_QUERY_EXECUTION}). Retrying query generation.")
         return "retry_write_query"
@@ -23,12 +59,66 @@ def should_retry_or_proceed(state: State) -> str:
         return "proceed_to_answer"
 
 
-def create_sql_qa_graph():
+def should_execute_or_retry(state: State) -> str:
+    """
+    Determines the next step after validation: run a valid query, or handle a rejected
+    one like a failed execution (retry or answer with the error).
+    """
+    if state.get("error_message") and state.get("error_kind") in VALIDATION_ERROR_KINDS:
+        return should_retry_or_proceed(state)
+    return "execute"
+
+
+_checkpointer = None
+
+
+def get_checkpointer():
+    """The checkpointer shared by all graphs: SQLite-backed, or in memory with CHECKPOINTER=memory."""
+    global _checkpointer
+    if _checkpointer is None:
+        if CHECKPOINTER == "memory":
+            _checkpointer = InMemorySaver()
+        else:
+            _checkpointer = SQLiteCheckpointSaver(
+                CHECKPOINT_DB_PATH,
+                keep_last=CHECKPOINT_KEEP_LAST,
+                ttl_seconds=CHECKPOINT_TTL_SECONDS,
+                prune_interval_seconds=CHECKPOINT_PRUNE_INTERVAL_SECONDS,
+                compress_min_bytes=CHECKPOINT_COMPRESS_MIN_BYTES,
+            )
+    return _checkpointer
+
+
+def _build_sql_qa_graph(
+    write_query_node,
+    validate_query_node,
+    rewrite_query_node,
+    execute_query_node,
+    generate_answer_node,
+    speculative_retry_node,
+    speculative_retry_mode=SPECULATIVE_RETRY_MODE,
+):
+    if speculative_retry_mode not in SPECULATIVE_RETRY_MODES:
+        raise ValueError(
+            f"Unknown SPECULATIVE_RETRY_MODE {speculative_retry_mode!r}; use one of {SPECULATIVE_RETRY_MODES}."
+        )
+    speculative = speculative_retry_mode != "off"
+    # Failed attempts are retried serially by write_query, or speculatively.
+    retry_node = "speculative_retry" if speculative else "write_query"
     graph_builder = StateGraph(State)
 
-    graph_builder.add_node("write_query", write_query)
-    graph_builder.add_node("execute_query", execute_query)
-    graph_builder.add_node("generate_answer", generate_answer)
+    nodes = {
+        "write_query": write_query_node,
+        "validate_query": validate_query_node,
+        "rewrite_query": rewrite_query_node,
+        "execute_query": execute_query_node,
+        "generate_answer": generate_answer_node,
+    }
+    if speculative:
+        nodes["speculative_retry"] = speculative_retry_node
+    for name, node in nodes.items():
+        # Each node run becomes a span of the question's trace (see core/tracing.py).
+        graph_builder.add_node(name, traced(name, node, tracer) if TRACING_ENABLED else node)
 
     graph_builder.add_edge(START, "write_query")
 
@@ -37,16 +127,71 @@ def create_sql_qa_graph():
         "execute_query",
         should_retry_or_proceed,
         {
-            "retry_write_query": "write_query",
+            "retry_write_query": retry_node,
             "proceed_to_answer": "generate_answer"
         }
     )
 
-    graph_builder.add_edge("write_query", "execute_query")
+    # Invalid queries are sent back before they reach the database
+    graph_builder.add_conditional_edges(
+        "validate_query",
+        should_execute_or_retry,
+        {
+            "execute": "rewrite_query",
+            "retry_write_query": retry_node,
+            "proceed_to_answer": "generate_answer"
+        }
+    )
+
+    if speculative:
+        # A speculative retry validates and runs its own candidates.
+        graph_builder.add_conditional_edges(
+            "speculative_retry",
+            should_retry_or_proceed,
+            {
+                "retry_write_query": "speculative_retry",
+                "proceed_to_answer": "generate_answer"
+            }
+        )
+
+    graph_builder.add_edge("write_query", "validate_query")
+    graph_builder.add_edge("rewrite_query", "execute_query")
     graph_builder.add_edge("generate_answer", END)
 
-    memory = InMemorySaver()
-    graph = graph_builder.compile(checkpointer=memory)
+    graph = graph_builder.compile(checkpointer=get_checkpointer())
     return graph
 
-compiled_graph = create_sql_qa_graph()
\ No newline at end of file
+
+def create_sql_qa_graph():
+    return _build_sql_qa_graph(
+        write_query, validate_query, rewrite_query, execute_query, generate_answer, speculative_retry
+    )
+
+
+def create_async_sql_qa_graph():
+    """
+    Same pipeline built from the async nodes. Drive it with `ainvoke`/`astream` so many
+    conversations can be in flight inside one event loop.
+    """
+    return _build_sql_qa_graph(
+        awrite_query, avalidate_query, arewrite_query, aexecute_query, agenerate_answer, aspeculative_retry
+    )
+
+
+@lru_cache(maxsize=None)
+def get_compiled_graph():
+    """The shared sync graph, compiled on first use."""
+    return create_sql_qa_graph()
+
+
+@lru_cache(maxsize=None)
+def get_compiled_async_graph():
+    """The shared async graph (used by the HTTP server), compiled on first use."""
+    return create_async_sql_qa_graph()
+
+
+def __getattr__(name):
+    # `compiled_graph` is compiled on first access rather than at import time.
+    if name == "compiled_graph":
+        return get_compiled_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
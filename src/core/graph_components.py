@@ -1,17 +1,112 @@
+import asyncio
+import sqlite3
+import time
 from typing import List, Dict, Any, TypedDict, Annotated
 from datetime import datetime, timezone
 
-from langchain_core.messages import BaseMessage
-from langchain_community.tools.sql_database.tool import QuerySQLDatabaseTool
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
 
-from .llm import llm_instance
-from .database import db_instance
+from .llm import get_llm
+from .database import (
+    get_db_instance,
+    get_execution_pool,
+    DB_PATH,
+    DataVersionProbe,
+)
+from .cache import (
+    SchemaCache,
+    SchemaSnapshot,
+    QueryCache,
+    ResultCache,
+    is_context_dependent,
+    make_query_cache_key,
+)
+from .executor import (
+    run_in_sql_executor,
+    execute_sql,
+    cancel_queries,
+    is_cancelled,
+    clear_cancellation,
+    QueryExecutionError,
+    QueryGuard,
+)
+from .results import QueryResult, result_to_prompt_text
+from .answer_templates import render_template_answer
+from .index_advisor import QueryLog
+from .rollups import RollupRouter
+from .schema_pruning import SchemaPruner
+from .sql_validation import SQLValidator, SQLValidationError
+from .speculative import unique_candidates, first_success, afirst_success
 from .prompts import (
     query_generation_prompt,
     answer_generation_prompt,
     format_chat_history_for_prompt,
 )
-from .config import DEFAULT_TOP_K_RESULTS, DEFAULT_MAX_RETRIES_FOR_QUERY_EXECUTION
+from .config import (
+    DEFAULT_TOP_K_RESULTS,
+    DEFAULT_MAX_RETRIES_FOR_QUERY_EXECUTION,
+    QUERY_CACHE_MAX_ENTRIES,
+    QUERY_CACHE_TTL_SECONDS,
+    QUERY_CACHE_PERSIST_PATH,
+    RESULT_CACHE_MAX_BYTES,
+    RESULT_CACHE_MAX_ENTRY_BYTES,
+    QUERY_LOG_PATH,
+    ROLLUP_ROUTING_ENABLED,
+    SCHEMA_PRUNING_ENABLED,
+    SCHEMA_PRUNING_MIN_SCORE_RATIO,
+    SCHEMA_PRUNING_HISTORY_TURNS,
+    ANSWER_TEMPLATE_SHAPES,
+    ANSWER_TEMPLATE_MAX_ROWS,
+    ANSWER_TEMPLATE_MAX_COLUMNS,
+    SQL_VALIDATION_ENABLED,
+    SQL_VALIDATION_MAX_CROSS_JOIN_ROWS,
+    SQL_VALIDATION_MAX_ESTIMATED_ROWS,
+    SPECULATIVE_RETRY_MODE,
+    SPECULATIVE_RETRY_CANDIDATES,
+)
+
+# Rendering table info reflects every table and samples rows from each,
+# so it is built once (on first use) and reused until the database file changes.
+schema_cache = SchemaCache(None, DB_PATH, db_factory=get_db_instance)
+# Cuts the schema in the prompt down to the tables/columns a question is about.
+schema_pruner = SchemaPruner(schema_cache, min_score_ratio=SCHEMA_PRUNING_MIN_SCORE_RATIO)
+# Repeated stand-alone questions reuse the SQL generated the first time.
+query_cache = QueryCache(
+    max_entries=QUERY_CACHE_MAX_ENTRIES,
+    ttl_seconds=QUERY_CACHE_TTL_SECONDS,
+    persist_path=QUERY_CACHE_PERSIST_PATH,
+)
+# Identical SQL against unchanged data returns the stored result without touching SQLite.
+result_cache = ResultCache(
+    max_bytes=RESULT_CACHE_MAX_BYTES, max_entry_bytes=RESULT_CACHE_MAX_ENTRY_BYTES
+)
+# Data version token keying the result cache and rollup freshness; connects on first use.
+data_version_probe = DataVersionProbe(DB_PATH)
+# Executed queries and their latency, read by the index advisor; the file is opened on first record().
+query_log = QueryLog(QUERY_LOG_PATH) if QUERY_LOG_PATH else None
+# Routes aggregate queries to the precomputed daily rollup tables.
+rollup_router = RollupRouter(lambda: get_execution_pool(DB_PATH).connection())
+# Rejects unsafe, malformed or runaway SQL before it reaches the data.
+sql_validator = SQLValidator(
+    schema_cache.get_table_columns,
+    lambda: get_execution_pool(DB_PATH).connection(),
+    max_cross_join_rows=SQL_VALIDATION_MAX_CROSS_JOIN_ROWS,
+    max_estimated_rows=SQL_VALIDATION_MAX_ESTIMATED_ROWS,
+)
+
+
+def warm_up() -> None:
+    """
+    Does the one-off setup the first question would otherwise wait for: creates the LLM
+    client, reflects the schema, opens the execution pool (which pre-reads the hot
+    tables in mmap mode) and the data version probe's connection. Nothing here runs at
+    import time.
+    """
+    get_llm()
+    schema_cache.snapshot()
+    get_execution_pool(DB_PATH)
+    data_version_probe.token()
 
 
 # --- State Definition ---
@@ -19,13 +114,30 @@ class State(TypedDict):
     question: str
     chat_history: List[BaseMessage]  # Stores Langchain message objects
     query: str  # SQL query generated by LLM
-    result: str  # Result from SQL query execution
+    executed_query: str | None  # Rollup rewrite of `query` actually run, if any
+    result: QueryResult | str  # Structured query result, or a skip/error message
     answer: str  # Final natural language answer
     # Optional fields for handling clarification
     clarification_needed: bool
     clarification_question: str
     error_message: str | None  # To store the last error message from query execution
+    error_kind: str | None  # "sql_error", "timeout", "instruction_budget", "cancelled" or a validation kind
     retry_count: int  # To count the number of retries
+    query_cache_key: str | None  # Set when the generated query may be cached after it runs
+
+
+def new_question_input(question: str, chat_history: List[BaseMessage]) -> Dict[str, Any]:
+    """
+    Graph input for a new question. State persists per thread in the checkpointer, so
+    the retry bookkeeping of a previous (failed or cancelled) question is reset here.
+    """
+    return {
+        "question": question,
+        "chat_history": chat_history,
+        "retry_count": 0,
+        "error_message": None,
+        "error_kind": None,
+    }
 
 
 # --- TypedDict for query output structure ---
@@ -35,76 +147,196 @@ class QueryOutput(TypedDict):
     query: Annotated[str, ..., "Syntactically valid SQL query."]
 
 
-def write_query(state: State) -> Dict[str, Any]:
+class QueryCandidates(TypedDict):
+    """Alternative SQL queries for one question."""
+
+    queries: Annotated[List[str], ..., "Syntactically valid SQL queries, most likely correct first."]
+
+
+def _current_date_str() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _is_retry(state: State) -> bool:
+    return bool(state.get("error_message")) and state.get("retry_count", 0) > 0
+
+
+def _query_cache_key(state: State, schema: SchemaSnapshot) -> str | None:
+    """Cache key for the question, or None when it depends on the conversation so far."""
+    if is_context_dependent(state["question"], state.get("chat_history", [])):
+        return None
+    return make_query_cache_key(
+        state["question"], _current_date_str(), schema.fingerprint
+    )
+
+
+def _cached_query(state: State, cache_key: str | None) -> Dict[str, Any] | None:
+    """Returns a state update with the cached SQL, or None on a miss or retry."""
+    if cache_key is None or _is_retry(state):
+        return None
+    cached_query = query_cache.get(cache_key)
+    if cached_query is None:
+        return None
+    print(f"Query cache hit, skipping query generation ({query_cache.stats()}).")
+    return {
+        "query": cached_query,
+        "clarification_needed": False,
+        "error_message": None,
+        "query_cache_key": None,  # Already cached
+    }
+
+
+def _table_info_for(state: State, schema: SchemaSnapshot, is_retry: bool) -> str:
     """
-    Generates an SQL query based on the user's question, chat history, and previous error (if any).
+    Schema text for the prompt: pruned to the question (and the previous user turns),
+    or the full schema on retries and when nothing in the schema matches.
+    """
+    full_table_info = schema.table_info
+    if not SCHEMA_PRUNING_ENABLED or is_retry:
+        return full_table_info
+    earlier_questions = [
+        m.content
+        for m in state.get("chat_history", [])
+        if isinstance(m, HumanMessage) and isinstance(m.content, str)
+    ]
+    recent_questions = earlier_questions[max(len(earlier_questions) - SCHEMA_PRUNING_HISTORY_TURNS, 0):]
+    pruned = schema_pruner.table_info_for(" ".join([*recent_questions, state["question"]]), schema)
+    if pruned is None:
+        print("Schema pruning found no matching tables; using the full schema.")
+        return full_table_info
+    print(f"Schema pruned to {len(pruned)} of {len(full_table_info)} characters.")
+    return pruned
+
+
+def _build_query_generation_messages(
+    state: State, schema: SchemaSnapshot, attempt: int | None = None, candidates: int = 1
+):
+    """
+    Formats the query-generation prompt, adding error context on retries. `schema` is
+    the node's snapshot of the schema cache. Speculative retries number each fan-out
+    call as its own `attempt`, or ask for several `candidates` in one call.
     """
-    print("--- Node: write_query ---")
     question = state["question"]
     chat_history_str = format_chat_history_for_prompt(state.get("chat_history", []))
     error_message = state.get("error_message")
     retry_count = state.get("retry_count", 0)
 
-    current_date_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    current_date_str = _current_date_str()
 
     input_question = question
-    if (
-        error_message and retry_count > 0
-    ):  # Add error context only if there was a previous error
+    is_retry = bool(error_message and retry_count > 0)
+    if is_retry:  # Add error context only if there was a previous error
+        alternatives = (
+            f"Return {candidates} alternative corrected queries, each fixing it in a different way, most likely first. "
+            if candidates > 1 else ""
+        )
         input_question = (
             f"Previous attempt to answer the question: '{question}' failed with the following SQL error: '{error_message}'. "
-            f"Please analyze the error and the schema to generate a corrected SQL query. This is attempt {retry_count + 1}."
+            f"Please analyze the error and the schema to generate a corrected SQL query. {alternatives}"
+            f"This is attempt {attempt or retry_count + 1}."
         )
         print(f"Retrying query generation with error context: {error_message}")
 
     prompt_input = {
-        "dialect": db_instance.dialect,
+        "dialect": schema.dialect,
         "top_k": DEFAULT_TOP_K_RESULTS,
-        "table_info": db_instance.get_table_info(),
+        "table_info": _table_info_for(state, schema, is_retry),
         "input": input_question,
         "chat_history_str": chat_history_str,
         "current_date": current_date_str,
     }
 
-    formatted_prompt_messages = query_generation_prompt.invoke(prompt_input)
-    structured_llm_query_gen = llm_instance.with_structured_output(QueryOutput)
+    return query_generation_prompt.invoke(prompt_input)
 
-    try:
-        ai_response_obj = structured_llm_query_gen.invoke(formatted_prompt_messages)
-        generated_query = ai_response_obj["query"]
-
-        if "CLARIFICATION_NEEDED:" in generated_query:
-            clarification_question = generated_query.replace(
-                "CLARIFICATION_NEEDED:", ""
-            ).strip()
-            print(f"Clarification needed: {clarification_question}")
-            return {
-                "query": generated_query,
-                "clarification_needed": True,
-                "clarification_question": clarification_question,
-                "error_message": None,  # Reset error on clarification
-            }
-        # Reset error message on successful query generation
+
+def _handle_generated_query(generated_query: str, cache_key: str | None) -> Dict[str, Any]:
+    """Turns the LLM's query output into a state update, detecting clarification requests."""
+    if "CLARIFICATION_NEEDED:" in generated_query:
+        clarification_question = generated_query.replace(
+            "CLARIFICATION_NEEDED:", ""
+        ).strip()
+        print(f"Clarification needed: {clarification_question}")
         return {
             "query": generated_query,
-            "clarification_needed": False,
-            "error_message": None,
-        }
-    except Exception as e:
-        print(f"Error in write_query: {e}")
-        return {
-            "query": f"ERROR_GENERATING_QUERY: {e}",
-            "clarification_needed": False,
-            "error_message": str(e),
+            "clarification_needed": True,
+            "clarification_question": clarification_question,
+            "error_message": None,  # Reset error on clarification
+            "query_cache_key": None,
         }
+    # Reset error message on successful query generation
+    return {
+        "query": generated_query,
+        "clarification_needed": False,
+        "error_message": None,
+        "query_cache_key": cache_key,
+    }
 
 
-def execute_query(state: State) -> Dict[str, Any]:
+def _query_generation_error(e: Exception) -> Dict[str, Any]:
+    print(f"Error in write_query: {e}")
+    return {
+        "query": f"ERROR_GENERATING_QUERY: {e}",
+        "clarification_needed": False,
+        "error_message": str(e),
+        "query_cache_key": None,
+    }
+
+
+def _start_question(state: State, config: RunnableConfig | None) -> None:
     """
-    Executes the generated SQL query. If execution fails, it updates the error message
-    and increments the retry count.
+    A first attempt (retry_count 0) starts a new question, so a cancellation left over
+    from an earlier question, or sent while the conversation was idle, is dropped here.
     """
-    print("--- Node: execute_query ---")
+    if state.get("retry_count", 0) == 0:
+        clear_cancellation(_thread_id(config))
+
+
+def write_query(state: State, config: RunnableConfig = None) -> Dict[str, Any]:
+    """
+    Generates an SQL query based on the user's question, chat history, and previous error (if any).
+    """
+    print("--- Node: write_query ---")
+    _start_question(state, config)
+    schema = schema_cache.snapshot()
+    cache_key = _query_cache_key(state, schema)
+    cached = _cached_query(state, cache_key)
+    if cached is not None:
+        return cached
+
+    formatted_prompt_messages = _build_query_generation_messages(state, schema)
+    structured_llm_query_gen = get_llm().with_structured_output(QueryOutput)
+
+    try:
+        ai_response_obj = structured_llm_query_gen.invoke(formatted_prompt_messages)
+        return _handle_generated_query(ai_response_obj["query"], cache_key)
+    except Exception as e:
+        return _query_generation_error(e)
+
+
+async def awrite_query(state: State, config: RunnableConfig = None) -> Dict[str, Any]:
+    """Async variant of `write_query`; awaits the LLM instead of blocking a thread."""
+    print("--- Node: write_query (async) ---")
+    _start_question(state, config)
+    schema = schema_cache.snapshot()
+    cache_key = _query_cache_key(state, schema)
+    cached = _cached_query(state, cache_key)
+    if cached is not None:
+        return cached
+
+    formatted_prompt_messages = _build_query_generation_messages(state, schema)
+    structured_llm_query_gen = get_llm().with_structured_output(QueryOutput)
+
+    try:
+        ai_response_obj = await structured_llm_query_gen.ainvoke(
+            formatted_prompt_messages
+        )
+        return _handle_generated_query(ai_response_obj["query"], cache_key)
+    except Exception as e:
+        return _query_generation_error(e)
+
+
+def _skipped_execution(state: State) -> Dict[str, Any] | None:
+    """Returns the state update for a skipped execution, or None if the query should run."""
     query = state["query"]
     retry_count = state.get("retry_count", 0)
 
@@ -123,40 +355,363 @@ def execute_query(state: State) -> Dict[str, Any]:
             ),  # Preserve existing error message if any
             "retry_count": retry_count,
         }
+    return None
+
+
+def _validation_error(e: SQLValidationError, retry_count: int) -> Dict[str, Any]:
+    print(f"Generated SQL rejected before execution (attempt {retry_count + 1}, {e.kind}): {e}")
+    return {
+        "result": f"ERROR_EXECUTING_QUERY: {e}",
+        "error_message": str(e),
+        "error_kind": e.kind,
+        "retry_count": retry_count + 1,
+    }
 
-    execute_query_tool = QuerySQLDatabaseTool(db=db_instance)
 
+def _validate(state: State) -> Dict[str, Any]:
+    if not SQL_VALIDATION_ENABLED or _skipped_execution(state) is not None:
+        return {"error_kind": None}
     try:
-        query_result = execute_query_tool.invoke(query)
-        print(f"SQL Query Result: \n{query_result}")
-        return {"result": str(query_result), "error_message": None, "retry_count": 0}
+        estimate = sql_validator.validate(state["query"])
+    except SQLValidationError as e:
+        return _validation_error(e, state.get("retry_count", 0))
+    print(f"SQL validated; estimated rows visited: {estimate.estimated_rows:,}.")
+    return {"error_kind": None}
+
+
+def validate_query(state: State) -> Dict[str, Any]:
+    """
+    Checks the generated SQL without running it: read-only, known tables and columns,
+    and a query plan without cross joins. A rejected query counts as a failed attempt,
+    so it goes back to `write_query` with the error like an execution failure would.
+    """
+    print("--- Node: validate_query ---")
+    return _validate(state)
+
+
+async def avalidate_query(state: State) -> Dict[str, Any]:
+    """Async variant of `validate_query`; EXPLAIN runs on the SQL executor."""
+    print("--- Node: validate_query (async) ---")
+    return await run_in_sql_executor(_validate, state)
+
+
+def _route_to_rollups(state: State) -> Dict[str, Any]:
+    if not ROLLUP_ROUTING_ENABLED or _skipped_execution(state) is not None:
+        return {"executed_query": None}
+    rewritten = rollup_router.rewrite(state["query"], data_version_probe.token())
+    if rewritten is not None:
+        print(f"Query routed to rollup table:\n{rewritten}")
+    return {"executed_query": rewritten}
+
+
+def rewrite_query(state: State) -> Dict[str, Any]:
+    """
+    Rewrites aggregate queries to read the precomputed rollup tables when that gives
+    the same result. The generated query stays in `query`; the rewrite goes to
+    `executed_query`.
+    """
+    print("--- Node: rewrite_query ---")
+    return _route_to_rollups(state)
+
+
+async def arewrite_query(state: State) -> Dict[str, Any]:
+    """Async variant of `rewrite_query`; the rollup freshness check runs on the SQL executor."""
+    print("--- Node: rewrite_query (async) ---")
+    return await run_in_sql_executor(_route_to_rollups, state)
+
+
+def _thread_id(config: RunnableConfig | None) -> str | None:
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+def _run_sql(query: str, cancel_key: str | None = None, guard: QueryGuard | None = None) -> QueryResult:
+    cache_key = ResultCache.make_key(query, data_version_probe.token())
+    cached_result = result_cache.get(cache_key)
+    if cached_result is not None:
+        print(f"Result cache hit ({result_cache.stats()}).")
+        return cached_result
+
+    start = time.perf_counter()
+    query_result = execute_sql(query, guard=guard, cancel_key=cancel_key)
+    if query_log is not None:
+        query_log.record(query, time.perf_counter() - start)
+    result_cache.put(cache_key, query_result)
+    print(f"Result cache miss ({result_cache.stats()}).")
+    return query_result
+
+
+def _run_routed_sql(state: State, cancel_key: str | None = None, guard: QueryGuard | None = None) -> QueryResult:
+    """Runs the rollup rewrite if there is one, falling back to the generated query."""
+    executed_query = state.get("executed_query")
+    if executed_query:
+        try:
+            return _run_sql(executed_query, cancel_key, guard)
+        except sqlite3.Error as e:
+            print(f"Rollup query failed ({e}); running the generated query instead.")
+    return _run_sql(state["query"], cancel_key, guard)
+
+
+def _execution_success(state: State, query_result: QueryResult) -> Dict[str, Any]:
+    print(f"SQL Query Result: \n{query_result.to_prompt_text()}")
+    # Only queries that actually ran are worth serving again.
+    if state.get("query_cache_key"):
+        query_cache.put(state["query_cache_key"], state["query"])
+    return {
+        "result": query_result,
+        "error_message": None,
+        "error_kind": None,
+        "retry_count": 0,
+    }
+
+
+def _execution_error(e: Exception, retry_count: int) -> Dict[str, Any]:
+    error_str = str(e)
+    error_kind = e.kind if isinstance(e, QueryExecutionError) else "sql_error"
+    print(f"Error executing SQL query (attempt {retry_count + 1}, {error_kind}): {error_str}")
+    return {
+        "result": f"ERROR_EXECUTING_QUERY: {error_str}",
+        "error_message": error_str,
+        "error_kind": error_kind,
+        "retry_count": retry_count + 1,
+    }
+
+
+def _cancelled_execution(retry_count: int) -> Dict[str, Any]:
+    return _execution_error(
+        QueryExecutionError("cancelled", "Question was cancelled by the caller."),
+        retry_count,
+    )
+
+
+def cancel_question(thread_id: str) -> None:
+    """
+    Cancels the in-flight question of a conversation: a running query is interrupted,
+    the retry loop stops and no answer is generated by the LLM. The next question on
+    the conversation is answered normally. Exposed over HTTP as
+    `POST /conversations/<id>/cancel` (see server.py).
+    """
+    cancel_queries(thread_id)
+
+
+def execute_query(state: State, config: RunnableConfig = None) -> Dict[str, Any]:
+    """
+    Executes the generated SQL query. If execution fails, it updates the error message
+    and increments the retry count.
+    """
+    print("--- Node: execute_query ---")
+    skipped = _skipped_execution(state)
+    if skipped is not None:
+        return skipped
+
+    thread_id = _thread_id(config)
+    if is_cancelled(thread_id):
+        return _cancelled_execution(state.get("retry_count", 0))
+
+    try:
+        return _execution_success(state, _run_routed_sql(state, thread_id))
     except Exception as e:
-        error_str = str(e)
-        print(f"Error executing SQL query (attempt {retry_count + 1}): {error_str}")
+        return _execution_error(e, state.get("retry_count", 0))
+
+
+async def aexecute_query(state: State, config: RunnableConfig = None) -> Dict[str, Any]:
+    """Async variant of `execute_query`; runs SQL on the bounded SQL executor."""
+    print("--- Node: execute_query (async) ---")
+    skipped = _skipped_execution(state)
+    if skipped is not None:
+        return skipped
+
+    thread_id = _thread_id(config)
+    if is_cancelled(thread_id):
+        return _cancelled_execution(state.get("retry_count", 0))
+
+    guard = QueryGuard()
+    try:
+        query_result = await run_in_sql_executor(_run_routed_sql, state, thread_id, guard)
+        return _execution_success(state, query_result)
+    except asyncio.CancelledError:
+        # The task was cancelled, but the query keeps running on its worker thread
+        # until it is interrupted. Cancelling this call's guard also stops a query that
+        # has not started yet, without flagging the conversation's next question.
+        guard.cancel()
+        raise
+    except Exception as e:
+        return _execution_error(e, state.get("retry_count", 0))
+
+
+# --- Speculative Retries ---
+def _candidate_prompts(state: State, schema: SchemaSnapshot) -> List:
+    """One prompt asking for all candidates ("multi"), or one prompt per candidate ("fan_out")."""
+    if SPECULATIVE_RETRY_MODE == "multi":
+        return [_build_query_generation_messages(state, schema, candidates=SPECULATIVE_RETRY_CANDIDATES)]
+    first_attempt = state.get("retry_count", 0) + 1
+    return [
+        _build_query_generation_messages(state, schema, attempt=first_attempt + i)
+        for i in range(SPECULATIVE_RETRY_CANDIDATES)
+    ]
+
+
+def _candidate_llm():
+    schema = QueryCandidates if SPECULATIVE_RETRY_MODE == "multi" else QueryOutput
+    return get_llm().with_structured_output(schema)
+
+
+def _candidate_queries(responses: List[Any]) -> List[str]:
+    """The distinct queries in the LLM responses. Failed fan-out calls are skipped unless all failed."""
+    queries = []
+    for response in responses:
+        if isinstance(response, Exception):
+            print(f"Candidate query generation failed: {response}")
+            continue
+        queries += response["queries"] if "queries" in response else [response["query"]]
+    if not queries and responses and isinstance(responses[0], Exception):
+        raise responses[0]
+    return unique_candidates(queries)
+
+
+def _run_candidate(
+    query: str, guard: QueryGuard, cancel_key: str | None, schema: SchemaSnapshot
+) -> tuple[str | None, QueryResult]:
+    """Validates, routes and runs one candidate; returns its rollup rewrite (if any) and result."""
+    if SQL_VALIDATION_ENABLED:
+        sql_validator.validate(query, schema.table_columns)
+    candidate = {"query": query}
+    candidate.update(_route_to_rollups(candidate))
+    return candidate["executed_query"], _run_routed_sql(candidate, cancel_key, guard)
+
+
+def _speculative_generation_error(e: Exception, retry_count: int) -> Dict[str, Any]:
+    # Counts as an attempt, so a failing LLM cannot keep the retry loop going.
+    return {**_query_generation_error(e), "result": f"ERROR_GENERATING_QUERY: {e}", "retry_count": retry_count + 1}
+
+
+def _clarification_or_empty(state: State, queries: List[str]) -> Dict[str, Any] | None:
+    """State update when there is no SQL to run: a clarification request or no candidates at all."""
+    if any(not q.startswith("CLARIFICATION_NEEDED:") for q in queries):
+        return None
+    if queries:
+        return {**_handle_generated_query(queries[0], None), "result": "Query execution skipped due to clarification."}
+    return _speculative_generation_error(ValueError("The LLM returned no candidate queries."), state.get("retry_count", 0))
+
+
+def _speculative_outcome(
+    state: State, schema: SchemaSnapshot, candidates: List[str], winner, failures
+) -> Dict[str, Any]:
+    retry_count = state.get("retry_count", 0)
+    if winner is not None:
+        print(f"Speculative retry: candidate {winner.index + 1} of {len(candidates)} succeeded "
+              f"({len(failures)} failed before it).")
+        executed_query, query_result = winner.result
+        cache_key = _query_cache_key(state, schema)
+        update = _execution_success({**state, "query": winner.query, "query_cache_key": cache_key}, query_result)
         return {
-            "result": f"ERROR_EXECUTING_QUERY: {error_str}",
-            "error_message": error_str,
-            "retry_count": retry_count + 1,
+            **update,
+            "query": winner.query,
+            "executed_query": executed_query,
+            "clarification_needed": False,
+            "query_cache_key": None,  # Cached above
         }
 
+    first_error = failures[0].error
+    if isinstance(first_error, (SQLValidationError, QueryExecutionError)):
+        error_kind = first_error.kind
+    else:
+        error_kind = "sql_error"
+    error_message = f"All {len(candidates)} candidate queries failed. " + " ".join(
+        f"Candidate {f.index + 1}: {f.error}" for f in failures
+    )
+    print(f"Speculative retry failed (attempt {retry_count + 1}, {error_kind}): {error_message}")
+    return {
+        "query": failures[0].query,
+        "executed_query": None,
+        "clarification_needed": False,
+        "query_cache_key": None,
+        "result": f"ERROR_EXECUTING_QUERY: {error_message}",
+        "error_message": error_message,
+        "error_kind": error_kind,
+        "retry_count": retry_count + 1,
+    }
+
 
-def generate_answer(state: State) -> Dict[str, str]:
+def speculative_retry(state: State, config: RunnableConfig = None) -> Dict[str, Any]:
     """
-    Generates a natural language answer. If max retries were hit during query execution,
-    it provides a generic error message.
+    Retry step used instead of `write_query` when SPECULATIVE_RETRY_MODE is set: asks the
+    LLM for several corrected queries, then validates and runs them concurrently and
+    keeps the first that succeeds. Replaces write, validate and execute for the attempt.
+    """
+    print("--- Node: speculative_retry ---")
+    thread_id = _thread_id(config)
+    if is_cancelled(thread_id):
+        return _cancelled_execution(state.get("retry_count", 0))
+
+    schema = schema_cache.snapshot()
+    prompts = _candidate_prompts(state, schema)
+    try:
+        llm = _candidate_llm()
+        if len(prompts) == 1:
+            responses = [llm.invoke(prompts[0])]
+        else:
+            responses = llm.batch(prompts, return_exceptions=True)
+        candidates = _candidate_queries(responses)
+    except Exception as e:
+        return _speculative_generation_error(e, state.get("retry_count", 0))
+    no_sql = _clarification_or_empty(state, candidates)
+    if no_sql is not None:
+        return no_sql
+
+    candidates = [q for q in candidates if not q.startswith("CLARIFICATION_NEEDED:")]
+    print(f"Speculative retry: running {len(candidates)} candidate queries.")
+    winner, failures = first_success(candidates, lambda query, guard: _run_candidate(query, guard, thread_id, schema))
+    return _speculative_outcome(state, schema, candidates, winner, failures)
+
+
+async def aspeculative_retry(state: State, config: RunnableConfig = None) -> Dict[str, Any]:
+    """Async variant of `speculative_retry`; candidate LLM calls and queries are awaited."""
+    print("--- Node: speculative_retry (async) ---")
+    thread_id = _thread_id(config)
+    if is_cancelled(thread_id):
+        return _cancelled_execution(state.get("retry_count", 0))
+
+    schema = schema_cache.snapshot()
+    prompts = _candidate_prompts(state, schema)
+    try:
+        llm = _candidate_llm()
+        if len(prompts) == 1:
+            responses = [await llm.ainvoke(prompts[0])]
+        else:
+            responses = await llm.abatch(prompts, return_exceptions=True)
+        candidates = _candidate_queries(responses)
+    except Exception as e:
+        return _speculative_generation_error(e, state.get("retry_count", 0))
+    no_sql = _clarification_or_empty(state, candidates)
+    if no_sql is not None:
+        return no_sql
+
+    candidates = [q for q in candidates if not q.startswith("CLARIFICATION_NEEDED:")]
+    print(f"Speculative retry: running {len(candidates)} candidate queries.")
+    winner, failures = await afirst_success(candidates, lambda query, guard: _run_candidate(query, guard, thread_id, schema))
+    return _speculative_outcome(state, schema, candidates, winner, failures)
+
+
+def _answer_without_llm(state: State) -> Dict[str, str] | None:
+    """
+    Handles the cases that need no LLM call: exhausted retries, clarification requests,
+    query generation errors and results simple enough for an answer template. Returns
+    None when the LLM should write the answer.
     """
-    print("--- Node: generate_answer ---")
-    question = state["question"]
     query = state["query"]
     result = state["result"]
-    chat_history = state.get("chat_history", [])
     error_message = state.get("error_message")
     retry_count = state.get("retry_count", 0)
 
+    if error_message and state.get("error_kind") == "cancelled":
+        print("Question was cancelled. Skipping answer generation.")
+        return {"answer": "This question was cancelled before it finished."}
+
     # Check if max retries were hit and there's still an execution error
     if (
         retry_count >= DEFAULT_MAX_RETRIES_FOR_QUERY_EXECUTION
         and error_message
+        and isinstance(result, str)
         and "ERROR_EXECUTING_QUERY:" in result
     ):
         print(
@@ -179,23 +734,78 @@ def generate_answer(state: State) -> Dict[str, str]:
         print(f"Answer due to query generation error: {answer}")
         return {"answer": answer}
 
-    chat_history_str = format_chat_history_for_prompt(chat_history)
+    if isinstance(result, QueryResult) and not error_message:
+        answer = render_template_answer(
+            result,
+            shapes=ANSWER_TEMPLATE_SHAPES,
+            max_rows=ANSWER_TEMPLATE_MAX_ROWS,
+            max_columns=ANSWER_TEMPLATE_MAX_COLUMNS,
+        )
+        if answer is not None:
+            print(f"Answered from a template, skipping the LLM: \n{answer}")
+            return {"answer": answer}
+
+    return None
+
+
+def _build_answer_generation_messages(state: State):
+    chat_history_str = format_chat_history_for_prompt(state.get("chat_history", []))
     prompt_input = {
         "chat_history_str": chat_history_str,
-        "question": question,
-        "query": query,
-        "result": result,  # This result can contain "ERROR_EXECUTING_QUERY:..."
+        "question": state["question"],
+        "query": state["query"],
+        # This result can contain "ERROR_EXECUTING_QUERY:..."
+        "result": result_to_prompt_text(state["result"]),
+    }
+
+    return answer_generation_prompt.invoke(prompt_input)
+
+
+def _answer_generation_error(e: Exception) -> Dict[str, str]:
+    print(f"Error in generate_answer: {e}")
+    return {
+        "answer": f"Sorry, I encountered an issue while formulating the final answer: {e}"
     }
 
-    formatted_prompt_messages = answer_generation_prompt.invoke(prompt_input)
+
+def generate_answer(state: State, config: RunnableConfig = None) -> Dict[str, str]:
+    """
+    Generates a natural language answer. If max retries were hit during query execution,
+    it provides a generic error message.
+    """
+    print("--- Node: generate_answer ---")
+    # The run ends here; a cancellation only applies to the question it was issued for.
+    # (write_query clears it too, for cancellations that arrive after this point.)
+    clear_cancellation(_thread_id(config))
+    early_answer = _answer_without_llm(state)
+    if early_answer is not None:
+        return early_answer
+
+    formatted_prompt_messages = _build_answer_generation_messages(state)
 
     try:
-        ai_response_obj = llm_instance.invoke(formatted_prompt_messages)
+        ai_response_obj = get_llm().invoke(formatted_prompt_messages)
         natural_language_answer = ai_response_obj.content
-        print(f"Generated Natural Language Answer: \n{natural_language_answer}")
+        print(f"\nGenerated Natural Language Answer: \n{natural_language_answer}")
         return {"answer": natural_language_answer}
     except Exception as e:
-        print(f"Error in generate_answer: {e}")
-        return {
-            "answer": f"Sorry, I encountered an issue while formulating the final answer: {e}"
-        }
+        return _answer_generation_error(e)
+
+
+async def agenerate_answer(state: State, config: RunnableConfig = None) -> Dict[str, str]:
+    """Async variant of `generate_answer`."""
+    print("--- Node: generate_answer (async) ---")
+    clear_cancellation(_thread_id(config))
+    early_answer = _answer_without_llm(state)
+    if early_answer is not None:
+        return early_answer
+
+    formatted_prompt_messages = _build_answer_generation_messages(state)
+
+    try:
+        ai_response_obj = await get_llm().ainvoke(formatted_prompt_messages)
+        natural_language_answer = ai_response_obj.content
+        print(f"\nGenerated Natural Language Answer: \n{natural_language_answer}")
+        return {"answer": natural_language_answer}
+    except Exception as e:
+        return _answer_generation_error(e)
@@ -0,0 +1,144 @@
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+from .config import (
+    HISTORY_MAX_VERBATIM_TURNS,
+    HISTORY_SUMMARIZER,
+    HISTORY_SUMMARY_TOKEN_BUDGET,
+    HISTORY_TOKEN_BUDGET,
+)
+
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+# Same rough estimate as the fake model: about four characters per token.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    return text if len(text) <= max_chars else text[: max(max_chars - 3, 0)] + "..."
+
+
+@dataclass
+class Turn:
+    question: str
+    answer: str
+    sql: Optional[str] = None
+
+    def messages(self, max_tokens_per_message: int) -> List["BaseMessage"]:
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        answer = f"SQL Query: {self.sql} \nAnswer: {self.answer}" if self.sql else self.answer
+        return [
+            HumanMessage(content=_truncate(self.question, max_tokens_per_message)),
+            AIMessage(content=_truncate(answer, max_tokens_per_message)),
+        ]
+
+
+# --- Summarizers: (summary so far, turn being folded) -> new summary ---
+def extractive_summary(summary: str, turn: Turn) -> str:
+    """Appends one line per turn: the question and the first sentence of the answer."""
+    first_sentence = re.split(r"(?<=[.!?])\s", turn.answer.strip(), maxsplit=1)[0]
+    line = f"- User asked: {_truncate(turn.question, 40)} -> {_truncate(first_sentence, 40)}"
+    return f"{summary}\n{line}" if summary else line
+
+
+def llm_summarizer(llm) -> Callable[[str, Turn], str]:
+    """Summarizer that asks the LLM to fold the turn into the running summary."""
+    from .prompts import history_summary_prompt
+
+    def summarize(summary: str, turn: Turn) -> str:
+        messages = history_summary_prompt.invoke({
+            "summary": summary or "(empty)",
+            "question": turn.question,
+            "answer": turn.answer,
+        })
+        return llm.invoke(messages).content.strip()
+
+    return summarize
+
+
+def get_summarizer(mode: str = HISTORY_SUMMARIZER) -> Callable[[str, Turn], str]:
+    if mode == "llm":
+        from .llm import get_llm
+
+        # The LLM is only created once a turn actually needs summarizing.
+        return lambda summary, turn: llm_summarizer(get_llm())(summary, turn)
+    return extractive_summary
+
+
+class ConversationHistory:
+    """
+    Chat history handed to the graph, with a bounded size.
+
+    The last `max_turns` turns are kept verbatim; older turns are folded, one at a time
+    as they fall out of the window, into a rolling summary. Turns are also folded early
+    (keeping at least the latest one) while the history is over `token_budget`, and the
+    summary is capped at `summary_token_budget` (oldest lines dropped first), so the
+    history in the prompt stays the same size however long the session gets.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = HISTORY_MAX_VERBATIM_TURNS,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        summary_token_budget: int = HISTORY_SUMMARY_TOKEN_BUDGET,
+        summarizer: Optional[Callable[[str, Turn], str]] = None,
+    ):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_token_budget = summary_token_budget
+        self.summarizer = summarizer or extractive_summary
+        # A single verbatim turn (question + answer) always fits next to the summary.
+        self.max_tokens_per_message = max(
+            (token_budget - summary_token_budget - estimate_tokens(SUMMARY_PREFIX)) // 2, 1
+        )
+        self.summary = ""
+        self.summarized_turns = 0
+        self._turns: deque = deque()
+
+    def add_turn(self, question: str, answer: str, sql: Optional[str] = None) -> None:
+        self._turns.append(Turn(question, answer, sql))
+        while len(self._turns) > self.max_turns:
+            self._fold_oldest()
+        while len(self._turns) > 1 and self.token_count() > self.token_budget:
+            self._fold_oldest()
+
+    def _fold_oldest(self) -> None:
+        summary = self.summarizer(self.summary, self._turns.popleft())
+        lines = summary.split("\n")
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_token_budget:
+            lines.pop(0)
+        self.summary = _truncate("\n".join(lines), self.summary_token_budget)
+        self.summarized_turns += 1
+
+    def messages(self) -> List["BaseMessage"]:
+        """The summary (as a system message) followed by the verbatim turns."""
+        # Imported on use: the CLI builds its history before LangChain is loaded.
+        from langchain_core.messages import SystemMessage
+
+        messages: List["BaseMessage"] = []
+        if self.summary:
+            messages.append(SystemMessage(content=SUMMARY_PREFIX + self.summary))
+        for turn in self._turns:
+            messages += turn.messages(self.max_tokens_per_message)
+        return messages
+
+    @property
+    def turns(self) -> List[Turn]:
+        """The turns kept verbatim (older ones are only in `summary`)."""
+        return list(self._turns)
+
+    def token_count(self) -> int:
+        return sum(estimate_tokens(m.content) for m in self.messages())
+
+    def __len__(self) -> int:
+        return self.summarized_turns + len(self._turns)
@@ -0,0 +1,434 @@
+import sqlite3
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import DEFAULT_QUERY_TIMEOUT_SECONDS, DEFAULT_QUERY_MAX_VM_INSTRUCTIONS
+from .executor import QueryExecutionError, QueryGuard, execute_on_connection
+from .sql_utils import canonicalize_sql, significant_tokens
+
+# Clause keywords that change which role a column reference plays.
+_FILTER_CLAUSES = {"WHERE", "ON", "HAVING"}
+_ORDERING_CLAUSES = {"GROUP", "ORDER"}
+_OTHER_CLAUSES = {"SELECT", "FROM", "JOIN", "LIMIT", "UNION", "WITH"}
+_RANGE_OPERATORS = {"<", ">", "<=", ">=", "BETWEEN", "LIKE", "GLOB"}
+_EQUALITY_OPERATORS = {"=", "==", "IN", "IS"}
+INDEX_NAME_PREFIX = "idx_advisor_"
+# A covering index with more columns than this is not worth its size.
+MAX_INDEX_COLUMNS = 6
+
+
+# --- Query log ---
+class QueryLog:
+    """
+    Records every query `execute_query` runs: how often each (canonical) query ran and
+    how long it took. Backed by a small SQLite file so the index advisor, which runs as
+    a separate process, can read what the app has been executing. The file is opened
+    (and created) on first use, not when the log is constructed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Called with the lock held.
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = OFF")  # Losing a few samples is fine
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_log ("
+                "canonical_sql TEXT PRIMARY KEY, sample_sql TEXT NOT NULL, "
+                "executions INTEGER NOT NULL, total_seconds REAL NOT NULL, "
+                "max_seconds REAL NOT NULL, last_run REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def record(self, sql: str, seconds: float) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT INTO query_log VALUES (?, ?, 1, ?, ?, ?) "
+                "ON CONFLICT (canonical_sql) DO UPDATE SET "
+                "sample_sql = excluded.sample_sql, executions = executions + 1, "
+                "total_seconds = total_seconds + excluded.total_seconds, "
+                "max_seconds = MAX(max_seconds, excluded.max_seconds), "
+                "last_run = excluded.last_run",
+                (canonicalize_sql(sql), sql, seconds, seconds, time.time()),
+            )
+            conn.commit()
+
+    def entries(self, limit: int = 200) -> List[Tuple[str, int, float]]:
+        """(sample_sql, executions, total_seconds) for the most expensive queries first."""
+        with self._lock:
+            return self._connection().execute(
+                "SELECT sample_sql, executions, total_seconds FROM query_log "
+                "ORDER BY total_seconds DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM query_log")
+            conn.commit()
+
+
+# --- Plan analysis ---
+def explain_full_scans(conn: sqlite3.Connection, sql: str) -> List[str]:
+    """
+    Tables the query plan reads in full: `SCAN t` without an index, or a skip-scan.
+    Tables are returned by name even when the query refers to them through an alias.
+    """
+    aliases = _table_aliases(conn, sql)
+    scanned = []
+    for _, _, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+        parts = detail.split()
+        # A skip-scan over the (userid, date) primary key, "SEARCH t USING INDEX ...
+        # (ANY(userid) AND date>?)", still reads every userid; treat it as a scan.
+        skip_scan = parts[:1] == ["SEARCH"] and "(ANY(" in detail
+        if skip_scan:
+            parts = parts[:2]
+        elif len(parts) < 2 or parts[0] != "SCAN" or "INDEX" in parts:
+            continue
+        # "SCAN t", "SCAN a" (alias) or "SCAN t AS a"; subqueries and constant rows
+        # ("SCAN (subquery-1)", "SCAN CONSTANT ROW") are not tables.
+        table = aliases.get(parts[-1].lower() if "AS" in parts else parts[1].lower())
+        if table is not None and table not in scanned:
+            scanned.append(table)
+    return scanned
+
+
+def plan_uses_index(conn: sqlite3.Connection, sql: str, index_name: str) -> bool:
+    return any(
+        index_name in detail for *_, detail in conn.execute(f"EXPLAIN QUERY PLAN {sql}")
+    )
+
+
+def _table_columns(conn: sqlite3.Connection) -> Dict[str, List[str]]:
+    tables = [
+        row[0]
+        for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        )
+    ]
+    return {t: [row[1] for row in conn.execute(f'PRAGMA table_info("{t}")')] for t in tables}
+
+
+def _existing_indexes(conn: sqlite3.Connection) -> List[Tuple[str, Tuple[str, ...]]]:
+    """(table, columns) of every index, including primary-key autoindexes."""
+    indexes = []
+    for table in _table_columns(conn):
+        for index in conn.execute(f'PRAGMA index_list("{table}")'):
+            columns = tuple(row[2] for row in conn.execute(f'PRAGMA index_info("{index[1]}")'))
+            indexes.append((table, columns))
+    return indexes
+
+
+def _table_aliases(conn: sqlite3.Connection, sql: str) -> Dict[str, str]:
+    """Maps lower-cased table names and aliases (FROM t a / FROM t AS a) to table names."""
+    tables = {name.lower(): name for name in _table_columns(conn)}
+    aliases = dict(tables)
+    tokens = significant_tokens(sql)
+    for i, token in enumerate(tokens):
+        name = token.text.strip('"`[]').lower()
+        if token.kind not in ("word", "quoted") or name not in tables:
+            continue
+        if i > 0 and tokens[i - 1].text == ".":
+            continue
+        j = i + 1
+        if j < len(tokens) and tokens[j].text.upper() == "AS":
+            j += 1
+        if j < len(tokens) and tokens[j].kind == "word" and tokens[j].text.upper() not in (
+            _FILTER_CLAUSES | _ORDERING_CLAUSES | _OTHER_CLAUSES
+            | {"INNER", "LEFT", "CROSS", "NATURAL", "USING", "WHERE", "ON"}
+        ):
+            aliases[tokens[j].text.lower()] = tables[name]
+    return aliases
+
+
+@dataclass
+class ColumnUsage:
+    """How one query uses the columns of one table."""
+
+    equality: List[str] = field(default_factory=list)
+    range: List[str] = field(default_factory=list)
+    ordering: List[str] = field(default_factory=list)
+    other: List[str] = field(default_factory=list)
+
+    def all_columns(self) -> List[str]:
+        return _unique(self.equality + self.range + self.ordering + self.other)
+
+
+def _unique(values: Sequence[str]) -> List[str]:
+    return list(dict.fromkeys(values))
+
+
+def column_usage(sql: str, table: str, columns: Sequence[str], aliases: Dict[str, str]) -> ColumnUsage:
+    """
+    Classifies references to `table`'s columns: compared for equality or by range in
+    WHERE/ON/HAVING, used in GROUP BY/ORDER BY, or anywhere else (select list,
+    aggregates). A heuristic over the token stream, not a full SQL parse: an unqualified
+    column is attributed to every table that has a column of that name.
+    """
+    column_lookup = {c.lower(): c for c in columns}
+    usage = ColumnUsage()
+    tokens = significant_tokens(sql)
+    clause = None
+    for i, token in enumerate(tokens):
+        word = token.text.upper()
+        if token.kind == "word" and word in _FILTER_CLAUSES | _ORDERING_CLAUSES | _OTHER_CLAUSES:
+            clause = word
+            continue
+        if token.kind not in ("word", "quoted"):
+            continue
+        name = token.text.strip('"`[]').lower()
+        if name not in column_lookup:
+            continue
+        if i >= 2 and tokens[i - 1].text == ".":
+            qualifier = tokens[i - 2].text.strip('"`[]').lower()
+            if aliases.get(qualifier) != table:
+                continue
+        elif i + 1 < len(tokens) and tokens[i + 1].text == ".":
+            continue  # A table name or alias, not a column
+        column = column_lookup[name]
+        following = tokens[i + 1].text.upper() if i + 1 < len(tokens) else ""
+        if following == "NOT" and i + 2 < len(tokens):
+            following = tokens[i + 2].text.upper()
+        # The column may also be on the right-hand side: "a.userid = g.userid".
+        start = i - 2 if i >= 2 and tokens[i - 1].text == "." else i
+        preceding = tokens[start - 1].text.upper() if start >= 1 else ""
+        if clause in _FILTER_CLAUSES and _EQUALITY_OPERATORS & {following, preceding}:
+            usage.equality.append(column)
+        elif clause in _FILTER_CLAUSES and _RANGE_OPERATORS & {following, preceding}:
+            usage.range.append(column)
+        elif clause in _ORDERING_CLAUSES:
+            usage.ordering.append(column)
+        else:
+            usage.other.append(column)
+    return usage
+
+
+@dataclass
+class IndexCandidate:
+    table: str
+    columns: Tuple[str, ...]
+
+    @property
+    def name(self) -> str:
+        return f"{INDEX_NAME_PREFIX}{self.table}_{'_'.join(self.columns)}"
+
+    def create_statement(self, if_not_exists: bool = False) -> str:
+        guard = "IF NOT EXISTS " if if_not_exists else ""
+        columns = ", ".join(f'"{c}"' for c in self.columns)
+        return f'CREATE INDEX {guard}"{self.name}" ON "{self.table}" ({columns})'
+
+
+def candidate_indexes(usage: ColumnUsage, table: str) -> List[IndexCandidate]:
+    """
+    Index shapes for one scanned table: equality columns first, then one range column
+    (SQLite can only use a single range constraint per index), then GROUP BY / ORDER BY
+    columns; plus a covering variant that also carries every other referenced column
+    so the table itself need not be read.
+    """
+    equality = _unique(usage.equality)
+    ranges = [c for c in _unique(usage.range) if c not in equality]
+    lead = equality + ranges[:1]
+    ordering = [c for c in _unique(usage.ordering) if c not in lead]
+
+    shapes = []
+    if lead:
+        shapes.append(lead)
+    if equality and ordering:
+        shapes.append(equality + ordering)
+    elif not lead and ordering:
+        shapes.append(ordering)
+    base = shapes[0] if shapes else []
+    covering = _unique(base + ordering + usage.all_columns())
+    if base and len(covering) > len(base) and len(covering) <= MAX_INDEX_COLUMNS:
+        shapes.append(covering)
+
+    seen, candidates = set(), []
+    for shape in shapes:
+        key = tuple(shape[:MAX_INDEX_COLUMNS])
+        if key and key not in seen:
+            seen.add(key)
+            candidates.append(IndexCandidate(table, key))
+    return candidates
+
+
+# --- Measurement ---
+@dataclass
+class IndexRecommendation:
+    candidate: IndexCandidate
+    queries: List[str]  # Sample SQL of the logged queries the index helps
+    baseline_seconds: float  # Frequency-weighted latency of those queries today
+    indexed_seconds: float  # ... and with the index in place
+    build_seconds: float
+
+    @property
+    def saved_seconds(self) -> float:
+        return self.baseline_seconds - self.indexed_seconds
+
+    @property
+    def saved_fraction(self) -> float:
+        return self.saved_seconds / self.baseline_seconds if self.baseline_seconds else 0.0
+
+
+class IndexAdvisor:
+    """
+    Turns logged queries into index recommendations.
+
+    Each logged query is explained; for every full table scan, candidate indexes are
+    derived from how the query uses that table's columns. Each candidate is then built
+    inside a transaction, the queries it affects are timed with and without it, and the
+    transaction is rolled back, so nothing changes unless `apply()` is called. Savings
+    are weighted by how often each query was executed.
+
+    The connection is query_only except while an index is built or applied, and logged
+    queries are replayed like `execute_sql` runs them: capped rows and bytes, under a
+    QueryGuard. A query that goes over its budget is skipped and listed in `skipped`.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        repeat: int = 3,
+        timeout_seconds: float = DEFAULT_QUERY_TIMEOUT_SECONDS,
+        max_instructions: int = DEFAULT_QUERY_MAX_VM_INSTRUCTIONS,
+    ):
+        self.db_path = db_path
+        self.repeat = repeat
+        self.skipped: Dict[str, str] = {}  # Sample SQL -> why it was not timed
+        self._guard = QueryGuard(timeout_seconds, max_instructions)
+        self._conn = sqlite3.connect(db_path, isolation_level=None)
+        self._conn.execute("PRAGMA query_only = ON")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @contextmanager
+    def _writable(self):
+        self._conn.execute("PRAGMA query_only = OFF")
+        try:
+            yield
+        finally:
+            self._conn.execute("PRAGMA query_only = ON")
+
+    def _time_query(self, sql: str) -> Optional[float]:
+        """Median latency over `repeat` runs, or None if the query was skipped."""
+        if sql in self.skipped:
+            return None
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            try:
+                execute_on_connection(self._conn, sql, guard=self._guard)
+            except (QueryExecutionError, sqlite3.Error) as e:
+                self.skipped[sql] = str(e)
+                print(f"Skipping query that could not be timed ({e}): {sql}")
+                return None
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+
+    def candidates(self, entries: Sequence[Tuple[str, int, float]]) -> Dict[str, Tuple[IndexCandidate, List[Tuple[str, int]]]]:
+        """Candidate name -> (candidate, [(sql, executions), ...] it could help)."""
+        table_columns = _table_columns(self._conn)
+        existing = _existing_indexes(self._conn)
+        found: Dict[str, Tuple[IndexCandidate, List[Tuple[str, int]]]] = {}
+        for sql, executions, _ in entries:
+            try:
+                scanned = explain_full_scans(self._conn, sql)
+            except sqlite3.Error as e:
+                print(f"Skipping query that no longer compiles ({e}): {sql}")
+                continue
+            aliases = _table_aliases(self._conn, sql)
+            for table in scanned:
+                usage = column_usage(sql, table, table_columns.get(table, []), aliases)
+                for candidate in candidate_indexes(usage, table):
+                    # Already served by an existing index with the same leading columns.
+                    if any(
+                        table == t and columns[: len(candidate.columns)] == candidate.columns
+                        for t, columns in existing
+                    ):
+                        continue
+                    found.setdefault(candidate.name, (candidate, []))[1].append((sql, executions))
+        return found
+
+    def evaluate(self, candidate: IndexCandidate, queries: List[Tuple[str, int]]) -> Optional[IndexRecommendation]:
+        """
+        Measures one candidate; returns None if the planner would not use it or none of
+        the queries it affects could be timed.
+        """
+        baseline = {sql: self._time_query(sql) for sql, _ in queries}
+        queries = [(sql, n) for sql, n in queries if baseline[sql] is not None]
+        if not queries:
+            return None
+        self._conn.execute("BEGIN")
+        try:
+            with self._writable():
+                start = time.perf_counter()
+                self._conn.execute(candidate.create_statement())
+                build_seconds = time.perf_counter() - start
+            used = [(sql, n) for sql, n in queries if plan_uses_index(self._conn, sql, candidate.name)]
+            indexed = {sql: self._time_query(sql) for sql, _ in used}
+        finally:
+            self._conn.execute("ROLLBACK")
+        used = [(sql, n) for sql, n in used if indexed[sql] is not None]
+        if not used:
+            return None
+        return IndexRecommendation(
+            candidate=candidate,
+            queries=[sql for sql, _ in used],
+            baseline_seconds=sum(baseline[sql] * n for sql, n in used),
+            indexed_seconds=sum(indexed[sql] * n for sql, n in used),
+            build_seconds=build_seconds,
+        )
+
+    def recommend(self, entries: Sequence[Tuple[str, int, float]], min_saved_fraction: float = 0.2) -> List[IndexRecommendation]:
+        """Recommendations saving at least `min_saved_fraction` of the affected latency, best first."""
+        recommendations = []
+        for candidate, queries in self.candidates(entries).values():
+            recommendation = self.evaluate(candidate, queries)
+            if recommendation is not None and recommendation.saved_fraction >= min_saved_fraction:
+                recommendations.append(recommendation)
+        recommendations.sort(key=lambda r: r.saved_seconds, reverse=True)
+        # Drop recommendations whose queries are all served better by an earlier one.
+        chosen, covered = [], set()
+        for recommendation in recommendations:
+            if not set(recommendation.queries) <= covered:
+                chosen.append(recommendation)
+                covered.update(recommendation.queries)
+        return chosen
+
+    def apply(self, recommendations: Sequence[IndexRecommendation]) -> None:
+        """Creates the recommended indexes for real and refreshes planner statistics."""
+        with self._writable():
+            for recommendation in recommendations:
+                self._conn.execute(recommendation.candidate.create_statement(if_not_exists=True))
+                print(f"Created index {recommendation.candidate.name}.")
+            if recommendations:
+                self._conn.execute("ANALYZE")
+
+
+def format_report(recommendations: Sequence[IndexRecommendation]) -> str:
+    if not recommendations:
+        return "No index recommendations: no logged query would get meaningfully faster."
+    lines = []
+    for r in recommendations:
+        lines.append(r.candidate.create_statement(if_not_exists=True) + ";")
+        lines.append(
+            f"  saves {r.saved_seconds * 1000:.1f} ms of {r.baseline_seconds * 1000:.1f} ms "
+            f"({r.saved_fraction:.0%}) across {len(r.queries)} logged quer{'y' if len(r.queries) == 1 else 'ies'}, "
+            f"weighted by execution count; builds in {r.build_seconds:.2f}s"
+        )
+        for sql in r.queries[:3]:
+            lines.append(f"    - {sql}")
+    return "\n".join(lines)
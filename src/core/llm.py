@@ -1,14 +1,29 @@
 import os
+from functools import lru_cache
+
 from dotenv import load_dotenv
 load_dotenv()
 
-from langchain.chat_models import init_chat_model
-
 
 def get_llm_instance():
+    # LLM_PROVIDER=fake swaps in an offline model for benchmarks and load tests.
+    if os.environ.get("LLM_PROVIDER") == "fake":
+        from .fake_llm import FakeChatModel, load_recordings
+
+        # FAKE_LLM_RECORDINGS points to recorded exchanges to replay (see fake_llm.py).
+        recordings_path = os.environ.get("FAKE_LLM_RECORDINGS")
+        return FakeChatModel(
+            latency=float(os.environ.get("FAKE_LLM_LATENCY", "0")),
+            token_latency=float(os.environ.get("FAKE_LLM_TOKEN_LATENCY", "0")),
+            recordings=load_recordings(recordings_path) if recordings_path else {},
+        )
+
     # Ensure API key is set, can be done in config.py
     if not os.environ["GOOGLE_API_KEY"]:
         raise ValueError("GOOGLE_API_KEY not set.")
+    # Imported here: loading the provider integration takes seconds.
+    from langchain.chat_models import init_chat_model
+
     llm = init_chat_model(
         os.environ["GOOGLE_MODEL"],
         model_provider="google_genai",
@@ -16,4 +31,19 @@ def get_llm_instance():
     )
     return llm
 
-llm_instance = get_llm_instance()
\ No newline at end of file
+@lru_cache(maxsize=None)
+def get_llm():
+    """The chat model shared by the graph nodes, created on first use."""
+    from .tracing import TokenUsageCallback
+
+    llm = get_llm_instance()
+    # Adds the tokens of every call to the trace span of the node that made it.
+    llm.callbacks = [TokenUsageCallback()]
+    return llm
+
+
+def __getattr__(name):
+    # `llm_instance` is created on first access rather than at import time.
+    if name == "llm_instance":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,4 +1,4 @@
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import AIMessage, SystemMessage, HumanMessage
 
 
@@ -118,6 +118,23 @@ answer_generation_prompt = ChatPromptTemplate.from_messages(
 )
 
 
+history_summary_prompt = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You maintain a short running summary of a conversation between a user and a data "
+            "assistant that answers questions with SQL. Keep the facts later questions may refer "
+            "to: metrics, filters, time ranges, categories and key numbers. Reply with the updated "
+            "summary only, in at most five short lines.",
+        ),
+        (
+            "human",
+            "Summary so far:\n{summary}\n\nNew turn to fold in:\nUser: {question}\nAssistant: {answer}",
+        ),
+    ]
+)
+
+
 def format_chat_history_for_prompt(chat_history: list) -> str:
     if not chat_history:
         return "No previous conversation history."
@@ -0,0 +1,114 @@
+import sys
+from array import array
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+# Column kinds. Homogeneous numeric columns are packed into typed arrays;
+# anything else (text, NULLs, mixed types) stays a plain list.
+INT_COLUMN = "int"
+FLOAT_COLUMN = "float"
+TEXT_COLUMN = "text"
+MIXED_COLUMN = "mixed"
+
+_ARRAY_TYPECODES = {INT_COLUMN: "q", FLOAT_COLUMN: "d"}
+_INT64_MIN, _INT64_MAX = -(2**63), 2**63 - 1
+
+
+def _infer_kind(values: Sequence[Any]) -> str:
+    if values and all(
+        type(v) is int and _INT64_MIN <= v <= _INT64_MAX for v in values
+    ):
+        return INT_COLUMN
+    if values and all(type(v) is float for v in values):
+        return FLOAT_COLUMN
+    if all(type(v) is str for v in values):
+        return TEXT_COLUMN
+    return MIXED_COLUMN
+
+
+@dataclass
+class QueryResult:
+    """
+    Columnar result of a SQL query.
+
+    Numeric columns are stored as packed `array` bytes so the object stays small when
+    the checkpointer serializes the graph state. Use `column()` / `rows()` to read the
+    data back and `to_prompt_text()` for the text handed to the LLM.
+    """
+
+    columns: List[str]
+    kinds: List[str]
+    data: List[Any]  # bytes for int/float columns, list otherwise
+    row_count: int
+    truncated: bool = False
+
+    @classmethod
+    def from_rows(
+        cls, columns: Sequence[str], rows: Sequence[Tuple], truncated: bool = False
+    ) -> "QueryResult":
+        kinds, data = [], []
+        for values in zip(*rows) if rows else [() for _ in columns]:
+            kind = _infer_kind(values)
+            kinds.append(kind)
+            if kind in _ARRAY_TYPECODES:
+                data.append(array(_ARRAY_TYPECODES[kind], values).tobytes())
+            else:
+                data.append(list(values))
+        return cls(
+            columns=list(columns),
+            kinds=kinds,
+            data=data,
+            row_count=len(rows),
+            truncated=truncated,
+        )
+
+    def column(self, index: int) -> Sequence[Any]:
+        """Returns a column as a typed array (numeric) or list."""
+        kind = self.kinds[index]
+        if kind in _ARRAY_TYPECODES:
+            values = array(_ARRAY_TYPECODES[kind])
+            values.frombytes(self.data[index])
+            return values
+        return self.data[index]
+
+    def rows(self) -> Iterator[Tuple]:
+        return zip(*(self.column(i) for i in range(len(self.columns))))
+
+    def to_dict(self) -> Dict[str, List[Any]]:
+        """Column name -> values, e.g. for `st.dataframe`."""
+        return {name: list(self.column(i)) for i, name in enumerate(self.columns)}
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory footprint, used by the result cache."""
+        size = sys.getsizeof(self)
+        for kind, values in zip(self.kinds, self.data):
+            if kind in _ARRAY_TYPECODES:
+                size += len(values)
+            else:
+                size += sys.getsizeof(values) + sum(sys.getsizeof(v) for v in values)
+        return size
+
+    @cached_property
+    def _prompt_text(self) -> str:
+        lines = [f"Columns: {', '.join(self.columns)}", f"Rows: {list(self.rows())}"]
+        if self.truncated:
+            lines.append(
+                f"(Result truncated to the first {self.row_count} rows.)"
+            )
+        return "\n".join(lines)
+
+    def to_prompt_text(self) -> str:
+        """Text rendering for prompts; built on first use and reused afterwards."""
+        return self._prompt_text
+
+    def __str__(self) -> str:
+        return self.to_prompt_text()
+
+
+def result_to_prompt_text(result: "QueryResult | str | None") -> str:
+    """Renders a state `result` (structured, or a skip/error message) for a prompt."""
+    if isinstance(result, QueryResult):
+        return result.to_prompt_text()
+    return "" if result is None else str(result)
@@ -0,0 +1,396 @@
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .sql_utils import Token, tokenize_sql
+
+
+# --- Rollup Definitions ---
+@dataclass(frozen=True)
+class RollupSpec:
+    """A pre-aggregated copy of `source`: one row per distinct `dimensions` value."""
+
+    name: str
+    source: str
+    dimensions: Tuple[str, ...]
+    measures: Tuple[str, ...]  # Summed per group; the rollup column keeps the name
+
+
+ROLLUPS = [
+    RollupSpec(
+        "rollup_activity_daily",
+        "user_activity",
+        ("date", "loyalty_category"),
+        ("total_revenue", "total_withdrawls", "total_bonus"),
+    ),
+    RollupSpec(
+        "rollup_game_summary_daily",
+        "user_game_summary",
+        ("date",),
+        ("games_count", "total_winnings", "wager", "point_game",
+         "total_cashgamecount", "total_gamewon", "total_gamelost"),
+    ),
+    RollupSpec(
+        "rollup_deposits_daily",
+        "user_deposits",
+        ("date",),
+        ("total_deposit", "deposit_count"),
+    ),
+]
+ROLLUP_META_TABLE = "rollup_meta"
+# One generation counter per source table, bumped by triggers on every write to it.
+SOURCE_GENERATIONS_TABLE = "rollup_source_generations"
+# Internal tables, hidden from the schema shown to the LLM.
+ROLLUP_TABLE_NAMES = [spec.name for spec in ROLLUPS] + [ROLLUP_META_TABLE, SOURCE_GENERATIONS_TABLE]
+ROW_COUNT_COLUMN = "row_count"  # Source rows per group; COUNT(*) becomes SUM(row_count)
+
+
+# --- Refresh Job ---
+def _create_change_triggers(conn: sqlite3.Connection, source: str) -> None:
+    """
+    Bumps the source's generation on every INSERT, UPDATE and DELETE, so telling whether
+    a rollup is stale is one key lookup instead of a scan of the source. The triggers
+    cost a small write per changed row; bulk loads run before they are created.
+    """
+    conn.execute(
+        f"INSERT OR IGNORE INTO {SOURCE_GENERATIONS_TABLE} (source, generation) VALUES (?, 0)", (source,)
+    )
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(
+            f'CREATE TRIGGER IF NOT EXISTS "rollup_{source}_{event.lower()}" AFTER {event} ON "{source}" '
+            f"BEGIN UPDATE {SOURCE_GENERATIONS_TABLE} SET generation = generation + 1 "
+            f"WHERE source = '{source}'; END"
+        )
+
+
+def _create_rollup_table(conn: sqlite3.Connection, spec: RollupSpec) -> None:
+    types = {row[1]: row[2] for row in conn.execute(f'PRAGMA table_info("{spec.source}")')}
+    columns = [f'"{d}" {types.get(d, "")}'.rstrip() for d in spec.dimensions]
+    columns.append(f"{ROW_COUNT_COLUMN} INTEGER NOT NULL")
+    columns += [f'"{m}" {types.get(m, "")}'.rstrip() for m in spec.measures]
+    keys = ", ".join(f'"{d}"' for d in spec.dimensions)
+    conn.execute(
+        f'CREATE TABLE IF NOT EXISTS "{spec.name}" ({", ".join(columns)}, PRIMARY KEY ({keys}))'
+    )
+
+
+def refresh_rollups(conn: sqlite3.Connection, rollups: Sequence[RollupSpec] = ROLLUPS) -> Dict[str, int]:
+    """
+    Rebuilds every rollup from its source table in one transaction and records the
+    source's generation in `rollup_meta`. Tables are emptied and refilled rather than
+    dropped, so the schema (and everything keyed on it) stays the same across refreshes.
+    Returns the number of rows per rollup.
+    """
+    meta_columns = {row[1] for row in conn.execute(f"PRAGMA table_info({ROLLUP_META_TABLE})")}
+    if meta_columns and "source_generation" not in meta_columns:
+        conn.execute(f"DROP TABLE {ROLLUP_META_TABLE}")  # Written before generations were recorded
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {ROLLUP_META_TABLE} ("
+        "rollup TEXT PRIMARY KEY, source_generation INTEGER NOT NULL, refreshed_at TEXT NOT NULL)"
+    )
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {SOURCE_GENERATIONS_TABLE} ("
+        "source TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+    )
+    for spec in rollups:
+        _create_rollup_table(conn, spec)
+        _create_change_triggers(conn, spec.source)
+    conn.commit()
+
+    counts = {}
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for spec in rollups:
+            dims = ", ".join(f'"{d}"' for d in spec.dimensions)
+            measures = ", ".join(f'"{m}"' for m in spec.measures)
+            sums = ", ".join(f'SUM("{m}")' for m in spec.measures)
+            conn.execute(f'DELETE FROM "{spec.name}"')
+            conn.execute(
+                f'INSERT INTO "{spec.name}" ({dims}, {ROW_COUNT_COLUMN}, {measures}) '
+                f'SELECT {dims}, COUNT(*), {sums} FROM "{spec.source}" GROUP BY {dims}'
+            )
+            conn.execute(
+                f"INSERT OR REPLACE INTO {ROLLUP_META_TABLE} "
+                f"SELECT ?, generation, ? FROM {SOURCE_GENERATIONS_TABLE} WHERE source = ?",
+                (spec.name, datetime.now(timezone.utc).isoformat(), spec.source),
+            )
+            counts[spec.name] = conn.execute(f'SELECT COUNT(*) FROM "{spec.name}"').fetchone()[0]
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return counts
+
+
+# --- Query Rewriting ---
+_AGGREGATES = {"SUM", "COUNT", "AVG", "TOTAL", "MIN", "MAX", "GROUP_CONCAT"}
+# Aggregates that give the same answer over a rollup's dimension columns.
+_DIMENSION_SAFE_AGGREGATES = {"MIN", "MAX"}
+# Constructs whose result depends on individual source rows.
+_UNSUPPORTED_KEYWORDS = {
+    "JOIN", "UNION", "INTERSECT", "EXCEPT", "WITH", "OVER", "FILTER", "WINDOW", "DISTINCT",
+}
+_CLAUSE_KEYWORDS = {"SELECT", "FROM", "WHERE", "GROUP", "HAVING", "ORDER", "LIMIT"}
+# Words after which the next word is an operand, not an implicit column alias.
+_OPERAND_KEYWORDS = {
+    "SELECT", "AS", "AND", "OR", "NOT", "IS", "IN", "LIKE", "GLOB", "BETWEEN",
+    "CASE", "WHEN", "THEN", "ELSE", "COLLATE", "ESCAPE",
+}
+
+
+def _name(token: Token) -> str:
+    return token.text.strip('"`[]').lower()
+
+
+def _is_implicit_alias(prev: Optional[Token], token: Token, nxt: Optional[Token]) -> bool:
+    """Whether `token` names a select-list item without AS, as in `COUNT(*) cnt,`."""
+    if token.kind not in ("word", "quoted") or token.text.upper() == "END" or prev is None:
+        return False
+    ends_expression = prev.text == ")" or (
+        prev.kind in ("word", "quoted", "string", "number") and prev.text.upper() not in _OPERAND_KEYWORDS
+    )
+    ends_item = nxt is None or nxt.text == "," or nxt.text.upper() in _CLAUSE_KEYWORDS
+    return ends_expression and ends_item
+
+
+def _parse_from(tokens: List[Token], sig: List[int], source: str) -> Optional[Tuple[Optional[str], int]]:
+    """
+    Parses `FROM <source> [[AS] alias]` followed by a clause keyword or the end.
+    Returns (alias, number of tokens from FROM to the end of the clause), or None.
+    """
+    pos = next(
+        (p for p, i in enumerate(sig) if tokens[i].kind == "word" and tokens[i].text.upper() == "FROM"),
+        None,
+    )
+    if pos is None or pos + 1 >= len(sig):
+        return None
+    table = tokens[sig[pos + 1]]
+    if table.kind not in ("word", "quoted") or _name(table) != source:
+        return None
+    rest = [tokens[i] for i in sig[pos + 2:pos + 5]]
+    alias, length = None, 2
+    if rest and rest[0].text.upper() == "AS":
+        rest, length = rest[1:], length + 1
+        if not rest or rest[0].kind not in ("word", "quoted"):
+            return None
+    if rest and rest[0].kind in ("word", "quoted") and rest[0].text.upper() not in _CLAUSE_KEYWORDS:
+        alias, rest, length = _name(rest[0]), rest[1:], length + 1
+    if rest and rest[0].text.upper() not in _CLAUSE_KEYWORDS:
+        return None  # Comma join or something we don't understand
+    return alias, length
+
+
+def rewrite_for_rollup(sql: str, spec: RollupSpec) -> Optional[str]:
+    """
+    Rewrites an aggregate query over `spec.source` to read `spec.name` instead, or
+    returns None if the rewrite would not be equivalent.
+
+    Accepted: a single SELECT from the source table (no joins, subqueries, windows or
+    DISTINCT) whose source columns are either dimensions, used anywhere except inside
+    aggregates other than MIN/MAX, or measures used only as `SUM(measure)`; `COUNT(*)`
+    becomes `COALESCE(SUM(row_count), 0)`. The query must aggregate. Result column names
+    are kept by aliasing rewritten select-list items with their original text, unless
+    they already have an alias (with or without AS).
+    References to source columns missing from the rollup are not detected here; the
+    rewritten query must still compile against the rollup (see `RollupRouter`).
+    """
+    tokens = tokenize_sql(sql)
+    sig = [i for i, t in enumerate(tokens) if t.kind not in ("ws", "comment")]
+    while sig and tokens[sig[-1]].text == ";":
+        sig.pop()
+    if not sig or tokens[sig[0]].text.upper() != "SELECT":
+        return None
+    words = [tokens[i].text.upper() for i in sig if tokens[i].kind == "word"]
+    if words.count("SELECT") != 1 or _UNSUPPORTED_KEYWORDS & set(words):
+        return None
+
+    dimensions = {d.lower() for d in spec.dimensions}
+    measures = {m.lower() for m in spec.measures}
+    replacements: Dict[int, str] = {}  # token index -> new text ("" drops the token)
+    output_aliases, select_items = set(), []
+    item_start, item_has_alias, item_changed = 1, False, False
+    clause, depth, functions = "SELECT", 0, []  # functions: enclosing call per paren level
+    has_aggregate = has_group_by = bare_dimension_in_select = False
+    from_clause = _parse_from(tokens, sig, spec.source)
+    if from_clause is None:
+        return None
+    table_alias, from_length = from_clause
+
+    pos = 0
+    while pos < len(sig):
+        token = tokens[sig[pos]]
+        prev = tokens[sig[pos - 1]] if pos > 0 else None
+        nxt = tokens[sig[pos + 1]] if pos + 1 < len(sig) else None
+        upper = token.text.upper()
+
+        if token.kind == "word" and upper in _CLAUSE_KEYWORDS and depth == 0:
+            if clause == "SELECT":
+                select_items.append((item_start, pos, item_has_alias, item_changed))
+            clause = upper
+            has_group_by = has_group_by or upper == "GROUP"
+            if upper == "FROM":
+                alias = "" if table_alias else f' AS "{spec.source}"'
+                replacements[sig[pos + 1]] = f'"{spec.name}"{alias}'
+                pos += from_length
+                continue
+            pos += 1
+            continue
+
+        if token.text == "(":
+            functions.append(prev.text.upper() if prev is not None and prev.kind == "word" else None)
+            depth += 1
+        elif token.text == ")":
+            if not functions:
+                return None
+            functions.pop()
+            depth -= 1
+        elif token.text == "," and depth == 0 and clause == "SELECT":
+            select_items.append((item_start, pos, item_has_alias, item_changed))
+            item_start, item_has_alias, item_changed = pos + 1, False, False
+        elif upper == "AS" and clause == "SELECT" and depth == 0:
+            item_has_alias = True
+            if nxt is not None:
+                output_aliases.add(_name(nxt))
+            pos += 2
+            continue
+        elif clause == "SELECT" and depth == 0 and _is_implicit_alias(prev, token, nxt):
+            item_has_alias = True
+            output_aliases.add(_name(token))
+            pos += 1
+            continue
+        elif token.text == "*":
+            if upper == "*" and prev is not None and prev.text == "(" and functions[-1:] == ["COUNT"]:
+                if nxt is None or nxt.text != ")":
+                    return None
+                # COUNT ( * ) -> COALESCE(SUM(row_count), 0), which is also 0 on no rows.
+                replacements[sig[pos - 2]] = f"COALESCE(SUM({ROW_COUNT_COLUMN}), 0)"
+                replacements[sig[pos - 1]] = ""
+                replacements[sig[pos]] = ""
+                replacements[sig[pos + 1]] = ""
+                has_aggregate = True
+                item_changed = item_changed or clause == "SELECT"
+                functions.pop()
+                depth -= 1
+                pos += 2
+                continue
+            if prev is None or prev.text in (",", ".") or prev.text.upper() == "SELECT":
+                return None  # SELECT * / t.*
+        elif token.kind in ("word", "quoted"):
+            name = _name(token)
+            if upper in _AGGREGATES and nxt is not None and nxt.text == "(":
+                args = [tokens[i] for i in sig[pos + 2:pos + 6]]
+                if upper == "COUNT":
+                    if [t.text for t in args[:2]] != ["*", ")"]:
+                        return None  # COUNT(expr) counts source rows; only COUNT(*) maps
+                elif upper == "SUM":
+                    if not (
+                        (len(args) >= 2 and _name(args[0]) in measures and args[1].text == ")")
+                        or (len(args) >= 4 and args[1].text == "." and _name(args[2]) in measures
+                            and args[3].text == ")")
+                    ):
+                        return None  # SUM of anything but a bare measure column
+                elif upper not in _DIMENSION_SAFE_AGGREGATES:
+                    return None
+                has_aggregate = True
+            elif nxt is not None and nxt.text == ".":
+                if name not in (spec.source, table_alias):
+                    return None
+            elif name in dimensions or name in measures:
+                qualified = prev is not None and prev.text == "."
+                if qualified and _name(tokens[sig[pos - 2]]) not in (spec.source, table_alias):
+                    return None
+                if name not in dimensions and clause == "ORDER" and name in output_aliases and not qualified:
+                    pass  # ORDER BY an output alias that shadows a measure name
+                elif name in dimensions:
+                    enclosing = next((f for f in reversed(functions) if f in _AGGREGATES), None)
+                    if enclosing is not None and enclosing not in _DIMENSION_SAFE_AGGREGATES:
+                        return None
+                    if enclosing is None and clause == "SELECT":
+                        bare_dimension_in_select = True
+                else:
+                    # Only SUM(measure) / SUM(t.measure) survive the rollup.
+                    start = pos - 2 if qualified else pos
+                    if not (
+                        start >= 2
+                        and tokens[sig[start - 1]].text == "("
+                        and tokens[sig[start - 2]].text.upper() == "SUM"
+                        and nxt is not None and nxt.text == ")"
+                    ):
+                        return None
+            elif prev is not None and prev.text == ".":
+                return None  # A source column that is neither a dimension nor a measure
+            # Other identifiers are keywords, functions, output aliases, or source columns
+            # the rollup lacks (e.g. userid); the last fail to compile against the
+            # rollup, which `RollupRouter` checks before using a rewrite.
+        pos += 1
+
+    if not (has_aggregate or has_group_by):
+        return None  # Row-level query: the rollup has one row per group, not per source row
+    if bare_dimension_in_select and not has_group_by:
+        return None  # SQLite would pick the value from an arbitrary source row
+    if not any(r.startswith('"' + spec.name) for r in replacements.values()):
+        return None
+
+    # Keep the result column names the original query would have produced.
+    for start, end, has_alias, changed in select_items:
+        if changed and not has_alias:
+            original = "".join(t.text for t in tokens[sig[start]:sig[end - 1] + 1]).strip()
+            last = sig[end - 1]
+            replacements[last] = replacements.get(last, tokens[last].text) + f' AS "{original}"'
+
+    rewritten = "".join(replacements.get(i, t.text) for i, t in enumerate(tokens))
+    return rewritten
+
+
+class RollupRouter:
+    """
+    Routes aggregate queries to rollup tables when an equivalent rewrite exists and the
+    rollup is up to date: its source's generation, bumped by triggers on every write, is
+    the one recorded at the last refresh. Freshness is re-checked (two small key reads,
+    no scan of the sources) only when the data version token changes.
+    """
+
+    def __init__(self, connect: Callable[[], "sqlite3.Connection"], rollups: Sequence[RollupSpec] = ROLLUPS):
+        self._connect = connect  # Returns a context manager yielding a connection
+        self.rollups = list(rollups)
+        self._lock = threading.Lock()
+        self._token = None
+        self._fresh: List[RollupSpec] = []
+        self.rewrites = 0
+
+    def fresh_rollups(self, token) -> List[RollupSpec]:
+        with self._lock:
+            if token is not None and token == self._token:
+                return self._fresh
+        fresh = []
+        with self._connect() as conn:
+            try:
+                recorded = dict(conn.execute(f"SELECT rollup, source_generation FROM {ROLLUP_META_TABLE}"))
+                current = dict(conn.execute(f"SELECT source, generation FROM {SOURCE_GENERATIONS_TABLE}"))
+            except sqlite3.OperationalError:
+                recorded, current = {}, {}  # Rollups never built, or built before generations were recorded
+            for spec in self.rollups:
+                if spec.name in recorded and recorded[spec.name] == current.get(spec.source):
+                    fresh.append(spec)
+        with self._lock:
+            self._token, self._fresh = token, fresh
+        return fresh
+
+    def rewrite(self, sql: str, token=None) -> Optional[str]:
+        """The query rewritten against a fresh rollup, or None to run it as is."""
+        for spec in self.rollups:
+            if spec.source not in sql.lower():
+                continue
+            rewritten = rewrite_for_rollup(sql, spec)
+            if rewritten is None or spec not in self.fresh_rollups(token):
+                continue
+            with self._connect() as conn:
+                try:
+                    conn.execute(f"EXPLAIN QUERY PLAN {rewritten}").fetchall()
+                except sqlite3.Error:
+                    continue  # Uses a column the rollup does not have
+            self.rewrites += 1
+            return rewritten
+        return None
@@ -0,0 +1,227 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+# --- Schema Descriptions ---
+# Words users are likely to use for each table and column, in addition to the names.
+TABLE_DESCRIPTIONS = {
+    "user_activity": "player activity revenue withdrawals bonus loyalty tier status level vip",
+    "user_game_summary": "games played gameplay matches wins losses winnings wager bets stakes points cash",
+    "user_deposits": "deposits payments money added top ups funding",
+}
+COLUMN_DESCRIPTIONS = {
+    ("user_activity", "loyalty_category"): "loyalty tier level status vip segment bronze silver gold platinum diamond",
+    ("user_activity", "total_revenue"): "revenue income earnings",
+    ("user_activity", "total_withdrawls"): "withdrawals cash out payouts",
+    ("user_activity", "total_bonus"): "bonus bonuses promotions rewards",
+    ("user_game_summary", "games_count"): "games played number of games count matches",
+    ("user_game_summary", "total_winnings"): "winnings prize money won",
+    ("user_game_summary", "wager"): "wager wagered bets stakes amount bet",
+    ("user_game_summary", "point_game"): "point games free games",
+    ("user_game_summary", "total_cashgamecount"): "cash games paid games",
+    ("user_game_summary", "total_gamewon"): "games won wins win rate",
+    ("user_game_summary", "total_gamelost"): "games lost losses",
+    ("user_deposits", "total_deposit"): "deposit amount money deposited",
+    ("user_deposits", "deposit_count"): "number of deposits deposit count transactions",
+}
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "did", "do", "does", "for",
+    "from", "get", "give", "has", "have", "how", "i", "in", "is", "it", "list", "many",
+    "me", "much", "of", "on", "or", "per", "please", "show", "tell", "than", "that", "the",
+    "their", "to", "was", "were", "what", "which", "who", "with", "each", "all",
+    # Prefix of most measure columns; in a question it just means "sum".
+    "total",
+}
+
+
+def tokenize_text(text: str) -> List[str]:
+    """Lower-cased word stems; identifiers are split on underscores."""
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text.lower().replace("_", " ")):
+        if word in _STOPWORDS:
+            continue
+        tokens.append(_stem(word))
+    return tokens
+
+
+def _stem(word: str) -> str:
+    """Just enough stemming to match plurals and past tenses ("deposits", "deposited")."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("sses", "ches", "shes", "xes", "zes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+    if len(word) > 5 and word.endswith("ed"):
+        word = word[:-2]
+    return word
+
+
+class BM25Index:
+    """Okapi BM25 over a handful of short documents (table and column descriptions)."""
+
+    def __init__(self, documents: Dict[Hashable, List[str]], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._terms = {key: Counter(tokens) for key, tokens in documents.items()}
+        self._lengths = {key: len(tokens) for key, tokens in documents.items()}
+        self._avg_length = sum(self._lengths.values()) / max(len(documents), 1)
+        document_frequency = Counter(term for counts in self._terms.values() for term in counts)
+        n = len(documents)
+        self._idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    def scores(self, query_tokens: Sequence[str]) -> Dict[Hashable, float]:
+        scores = {}
+        for key, counts in self._terms.items():
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[key] / (self._avg_length or 1))
+            score = 0.0
+            for term in set(query_tokens):
+                tf = counts.get(term)
+                if tf:
+                    score += self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores[key] = score
+        return scores
+
+
+# --- Table Info Parsing ---
+_CONSTRAINT_PREFIXES = ("PRIMARY KEY", "FOREIGN KEY", "UNIQUE", "CHECK", "CONSTRAINT")
+_TABLE_INFO_RE = re.compile(
+    r"^(?P<head>\s*CREATE TABLE [^\n]*\(\n)(?P<body>.*?)(?P<tail>\n\)[^\n]*)"
+    r"(?:\n\n/\*\n(?P<sample_title>[^\n]*\n)(?P<sample>.*?)\n\*/)?$",
+    re.DOTALL,
+)
+
+
+def table_columns(table_info: str) -> Tuple[List[str], List[str]]:
+    """(columns, primary-key columns) of one table's info text."""
+    match = _TABLE_INFO_RE.match(table_info)
+    if match is None:
+        return [], []
+    columns, keys = [], []
+    for entry in match.group("body").split(", \n"):
+        entry = entry.strip()
+        if entry.upper().startswith("PRIMARY KEY"):
+            keys += [c.strip().strip('"') for c in entry[entry.index("(") + 1:entry.rindex(")")].split(",")]
+        elif not entry.upper().startswith(_CONSTRAINT_PREFIXES):
+            name = entry.split()[0].strip('"')
+            columns.append(name)
+            if "PRIMARY KEY" in entry.upper():
+                keys.append(name)
+    return columns, keys
+
+
+def prune_table_info(table_info: str, keep: Sequence[str]) -> str:
+    """Drops the columns not in `keep` from one table's CREATE TABLE and sample rows."""
+    match = _TABLE_INFO_RE.match(table_info)
+    if match is None:
+        return table_info
+    keep = set(keep)
+    entries = [
+        entry for entry in match.group("body").split(", \n")
+        if entry.strip().upper().startswith(_CONSTRAINT_PREFIXES)
+        or entry.split()[0].strip('"') in keep
+    ]
+    text = match.group("head") + ", \n".join(entries) + match.group("tail")
+    if match.group("sample_title") is not None:
+        lines = match.group("sample").split("\n")
+        header = lines[0].split("\t")
+        indexes = [i for i, name in enumerate(header) if name in keep]
+        rows = ["\t".join(row.split("\t")[i] for i in indexes) for row in lines]
+        text += "\n\n/*\n" + match.group("sample_title") + "\n".join(rows) + "\n*/"
+    return text
+
+
+# --- Schema Pruner ---
+# (fingerprint, table infos, table -> (columns, keys), table index, column index)
+_PrunerIndex = Tuple[str, Dict[str, str], Dict[str, Tuple[List[str], List[str]]], BM25Index, BM25Index]
+
+
+class SchemaPruner:
+    """
+    Picks the tables and columns relevant to a question with BM25 over table and
+    column names plus the descriptions above, and renders only that part of the cached
+    schema. Tables scoring at least `min_score_ratio` of the best table are kept. Within
+    a kept table, primary-key columns (needed for joins) and matching columns are kept;
+    if no column matched, the whole table is. Returns None when nothing matches, so the
+    caller can fall back to the full schema.
+    """
+
+    def __init__(self, schema_cache, min_score_ratio: float = 0.3):
+        self._schema_cache = schema_cache
+        self.min_score_ratio = min_score_ratio
+        # Replaced as a whole under the lock, so concurrent readers (sync and async
+        # graphs, batch runner, server) never mix parts of two schema versions.
+        self._index: Optional[_PrunerIndex] = None
+        self._lock = threading.Lock()
+
+    def _build(self, schema=None) -> _PrunerIndex:
+        """The index for the current schema; rebuilt outside the lock when the schema changed."""
+        fingerprint = (schema or self._schema_cache.snapshot()).fingerprint
+        with self._lock:
+            if self._index is not None and self._index[0] == fingerprint:
+                return self._index
+        table_infos = self._schema_cache.get_table_infos()
+        columns = {t: table_columns(info) for t, info in table_infos.items()}
+        table_index = BM25Index({
+            table: tokenize_text(f"{table} {TABLE_DESCRIPTIONS.get(table, '')}")
+            for table in table_infos
+        })
+        column_index = BM25Index({
+            (table, column): tokenize_text(f"{column} {COLUMN_DESCRIPTIONS.get((table, column), '')}")
+            for table, (table_cols, _) in columns.items()
+            for column in table_cols
+        })
+        index = (fingerprint, table_infos, columns, table_index, column_index)
+        with self._lock:
+            self._index = index
+        return index
+
+    def select(self, text: str, schema=None) -> Optional[Dict[str, List[str]]]:
+        """
+        Table -> columns to show, or None if the text matches nothing in the schema.
+        `schema` is a SchemaSnapshot the caller already holds; one is taken otherwise.
+        """
+        return self._select(text, self._build(schema))
+
+    def _select(self, text: str, index: _PrunerIndex) -> Optional[Dict[str, List[str]]]:
+        _, _, all_columns, table_index, column_index = index
+        query = tokenize_text(text)
+        column_scores = column_index.scores(query)
+        table_scores = table_index.scores(query)
+        # A table counts as much as its description plus its best-matching column, so
+        # wide tables with many loosely matching columns don't crowd out the others.
+        best_column: Dict[str, float] = {}
+        for (table, _), score in column_scores.items():
+            best_column[table] = max(best_column.get(table, 0.0), score)
+        for table, score in best_column.items():
+            table_scores[table] = table_scores.get(table, 0.0) + score
+        best = max(table_scores.values(), default=0.0)
+        if best <= 0:
+            return None
+
+        selection = {}
+        for table, score in table_scores.items():
+            if score < best * self.min_score_ratio:
+                continue
+            columns, keys = all_columns[table]
+            matched = {c for c in columns if column_scores.get((table, c), 0.0) > 0}
+            selection[table] = [c for c in columns if c in matched or c in keys] if matched else columns
+        return selection
+
+    def table_info_for(self, text: str, schema=None) -> Optional[str]:
+        """The pruned table info for a question, or None to use the full schema."""
+        index = self._build(schema)
+        selection = self._select(text, index)
+        if selection is None:
+            return None
+        table_infos = index[1]
+        return "\n\n".join(
+            prune_table_info(table_infos[table], columns)
+            for table, columns in selection.items()
+        )
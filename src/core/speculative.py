@@ -0,0 +1,101 @@
+import asyncio
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from .executor import QueryGuard, sql_executor
+from .sql_utils import canonicalize_sql
+
+
+# "off" retries serially through write_query; "fan_out" makes one LLM call per candidate;
+# "multi" asks for all candidates in a single call.
+SPECULATIVE_RETRY_MODES = ("off", "fan_out", "multi")
+
+
+def unique_candidates(queries: Iterable[str]) -> List[str]:
+    """Non-empty queries in their original order, without repeats (ignoring formatting)."""
+    candidates, seen = [], set()
+    for query in queries:
+        query = (query or "").strip()
+        key = canonicalize_sql(query)
+        if key and key not in seen:
+            seen.add(key)
+            candidates.append(query)
+    return candidates
+
+
+@dataclass
+class CandidateOutcome:
+    index: int
+    query: str
+    result: Any = None
+    error: Optional[Exception] = None
+
+
+# `run(query, guard)` validates and executes one candidate; it runs on the SQL executor,
+# and `guard` is cancelled once another candidate has won.
+CandidateRunner = Callable[[str, QueryGuard], Any]
+
+
+def first_success(
+    candidates: List[str], run: CandidateRunner
+) -> Tuple[Optional[CandidateOutcome], List[CandidateOutcome]]:
+    """
+    Runs all candidates concurrently and returns (first to succeed, failures so far).
+    The winner is the first to finish without an error, not the first in the list;
+    the others are cancelled. Without a winner, all failures are returned in list order.
+    """
+    guards = [QueryGuard() for _ in candidates]
+    futures = {
+        sql_executor.submit(run, query, guard): CandidateOutcome(i, query)
+        for i, (query, guard) in enumerate(zip(candidates, guards))
+    }
+    failures: List[CandidateOutcome] = []
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in sorted(done, key=lambda f: futures[f].index):
+            outcome = futures[future]
+            try:
+                outcome.result = future.result()
+            except Exception as e:
+                outcome.error = e
+                failures.append(outcome)
+                continue
+            for other in pending:
+                other.cancel()
+                guards[futures[other].index].cancel()
+            return outcome, sorted(failures, key=lambda o: o.index)
+    return None, sorted(failures, key=lambda o: o.index)
+
+
+async def afirst_success(
+    candidates: List[str], run: CandidateRunner
+) -> Tuple[Optional[CandidateOutcome], List[CandidateOutcome]]:
+    """Async variant of `first_success`; awaits the candidates instead of blocking."""
+    loop = asyncio.get_running_loop()
+    guards = [QueryGuard() for _ in candidates]
+    futures = {
+        loop.run_in_executor(sql_executor, run, query, guard): CandidateOutcome(i, query)
+        for i, (query, guard) in enumerate(zip(candidates, guards))
+    }
+    failures: List[CandidateOutcome] = []
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: futures[f].index):
+                outcome = futures[future]
+                try:
+                    outcome.result = future.result()
+                except Exception as e:
+                    outcome.error = e
+                    failures.append(outcome)
+                    continue
+                return outcome, sorted(failures, key=lambda o: o.index)
+        return None, sorted(failures, key=lambda o: o.index)
+    finally:
+        # Losers, and every candidate if the question itself was cancelled.
+        for future in pending:
+            future.cancel()
+            guards[futures[future].index].cancel()
@@ -0,0 +1,59 @@
+import re
+from typing import List, NamedTuple
+
+
+# --- Lightweight SQL Tokenizer ---
+# Good enough to tell keywords, identifiers and literals apart in the SELECT
+# statements the LLM produces; it is not a full SQL parser.
+_TOKEN_RE = re.compile(
+    r"""
+      (?P<ws>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>'(?:[^']|'')*')
+    | (?P<quoted>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+    | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+)
+    | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    | (?P<param>[?:@$][A-Za-z0-9_]*)
+    | (?P<op><=|>=|<>|!=|==|\|\||<<|>>|[-+*/%<>=~&|(),.;])
+    """,
+    re.DOTALL | re.VERBOSE,
+)
+
+
+class Token(NamedTuple):
+    kind: str  # ws, comment, string, quoted, number, word, param, op or other
+    text: str
+
+
+def tokenize_sql(sql: str) -> List[Token]:
+    """Splits SQL into tokens, keeping whitespace and comments so the text can be rebuilt."""
+    tokens = []
+    pos = 0
+    while pos < len(sql):
+        match = _TOKEN_RE.match(sql, pos)
+        if match is None:
+            tokens.append(Token("other", sql[pos]))
+            pos += 1
+            continue
+        tokens.append(Token(match.lastgroup, match.group()))
+        pos = match.end()
+    return tokens
+
+
+def significant_tokens(sql: str) -> List[Token]:
+    """Tokens without whitespace and comments."""
+    return [t for t in tokenize_sql(sql) if t.kind not in ("ws", "comment")]
+
+
+def canonicalize_sql(sql: str) -> str:
+    """
+    Produces a canonical form of a query for use as a cache key: comments and trailing
+    semicolons dropped, whitespace collapsed and bare words upper-cased (SQLite keywords
+    and identifiers are case-insensitive). String literals are left untouched.
+    """
+    parts = []
+    for token in significant_tokens(sql):
+        parts.append(token.text.upper() if token.kind == "word" else token.text)
+    while parts and parts[-1] == ";":
+        parts.pop()
+    return " ".join(parts)
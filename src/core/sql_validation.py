@@ -0,0 +1,457 @@
+import difflib
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Callable, ContextManager, Dict, List, Optional, Sequence, Set, Tuple
+
+from .sql_utils import Token, significant_tokens
+
+
+class SQLValidationError(Exception):
+    """
+    Generated SQL rejected before it ran. `kind` is one of "invalid_sql", "unsafe_sql",
+    "unknown_table", "unknown_column", "cross_join" or "too_expensive".
+    """
+
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+
+VALIDATION_ERROR_KINDS = frozenset(
+    {"invalid_sql", "unsafe_sql", "unknown_table", "unknown_column", "cross_join", "too_expensive"}
+)
+
+# SQLite's keywords (https://sqlite.org/lang_keywords.html), plus TRUE and FALSE. Words in
+# this set are never checked as column names.
+SQLITE_KEYWORDS = frozenset("""
+    ABORT ACTION ADD AFTER ALL ALTER ALWAYS ANALYZE AND AS ASC ATTACH AUTOINCREMENT BEFORE
+    BEGIN BETWEEN BY CASCADE CASE CAST CHECK COLLATE COLUMN COMMIT CONFLICT CONSTRAINT
+    CREATE CROSS CURRENT CURRENT_DATE CURRENT_TIME CURRENT_TIMESTAMP DATABASE DEFAULT
+    DEFERRABLE DEFERRED DELETE DESC DETACH DISTINCT DO DROP EACH ELSE END ESCAPE EXCEPT
+    EXCLUDE EXCLUSIVE EXISTS EXPLAIN FAIL FILTER FIRST FOLLOWING FOR FOREIGN FROM FULL
+    GENERATED GLOB GROUP GROUPS HAVING IF IGNORE IMMEDIATE IN INDEX INDEXED INITIALLY INNER
+    INSERT INSTEAD INTERSECT INTO IS ISNULL JOIN KEY LAST LEFT LIKE LIMIT MATCH MATERIALIZED
+    NATURAL NO NOT NOTHING NOTNULL NULL NULLS OF OFFSET ON OR ORDER OTHERS OUTER OVER
+    PARTITION PLAN PRAGMA PRECEDING PRIMARY QUERY RAISE RANGE RECURSIVE REFERENCES REGEXP
+    REINDEX RELEASE RENAME REPLACE RESTRICT RETURNING RIGHT ROLLBACK ROW ROWS SAVEPOINT
+    SELECT SET TABLE TEMP TEMPORARY THEN TIES TO TRANSACTION TRIGGER UNBOUNDED UNION UNIQUE
+    UPDATE USING VACUUM VALUES VIEW VIRTUAL WHEN WHERE WINDOW WITH WITHOUT TRUE FALSE
+""".split())
+# Statements (or clauses) that write or change the connection; a keyword followed by
+# "(" is a function call (e.g. REPLACE(...)) and is allowed.
+_WRITE_KEYWORDS = frozenset({
+    "INSERT", "UPDATE", "DELETE", "REPLACE", "UPSERT", "DROP", "CREATE", "ALTER", "ATTACH",
+    "DETACH", "PRAGMA", "VACUUM", "REINDEX", "ANALYZE", "BEGIN", "COMMIT", "ROLLBACK",
+    "SAVEPOINT", "RELEASE", "RETURNING",
+})
+# The next identifier after these is a name SQLite resolves elsewhere (window, collation, index).
+_NAME_INTRODUCERS = frozenset({"OVER", "WINDOW", "COLLATE"})
+_ROWID_ALIASES = frozenset({"rowid", "oid", "_rowid_"})
+_SCHEMA_NAMES = frozenset({"main", "temp"})
+
+
+# --- Parsing ---
+def _name(token: Token) -> str:
+    return token.text.strip('"`[]').lower()
+
+
+def _is_keyword(token: Token) -> bool:
+    return token.kind == "word" and token.text.upper() in SQLITE_KEYWORDS
+
+
+def _is_identifier(token: Optional[Token]) -> bool:
+    return token is not None and token.kind in ("word", "quoted") and not _is_keyword(token)
+
+
+def _statement_tokens(sql: str) -> List[Token]:
+    """Significant tokens of a single statement, trailing semicolons dropped."""
+    tokens = significant_tokens(sql)
+    while tokens and tokens[-1].text == ";":
+        tokens.pop()
+    if not tokens:
+        raise SQLValidationError("invalid_sql", "The query is empty.")
+    if any(t.text == ";" for t in tokens):
+        raise SQLValidationError(
+            "invalid_sql", "Only one SQL statement can be run at a time; remove everything after the first ';'."
+        )
+    return tokens
+
+
+def _matching_parens(tokens: List[Token]) -> Dict[int, int]:
+    matches, stack = {}, []
+    for i, token in enumerate(tokens):
+        if token.text == "(":
+            stack.append(i)
+        elif token.text == ")":
+            if not stack:
+                raise SQLValidationError("invalid_sql", "Unbalanced parentheses: unexpected ')'.")
+            matches[stack.pop()] = i
+    if stack:
+        raise SQLValidationError("invalid_sql", "Unbalanced parentheses: missing ')'.")
+    return matches
+
+
+def check_read_only(sql: str) -> List[Token]:
+    """Raises unless `sql` is a single SELECT (optionally with a WITH clause). Returns its tokens."""
+    tokens = _statement_tokens(sql)
+    first = tokens[0].text.upper()
+    if first not in ("SELECT", "WITH"):
+        if first in SQLITE_KEYWORDS or first in _WRITE_KEYWORDS:
+            raise SQLValidationError(
+                "unsafe_sql", f"Only read-only SELECT queries are allowed, but the query starts with {first}."
+            )
+        raise SQLValidationError("invalid_sql", f"The query must start with SELECT or WITH, not '{tokens[0].text}'.")
+    for i, token in enumerate(tokens):
+        upper = token.text.upper()
+        is_call = i + 1 < len(tokens) and tokens[i + 1].text == "("
+        if token.kind == "word" and upper in _WRITE_KEYWORDS and not is_call:
+            raise SQLValidationError(
+                "unsafe_sql", f"Only read-only SELECT queries are allowed; the query contains {upper}."
+            )
+    return tokens
+
+
+@dataclass
+class QueryReferences:
+    """The names a statement refers to, from a token scan (not a full parse)."""
+
+    # Alias (or table name) -> table name; None for subqueries, CTEs and table functions.
+    sources: Dict[str, Optional[str]] = field(default_factory=dict)
+    tables: List[str] = field(default_factory=list)  # Tables read in FROM/JOIN, not CTEs
+    ctes: Set[str] = field(default_factory=set)
+    aliases: Set[str] = field(default_factory=set)  # Output, CTE column and other local names
+    qualified_columns: List[Tuple[str, str]] = field(default_factory=list)
+    columns: List[str] = field(default_factory=list)  # Unqualified, unquoted column names
+    # Whether anything is read from a subquery, CTE or table function, whose columns
+    # are not in the schema.
+    has_derived_sources: bool = False
+
+
+def _parse_source(tokens: List[Token], pos: int, parens: Dict[int, int], refs: QueryReferences) -> int:
+    """Parses one `table [[AS] alias]` or `(subquery) [[AS] alias]`; returns the next position."""
+    if pos >= len(tokens):
+        return pos
+    table = None
+    if tokens[pos].text == "(":
+        pos = parens[pos] + 1
+        default_alias = None
+    elif _is_identifier(tokens[pos]):
+        table = default_alias = _name(tokens[pos])
+        pos += 1
+        if pos + 1 < len(tokens) and tokens[pos].text == "." and table in _SCHEMA_NAMES:
+            table = default_alias = _name(tokens[pos + 1])
+            pos += 2
+        if pos < len(tokens) and tokens[pos].text == "(":
+            table, pos = None, parens[pos] + 1  # Table-valued function, e.g. json_each(...)
+    else:
+        return pos
+
+    alias = default_alias
+    if pos + 1 < len(tokens) and tokens[pos].text.upper() == "AS":
+        alias, pos = _name(tokens[pos + 1]), pos + 2
+    elif pos < len(tokens) and _is_identifier(tokens[pos]):
+        alias, pos = _name(tokens[pos]), pos + 1
+    if table is not None and table in refs.ctes:
+        table = None
+    if table is None:
+        refs.has_derived_sources = True
+    else:
+        refs.tables.append(table)
+    if alias is not None:
+        refs.sources[alias] = table
+    if table is not None:
+        refs.sources.setdefault(table, table)
+    if pos + 2 < len(tokens) and tokens[pos].text.upper() == "INDEXED" and tokens[pos + 1].text.upper() == "BY":
+        refs.aliases.add(_name(tokens[pos + 2]))
+        pos += 3
+    return pos
+
+
+def find_references(tokens: List[Token]) -> QueryReferences:
+    refs = QueryReferences()
+    parens = _matching_parens(tokens)
+
+    # CTE names (and their column lists) first, so FROM clauses can tell them from tables.
+    for i, token in enumerate(tokens):
+        if not _is_identifier(token) or i + 1 >= len(tokens):
+            continue
+        j = i + 1
+        if tokens[j].text == "(" and parens[j] + 1 < len(tokens) and tokens[parens[j] + 1].text.upper() == "AS":
+            column_list = tokens[j + 1:parens[j]]
+            j = parens[j] + 1
+        else:
+            column_list = []
+        if tokens[j].text.upper() != "AS":
+            continue
+        rest = [t.text.upper() for t in tokens[j + 1:j + 4]]
+        if rest[:1] == ["("] or rest[:2] == ["MATERIALIZED", "("] or rest[:3] == ["NOT", "MATERIALIZED", "("]:
+            refs.ctes.add(_name(token))
+            refs.aliases.update(_name(t) for t in column_list if _is_identifier(t))
+
+    for i, token in enumerate(tokens):
+        upper = token.text.upper() if token.kind == "word" else None
+        prev = tokens[i - 1] if i > 0 else None
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+
+        if upper == "FROM" and not (prev is not None and prev.text.upper() == "DISTINCT"):
+            pos = _parse_source(tokens, i + 1, parens, refs)
+            while pos < len(tokens) and tokens[pos].text == ",":
+                pos = _parse_source(tokens, pos + 1, parens, refs)
+        elif upper == "JOIN":
+            _parse_source(tokens, i + 1, parens, refs)
+        elif upper == "AS" and _is_identifier(nxt):
+            refs.aliases.add(_name(nxt))
+        elif upper in _NAME_INTRODUCERS and _is_identifier(nxt):
+            refs.aliases.add(_name(nxt))
+        elif _is_identifier(token):
+            if nxt is not None and nxt.text == ".":
+                continue  # Qualifier; the column after the dot is recorded below
+            if prev is not None and prev.text == "." and i >= 2:
+                refs.qualified_columns.append((_name(tokens[i - 2]), _name(token)))
+                continue
+            if nxt is not None and nxt.text == "(":
+                continue  # Function call
+            # `expr alias`: an identifier right after an operand is an implicit alias.
+            if prev is not None and (
+                prev.kind in ("quoted", "number", "string")
+                or prev.text == ")"
+                or _is_identifier(prev)
+                or prev.text.upper() == "END"
+            ):
+                refs.aliases.add(_name(token))
+                continue
+            if token.kind == "word":
+                refs.columns.append(_name(token))
+    return refs
+
+
+def _suggestion(name: str, candidates: Sequence[str]) -> str:
+    close = difflib.get_close_matches(name, list(candidates), n=1, cutoff=0.6)
+    return f" Did you mean '{close[0]}'?" if close else ""
+
+
+def check_names(tokens: List[Token], table_columns: Dict[str, Sequence[str]]) -> QueryReferences:
+    """
+    Raises on tables, and on columns of known tables, that are not in `table_columns`
+    (table -> column names, lower-case). Unqualified columns are only checked when every
+    FROM/JOIN source is a real table, since CTE and subquery columns are not known here.
+    """
+    refs = find_references(tokens)
+    known = {table: set(columns) for table, columns in table_columns.items()}
+
+    for table in refs.tables:
+        if table not in known:
+            raise SQLValidationError(
+                "unknown_table",
+                f"no such table: {table}.{_suggestion(table, known)} Available tables: {', '.join(sorted(known))}.",
+            )
+
+    for qualifier, column in refs.qualified_columns:
+        if qualifier in _SCHEMA_NAMES or column in _ROWID_ALIASES:
+            continue
+        if qualifier not in refs.sources:
+            if qualifier in refs.ctes:
+                continue
+            raise SQLValidationError(
+                "unknown_column",
+                f"no such column: {qualifier}.{column} ('{qualifier}' is not a table or alias in the query).",
+            )
+        table = refs.sources[qualifier]
+        if table is not None and table in known and column not in known[table]:
+            raise SQLValidationError(
+                "unknown_column",
+                f"no such column: {qualifier}.{column}.{_suggestion(column, known[table])} "
+                f"Columns of {table}: {', '.join(sorted(known[table]))}.",
+            )
+
+    if refs.tables and not refs.has_derived_sources:
+        tables = sorted(set(refs.tables))
+        in_scope = set().union(*(known[t] for t in tables))
+        local_names = refs.aliases | set(refs.sources) | refs.ctes | _ROWID_ALIASES
+        for column in refs.columns:
+            if column not in in_scope and column not in local_names:
+                raise SQLValidationError(
+                    "unknown_column",
+                    f"no such column: {column}.{_suggestion(column, in_scope)} "
+                    f"Columns of {', '.join(tables)}: {', '.join(sorted(in_scope))}.",
+                )
+    return refs
+
+
+# --- Cost Estimation ---
+_LOOP_RE = re.compile(r"^(?P<op>SCAN|SEARCH)(?: TABLE)? (?P<name>\S+)(?: AS (?P<alias>\S+))?(?: USING (?P<using>.*))?")
+# Rows SQLite itself assumes an index equality lookup returns when it has no statistics.
+_ROWS_PER_LOOKUP = 10
+
+
+@dataclass
+class PlanEstimate:
+    estimated_rows: int  # Rough number of rows visited, from the plan and table sizes
+    plan: List[str]  # EXPLAIN QUERY PLAN lines, indented by depth
+    # (outer loop names, inner table scanned in full per outer row, row combinations)
+    cross_joins: List[Tuple[Tuple[str, ...], str, int]] = field(default_factory=list)
+
+
+def estimate_plan(
+    plan_rows: Sequence[Tuple[int, int, int, str]],
+    table_rows: Callable[[str], int],
+    sources: Optional[Dict[str, Optional[str]]] = None,
+) -> PlanEstimate:
+    """
+    Estimates the rows a query visits from its EXPLAIN QUERY PLAN rows: loops listed under
+    the same parent are nested, so their row counts multiply. A SCAN (no index) nested
+    inside another loop is a full cross join of the two. `sources` maps the aliases in the
+    plan to table names; `table_rows` gives a table's row count.
+    """
+    sources = sources or {}
+    children: Dict[int, List[Tuple[int, str]]] = {}
+    for node_id, parent, _, detail in plan_rows:
+        children.setdefault(parent, []).append((node_id, detail))
+    materialized: Dict[str, int] = {}
+    estimate = PlanEstimate(0, [])
+
+    def loop_rows(match) -> int:
+        name = (match.group("alias") or match.group("name")).lower()
+        if name == "constant":
+            return 1
+        table = sources.get(name, name)
+        rows = materialized[name] if name in materialized else table_rows(table or name)
+        using = match.group("using") or ""
+        if match.group("op") == "SEARCH":
+            if "rowid=" in using:
+                return 1
+            if "=" in using:
+                return min(rows, _ROWS_PER_LOOKUP)
+            return max(rows // 4, 1)  # Range constraint
+        return rows
+
+    def visit(parent: int, depth: int) -> Tuple[int, int]:
+        """(rows visited, rows produced) of the loops and subqueries under `parent`."""
+        cost, product, loops = 0, 1, []
+        for node_id, detail in children.get(parent, []):
+            estimate.plan.append("  " * depth + detail)
+            match = _LOOP_RE.match(detail)
+            if match is not None:
+                rows = loop_rows(match)
+                name = match.group("alias") or match.group("name")
+                table = sources.get(name.lower())
+                if table is not None and table != name.lower():
+                    name = f"{table} ({name})"
+                if match.group("op") == "SCAN" and loops and product * rows > 0:
+                    estimate.cross_joins.append((tuple(loops), name, product * rows))
+                product *= max(rows, 1)
+                cost += product
+                loops.append(name)
+                continue
+            sub_cost, sub_rows = visit(node_id, depth + 1)
+            label = detail.split()
+            if label[0] in ("MATERIALIZE", "CO-ROUTINE") and len(label) > 1:
+                materialized[label[-1].lower()] = sub_rows
+            if label[0] == "CORRELATED":
+                sub_cost *= product  # Runs once per outer row
+            cost += sub_cost
+        return cost, product
+
+    estimate.estimated_rows = visit(0, 0)[0]
+    return estimate
+
+
+def _explain_error(error: sqlite3.Error, table_columns: Dict[str, Sequence[str]]) -> SQLValidationError:
+    """Turns a compile error from EXPLAIN into a validation error with a hint."""
+    message = str(error)
+    if message.startswith("no such table: "):
+        table = message.split(": ", 1)[1].split(".")[-1]
+        return SQLValidationError("unknown_table", f"{message}.{_suggestion(table.lower(), table_columns)}")
+    if message.startswith("no such column: "):
+        column = message.split(": ", 1)[1].split(".")[-1]
+        all_columns = {c for columns in table_columns.values() for c in columns}
+        return SQLValidationError("unknown_column", f"{message}.{_suggestion(column.lower(), all_columns)}")
+    return SQLValidationError("invalid_sql", f"SQLite could not compile the query: {message}")
+
+
+# --- Validator ---
+class SQLValidator:
+    """
+    Checks generated SQL before it runs, so bad queries go back to the LLM with a precise
+    error instead of failing (or running for a long time) against the data:
+
+    1. A single read-only SELECT (or WITH ... SELECT) statement.
+    2. Tables and columns exist in the cached schema (token scan; see `check_names`).
+    3. `EXPLAIN QUERY PLAN` compiles it (catching syntax errors) and gives the plan, from
+       which the rows visited are estimated. Nested full scans over more than
+       `max_cross_join_rows` row combinations are rejected as cross joins, and with
+       `max_estimated_rows` set, so are queries estimated to visit more rows than that.
+
+    EXPLAIN QUERY PLAN doesn't run the query. Table sizes come from sqlite_stat1 when
+    ANALYZE has been run, else from MAX(rowid), which only reads the end of the table's
+    b-tree.
+    """
+
+    def __init__(
+        self,
+        table_columns: Callable[[], Dict[str, Sequence[str]]],
+        connect: Callable[[], ContextManager[sqlite3.Connection]],
+        max_cross_join_rows: int = 1_000_000,
+        max_estimated_rows: Optional[int] = None,
+    ):
+        self._table_columns = table_columns
+        self._connect = connect  # Returns a context manager yielding a read-only connection
+        self.max_cross_join_rows = max_cross_join_rows
+        self.max_estimated_rows = max_estimated_rows
+
+    @staticmethod
+    def _table_rows(conn: sqlite3.Connection, table: str) -> int:
+        try:
+            row = conn.execute(
+                "SELECT stat FROM sqlite_stat1 WHERE tbl = ? AND stat IS NOT NULL LIMIT 1", (table,)
+            ).fetchone()
+            if row is not None:
+                return int(str(row[0]).split()[0])
+        except (sqlite3.Error, ValueError):
+            pass  # No statistics
+        try:
+            return conn.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0
+        except sqlite3.Error:
+            return 1000  # WITHOUT ROWID table or a view; a guess
+
+    def validate(self, sql: str, table_columns: Optional[Dict[str, Sequence[str]]] = None) -> PlanEstimate:
+        """
+        Returns the plan estimate, or raises SQLValidationError with what to fix.
+        Pass `table_columns` when the caller already has them, e.g. for several candidates.
+        """
+        tokens = check_read_only(sql)
+        if table_columns is None:
+            table_columns = self._table_columns()
+        refs = check_names(tokens, table_columns)
+
+        statement = sql.strip().rstrip(";")
+        with self._connect() as conn:
+            try:
+                plan_rows = conn.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()
+            except sqlite3.Error as e:
+                raise _explain_error(e, table_columns) from None
+            row_counts: Dict[str, int] = {}
+
+            def table_rows(table: str) -> int:
+                if table not in row_counts:
+                    row_counts[table] = self._table_rows(conn, table)
+                return row_counts[table]
+
+            estimate = estimate_plan(plan_rows, table_rows, refs.sources)
+
+        for outer, inner, combinations in estimate.cross_joins:
+            if combinations > self.max_cross_join_rows:
+                raise SQLValidationError(
+                    "cross_join",
+                    f"The query reads every row of {inner} for every row of {', '.join(outer)} "
+                    f"(about {combinations:,} row combinations), like a cross join. Relate the tables "
+                    "with an equality join condition (ON a.col = b.col) or aggregate each table separately.",
+                )
+        if self.max_estimated_rows is not None and estimate.estimated_rows > self.max_estimated_rows:
+            raise SQLValidationError(
+                "too_expensive",
+                f"The query would visit about {estimate.estimated_rows:,} rows "
+                f"(limit {self.max_estimated_rows:,}). Filter or aggregate more selectively.",
+            )
+        return estimate
@@ -0,0 +1,248 @@
+import contextvars
+import inspect
+import json
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig
+
+from .config import TRACE_EXPORT_PATH
+from .results import QueryResult
+
+
+# --- Trace Records ---
+@dataclass
+class NodeSpan:
+    """One execution of one graph node."""
+
+    node: str
+    start_ms: float  # Offset from the start of the question
+    duration_ms: float = 0.0
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    retry_count: int = 0
+    result_rows: Optional[int] = None
+    result_bytes: Optional[int] = None
+    error_kind: Optional[str] = None
+    first_token_ms: Optional[float] = None  # Offset from the start of the question, when streamed
+    peak_memory_bytes: Optional[int] = None  # Only with Tracer.track_memory
+
+
+@dataclass
+class QuestionTrace:
+    """All node spans of one question, from `write_query` to `generate_answer`."""
+
+    trace_id: str
+    thread_id: Optional[str]
+    question: str
+    started_at: float  # Unix time
+    spans: List[NodeSpan] = field(default_factory=list)
+    total_ms: float = 0.0
+
+    def node_totals(self) -> Dict[str, Dict[str, float]]:
+        """Per node: runs, time and tokens summed over retries."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for span in self.spans:
+            entry = totals.setdefault(
+                span.node,
+                {"runs": 0, "duration_ms": 0.0, "prompt_tokens": 0, "completion_tokens": 0},
+            )
+            entry["runs"] += 1
+            entry["duration_ms"] += span.duration_ms
+            entry["prompt_tokens"] += span.prompt_tokens
+            entry["completion_tokens"] += span.completion_tokens
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def format_trace(trace: QuestionTrace) -> str:
+    """Per-node breakdown for the CLI."""
+    retries = max((span.retry_count for span in trace.spans), default=0)
+    lines = [f"Timing: {trace.total_ms:.0f} ms total, {retries} retries"]
+    for span in trace.spans:
+        line = f"  {span.node:<16}{span.duration_ms:>9.1f} ms"
+        if span.llm_calls:
+            line += f"  tokens {span.prompt_tokens} in / {span.completion_tokens} out"
+        if span.result_rows is not None:
+            line += f"  {span.result_rows} rows ({span.result_bytes / 1024:.1f} KiB)"
+        if span.first_token_ms is not None:
+            line += f"  first token at {span.first_token_ms:.0f} ms"
+        if span.error_kind:
+            line += f"  error: {span.error_kind}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+# The span of the node running in the current context (and its perf_counter start);
+# LLM token usage is added to it.
+_current_span: contextvars.ContextVar[Optional[Tuple[NodeSpan, float]]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Adds the token usage reported by each chat model call to the current node's span."""
+
+    run_inline = True  # Keep the caller's context (and so its span) in async runs
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        current = _current_span.get()
+        if current is not None and current[0].first_token_ms is None:
+            span, start = current
+            span.first_token_ms = span.start_ms + (time.perf_counter() - start) * 1000
+
+    def on_llm_end(self, response, **kwargs: Any) -> None:
+        current = _current_span.get()
+        if current is None:
+            return
+        span = current[0]
+        span.llm_calls += 1
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    span.prompt_tokens += usage.get("input_tokens", 0)
+                    span.completion_tokens += usage.get("output_tokens", 0)
+
+
+# --- Tracer ---
+def _thread_id(config: Optional[RunnableConfig]) -> Optional[str]:
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+class Tracer:
+    """
+    Collects node spans into one trace per question and conversation.
+
+    A trace starts when `write_query` runs for a new question (retry_count 0) and ends
+    after `generate_answer`. Finished traces are kept per conversation
+    (`last_trace`), passed to the listeners and, when `export_path` is set, appended to
+    it as JSON lines.
+
+    With `track_memory`, each span also records the peak memory allocated while the node
+    ran (via tracemalloc, which must be started by the caller). Peaks are only
+    meaningful when nodes run one at a time.
+    """
+
+    def __init__(self, export_path: Optional[str] = None, max_recent: int = 1000):
+        self.export_path = export_path
+        self.max_recent = max_recent
+        self.track_memory = False
+        self._listeners: List[Callable[[QuestionTrace], None]] = []
+        self._lock = threading.Lock()
+        self._open: Dict[Optional[str], QuestionTrace] = {}
+        self._recent: "OrderedDict[Optional[str], QuestionTrace]" = OrderedDict()
+
+    def start_span(self, node: str, state: Dict[str, Any], config: Optional[RunnableConfig]):
+        thread_id = _thread_id(config)
+        now = time.time()
+        with self._lock:
+            trace = self._open.get(thread_id)
+            if trace is None or (node == "write_query" and not state.get("retry_count")):
+                trace = QuestionTrace(
+                    trace_id=uuid.uuid4().hex,
+                    thread_id=thread_id,
+                    question=state.get("question", ""),
+                    started_at=now,
+                )
+                self._open[thread_id] = trace
+            span = NodeSpan(node=node, start_ms=(now - trace.started_at) * 1000)
+            trace.spans.append(span)
+        memory_base = None
+        if self.track_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            memory_base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        return span, _current_span.set((span, start)), start, memory_base
+
+    def end_span(self, span_handle, state: Dict[str, Any], update: Optional[Dict[str, Any]], config: Optional[RunnableConfig]) -> None:
+        span, context_token, start, memory_base = span_handle
+        span.duration_ms = (time.perf_counter() - start) * 1000
+        if memory_base is not None and tracemalloc.is_tracing():
+            span.peak_memory_bytes = max(tracemalloc.get_traced_memory()[1] - memory_base, 0)
+        _current_span.reset(context_token)
+        update = update or {}
+        span.retry_count = update.get("retry_count", state.get("retry_count", 0)) or 0
+        span.error_kind = update.get("error_kind")
+        result = update.get("result")
+        if isinstance(result, QueryResult):
+            span.result_rows = result.row_count
+            span.result_bytes = result.nbytes
+        if span.node == "generate_answer":
+            self._finish(_thread_id(config))
+
+    def _finish(self, thread_id: Optional[str]) -> None:
+        with self._lock:
+            trace = self._open.pop(thread_id, None)
+            if trace is None:
+                return
+            trace.total_ms = (time.time() - trace.started_at) * 1000
+            self._recent[thread_id] = trace
+            self._recent.move_to_end(thread_id)
+            while len(self._recent) > self.max_recent:
+                self._recent.popitem(last=False)
+            if self.export_path:
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(trace.to_dict()) + "\n")
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(trace)
+
+    def add_listener(self, listener: Callable[[QuestionTrace], None]) -> None:
+        """Calls `listener(trace)` for every finished trace."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[QuestionTrace], None]) -> None:
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def last_trace(self, thread_id: Optional[str]) -> Optional[QuestionTrace]:
+        """The most recent finished trace of a conversation."""
+        with self._lock:
+            return self._recent.get(thread_id)
+
+
+def traced(node_name: str, node_fn: Callable, tracer: "Tracer") -> Callable:
+    """
+    Wraps a graph node (sync or async) so each run is recorded as a span. The wrapper
+    always takes `config` (LangGraph passes it based on the signature) and forwards it
+    only to nodes that accept it.
+    """
+    takes_config = "config" in inspect.signature(node_fn).parameters
+
+    if inspect.iscoroutinefunction(node_fn):
+        async def wrapper(state, config: RunnableConfig = None):
+            span = tracer.start_span(node_name, state, config)
+            update = None
+            try:
+                update = await (node_fn(state, config) if takes_config else node_fn(state))
+                return update
+            finally:
+                tracer.end_span(span, state, update, config)
+    else:
+        def wrapper(state, config: RunnableConfig = None):
+            span = tracer.start_span(node_name, state, config)
+            update = None
+            try:
+                update = node_fn(state, config) if takes_config else node_fn(state)
+                return update
+            finally:
+                tracer.end_span(span, state, update, config)
+
+    wrapper.__name__ = getattr(node_fn, "__name__", node_name)
+    wrapper.__doc__ = node_fn.__doc__
+    return wrapper
+
+
+# Shared by the graph nodes and the UIs that show the breakdown.
+tracer = Tracer(TRACE_EXPORT_PATH)
@@ -1,13 +1,32 @@
 # src/main_cli.py
 import uuid
-from core.graph import compiled_graph
-from langchain_core.messages import HumanMessage, AIMessage
+from concurrent.futures import ThreadPoolExecutor
+from core.history import ConversationHistory, get_summarizer
+
+
+def load_graph():
+    """
+    Imports the pipeline (LangGraph, LangChain, SQLAlchemy), compiles the graph and
+    reflects the database. Run in the background so the prompt shows up right away.
+    """
+    from core.graph import get_compiled_graph
+    from core.graph_components import warm_up
+
+    compiled_graph = get_compiled_graph()
+    warm_up()
+    return compiled_graph
+
 
 def run_chat_session():
     conversation_id = str(uuid.uuid4())
     print(f"Starting new chat session with ID: {conversation_id}")
     config = {"configurable": {"thread_id": conversation_id}}
-    chat_history = []
+    # Last few turns verbatim plus a rolling summary, so prompts don't grow with the session.
+    history = ConversationHistory(summarizer=get_summarizer())
+    loader = ThreadPoolExecutor(max_workers=1)
+    graph_loading = loader.submit(load_graph)
+    loader.shutdown(wait=False)
+    compiled_graph = None
 
     while True:
         user_input = input("You: ")
@@ -15,27 +34,52 @@ def run_chat_session():
             print("Exiting chat.")
             break
 
+        if compiled_graph is None:
+            # Only waits if the first question comes in before loading has finished.
+            compiled_graph = graph_loading.result()
+            from core.graph_components import new_question_input
+            from core.tracing import format_trace, tracer
+
         # Prepare current state for the graph
-        current_input_state = {"question": user_input, "chat_history": chat_history.copy()}
+        current_input_state = new_question_input(user_input, history.messages())
 
         final_answer = None
         generated_query = None
+        answer_streamed = False
         print("\nAI is thinking...")
-        for step in compiled_graph.stream(current_input_state, config=config, stream_mode="updates"):
+        for mode, step in compiled_graph.stream(
+            current_input_state, config=config, stream_mode=["updates", "messages"]
+        ):
+            if mode == "messages":
+                # Answer tokens are printed as they arrive; other nodes' LLM output is internal.
+                message_chunk, metadata = step
+                if metadata.get("langgraph_node") == "generate_answer" and isinstance(message_chunk.content, str):
+                    if not answer_streamed:
+                        print("AI: ", end="", flush=True)
+                        answer_streamed = True
+                    print(message_chunk.content, end="", flush=True)
+                continue
             # print(f"Step: {step}") # For debugging
-            if "write_query" in step:
-                generated_query = step["write_query"]["query"]
+            query_node = next((node for node in ("write_query", "speculative_retry") if node in step), None)
+            if query_node is not None:
+                generated_query = step[query_node]["query"]
                 print(f"\nGenerated SQL:\n{generated_query}")
             elif "generate_answer" in step:
                 final_answer_content = step["generate_answer"].get("answer")
                 if final_answer_content:
                     final_answer = final_answer_content
-                    print(f"AI: {final_answer}")
+                    # Answers from templates or early exits were not streamed.
+                    if answer_streamed:
+                        print()
+                    else:
+                        print(f"AI: {final_answer}")
+
+        trace = tracer.last_trace(conversation_id)
+        if trace is not None:
+            print(f"\n{format_trace(trace)}")
 
         if final_answer:
-            chat_history.append(HumanMessage(content=user_input))
-            ai_response = f"SQL Query: {generated_query} \nAnswer: {final_answer}" if generated_query else final_answer
-            chat_history.append(AIMessage(content=ai_response))
+            history.add_turn(user_input, final_answer, sql=generated_query)
         else:
             print("AI: I couldn't process that. Please try again.")
 
@@ -0,0 +1,59 @@
+"""
+Recommends (and optionally creates) indexes for the queries the app has executed.
+
+Reads the query log written by `execute_query`, finds full table scans with
+EXPLAIN QUERY PLAN and measures each candidate index inside a rolled-back transaction.
+Logged queries are replayed read-only, with the app's result caps and query budgets.
+
+Usage: python src/scripts/advise_indexes.py [--apply] [--db path] [--log path]
+       [--repeat 3] [--min-saved 0.2] [--limit 200]
+"""
+import argparse
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.config import QUERY_LOG_PATH, INDEX_ADVISOR_MIN_SAVED_FRACTION
+from core.database import DB_PATH
+from core.index_advisor import QueryLog, IndexAdvisor, format_report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index recommendations from the query log.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--log", default=QUERY_LOG_PATH)
+    parser.add_argument("--apply", action="store_true", help="Create the recommended indexes.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per query (median).")
+    parser.add_argument("--min-saved", type=float, default=INDEX_ADVISOR_MIN_SAVED_FRACTION,
+                        help="Minimum share of the affected latency an index must save.")
+    parser.add_argument("--limit", type=int, default=200,
+                        help="Analyze the N logged queries with the highest total latency.")
+    args = parser.parse_args(argv)
+
+    if not args.log or not os.path.exists(args.log):
+        print(f"No query log at {args.log!r}; run some questions first.")
+        return
+    entries = QueryLog(args.log).entries(limit=args.limit)
+    print(f"Analyzing {len(entries)} logged queries against {args.db}...")
+
+    advisor = IndexAdvisor(args.db, repeat=args.repeat)
+    try:
+        recommendations = advisor.recommend(entries, min_saved_fraction=args.min_saved)
+        print(format_report(recommendations))
+        if advisor.skipped:
+            print(f"{len(advisor.skipped)} logged quer{'y was' if len(advisor.skipped) == 1 else 'ies were'} "
+                  "skipped: over the time or instruction budget, or no longer runnable.")
+        if args.apply:
+            advisor.apply(recommendations)
+        elif recommendations:
+            print("Run with --apply to create these indexes.")
+    finally:
+        advisor.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Process memory (RSS) while many conversations go through the graph, with the in-memory
+checkpointer vs the SQLite one.
+
+Each checkpointer runs in its own subprocess, offline (fake LLM), one question per
+conversation. RSS is sampled every --sample-every conversations; with SQLite it should
+stay flat, with InMemorySaver it grows with every conversation.
+
+Usage: python src/scripts/benchmark_checkpointer.py --conversations 10000
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+def current_rss_mib() -> float:
+    """Resident set size now (Linux /proc), falling back to the peak from getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_one(conversations: int, sample_every: int) -> dict:
+    from core.graph import compiled_graph
+    from core.graph_components import new_question_input
+
+    samples = []
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(1, conversations + 1):
+            config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+            # Distinct questions, so every conversation runs the whole pipeline.
+            compiled_graph.invoke(new_question_input(f"How many activity rows are there? (#{i})", []), config=config)
+            if i % sample_every == 0:
+                gc.collect()
+                samples.append((i, current_rss_mib()))
+    return {"samples": samples, "elapsed_s": time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RSS over many conversations per checkpointer.")
+    parser.add_argument("--conversations", type=int, default=10_000)
+    parser.add_argument("--sample-every", type=int, default=1000)
+    parser.add_argument("--checkpointer", choices=["memory", "sqlite"], help="Run one checkpointer in this process.")
+    args = parser.parse_args()
+
+    if args.checkpointer:
+        print(json.dumps(run_one(args.conversations, args.sample_every)))
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for checkpointer in ("memory", "sqlite"):
+            env = {
+                **os.environ,
+                "LLM_PROVIDER": "fake",
+                "QUERY_LOG_PATH": "",
+                "CHECKPOINTER": checkpointer,
+                "CHECKPOINT_DB_PATH": os.path.join(tmp_dir, "checkpoints.db"),
+            }
+            output = subprocess.run(
+                [sys.executable, "-W", "ignore", __file__, "--checkpointer", checkpointer,
+                 "--conversations", str(args.conversations), "--sample-every", str(args.sample_every)],
+                env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            results[checkpointer] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"Conversations: {args.conversations}")
+    print(f"{'conversations':>14}{'memory MiB':>12}{'sqlite MiB':>12}")
+    for (n, memory_rss), (_, sqlite_rss) in zip(results["memory"]["samples"], results["sqlite"]["samples"]):
+        print(f"{n:>14}{memory_rss:>12.1f}{sqlite_rss:>12.1f}")
+    for checkpointer, result in results.items():
+        samples = result["samples"]
+        growth = samples[-1][1] - samples[0][1] if samples else 0.0
+        print(f"{checkpointer}: {result['elapsed_s']:.1f}s, RSS growth after the first sample {growth:+.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
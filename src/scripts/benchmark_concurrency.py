@@ -0,0 +1,77 @@
+"""
+Compares serial sync execution of the graph against concurrent async execution.
+
+Uses the offline fake chat model (LLM_PROVIDER=fake) with a fixed per-call latency,
+so the numbers reflect pipeline overhead and concurrency, not network variance.
+
+Usage: python src/scripts/benchmark_concurrency.py --conversations 50 --latency 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+import uuid
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+def make_input(i: int) -> dict:
+    return {"question": f"How many activity rows are there? (#{i})", "chat_history": []}
+
+
+def make_config() -> dict:
+    return {"configurable": {"thread_id": str(uuid.uuid4())}}
+
+
+def run_serial(graph, n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        graph.invoke(make_input(i), config=make_config())
+    return time.perf_counter() - start
+
+
+async def run_concurrent(graph, n: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(graph.ainvoke(make_input(i), config=make_config()) for i in range(n))
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async pipeline throughput.")
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM latency per call (s).")
+    args = parser.parse_args()
+
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = str(args.latency)
+
+    from core.graph import create_sql_qa_graph, create_async_sql_qa_graph
+    from core.graph_components import warm_up
+
+    sync_graph = create_sql_qa_graph()
+    async_graph = create_async_sql_qa_graph()
+
+    # Node logging is noisy at this volume; silence it while timing.
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Schema reflection and pool setup are lazy; don't charge them to the serial run.
+        warm_up()
+        serial_s = run_serial(sync_graph, args.conversations)
+        concurrent_s = asyncio.run(run_concurrent(async_graph, args.conversations))
+
+    n = args.conversations
+    print(f"Conversations: {n}, fake LLM latency: {args.latency:.3f}s per call")
+    print(f"Serial (sync graph):      {serial_s:8.2f}s  {n / serial_s:8.1f} questions/s")
+    print(f"Concurrent (async graph): {concurrent_s:8.2f}s  {n / concurrent_s:8.1f} questions/s")
+    print(f"Speedup: {serial_s / concurrent_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Cold vs warm latency of representative aggregate queries, with and without mmap mode.
+
+Before each cold run the database file is evicted from the OS page cache
+(posix_fadvise DONTNEED, Linux only), so "cold" approximates a freshly started server.
+Generate a large database first for meaningful numbers, e.g.
+`python src/scripts/setup_database.py` with a high user/day count.
+
+Usage: python src/scripts/benchmark_mmap.py [--db path/to/db] [--repeat 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.config import (
+    SQLITE_EXECUTION_PRAGMAS,
+    SQLITE_MMAP_MODE_PRAGMAS,
+    DB_WARMUP_TABLES,
+)
+from core.database import ReadOnlyConnectionPool, DB_PATH
+
+AGGREGATE_QUERIES = {
+    "revenue_by_category": (
+        "SELECT loyalty_category, SUM(total_revenue) FROM user_activity "
+        "GROUP BY loyalty_category"
+    ),
+    "daily_games": (
+        "SELECT date, SUM(games_count) FROM user_game_summary "
+        "GROUP BY date ORDER BY date DESC LIMIT 10"
+    ),
+    "monthly_deposits": (
+        "SELECT strftime('%Y-%m', date) AS month, SUM(total_deposit) FROM user_deposits "
+        "GROUP BY month"
+    ),
+    "wager_by_category": (
+        "SELECT a.loyalty_category, SUM(g.wager) FROM user_activity AS a "
+        "JOIN user_game_summary AS g ON a.userid = g.userid AND a.date = g.date "
+        "GROUP BY a.loyalty_category"
+    ),
+}
+
+
+def evict_from_os_cache(db_path: str) -> bool:
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    fd = os.open(db_path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return True
+
+
+def make_pool(db_path: str, mmap_mode: bool) -> ReadOnlyConnectionPool:
+    if mmap_mode:
+        return ReadOnlyConnectionPool(
+            db_path,
+            size=1,
+            pragmas={**SQLITE_EXECUTION_PRAGMAS, **SQLITE_MMAP_MODE_PRAGMAS},
+            shared_cache=True,
+        )
+    return ReadOnlyConnectionPool(db_path, size=1)
+
+
+def time_queries(pool: ReadOnlyConnectionPool) -> dict:
+    timings = {}
+    with pool.connection() as conn:
+        for name, sql in AGGREGATE_QUERIES.items():
+            start = time.perf_counter()
+            conn.execute(sql).fetchall()
+            timings[name] = time.perf_counter() - start
+    return timings
+
+
+def run_mode(db_path: str, mmap_mode: bool, warm: bool, repeat: int) -> tuple[dict, float]:
+    """Median per-query latency over `repeat` fresh pools, plus median warm-up time."""
+    runs, warmups = [], []
+    for _ in range(repeat):
+        evict_from_os_cache(db_path)
+        pool = make_pool(db_path, mmap_mode)
+        if warm:
+            start = time.perf_counter()
+            pool.warm_up(DB_WARMUP_TABLES)
+            warmups.append(time.perf_counter() - start)
+        runs.append(time_queries(pool))
+        pool.close()
+    medians = {name: statistics.median(r[name] for r in runs) for name in AGGREGATE_QUERIES}
+    return medians, statistics.median(warmups) if warmups else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold vs warm aggregate query latency.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    size_mb = os.path.getsize(args.db) / (1024 * 1024)
+    can_evict = evict_from_os_cache(args.db)
+    print(f"Database: {args.db} ({size_mb:.1f} MiB)")
+    if not can_evict:
+        print("Note: posix_fadvise is unavailable; 'cold' runs may hit the OS page cache.")
+
+    header = f"{'query':<22}" + "".join(
+        f"{label:>14}" for label in ("default cold", "default warm", "mmap cold", "mmap warm")
+    )
+    results = {}
+    for mmap_mode in (False, True):
+        for warm in (False, True):
+            results[(mmap_mode, warm)] = run_mode(args.db, mmap_mode, warm, args.repeat)
+
+    print(header)
+    for name in AGGREGATE_QUERIES:
+        row = f"{name:<22}"
+        for key in ((False, False), (False, True), (True, False), (True, True)):
+            row += f"{results[key][0][name] * 1000:>12.1f}ms"
+        print(row)
+    print(
+        f"Warm-up time: default {results[(False, True)][1]:.2f}s, "
+        f"mmap {results[(True, True)][1]:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Offline benchmark of the whole question pipeline with a replaying fake LLM.
+
+Generates a workload of conversations (single-turn, follow-up, retry after a SQL error,
+clarification), records the SQL and answer the fake model should return for each
+question, and drives `compiled_graph` through them one question at a time. Reports
+p50/p95/p99 latency per node and per scenario, throughput, and the peak memory each
+node allocated (tracemalloc; disable with --no-memory, which also removes its overhead).
+With --stream the graph is driven like the UIs (`stream_mode="messages"`), and the time
+to the first answer token is reported as well.
+
+Usage: python src/scripts/benchmark_pipeline.py --questions 400 --latency 0.05 [--stream] [--json out.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+CATEGORIES = ["Bronze", "Silver", "Gold", "Platinum", "Diamond"]
+# (label, table, aggregate) used to build questions and their SQL.
+METRICS = [
+    ("revenue", "user_activity", "SUM(total_revenue)"),
+    ("bonus", "user_activity", "SUM(total_bonus)"),
+    ("games played", "user_game_summary", "SUM(games_count)"),
+    ("wager", "user_game_summary", "SUM(wager)"),
+    ("deposits", "user_deposits", "SUM(total_deposit)"),
+]
+# Share of conversations per scenario; follow-ups have two questions each.
+SCENARIO_MIX = {"single": 0.5, "follow_up": 0.2, "retry": 0.1, "retry_twice": 0.1, "clarification": 0.1}
+
+
+def metric_sql(metric, category, days):
+    label, table, aggregate = metric
+    days_filter = f"date >= DATE('now', '-{days} days')"
+    if table == "user_activity":
+        return f"SELECT {aggregate} FROM user_activity WHERE loyalty_category = '{category}' AND {days_filter}"
+    return (
+        f"SELECT {aggregate} FROM {table} AS t JOIN user_activity AS a "
+        f"ON a.userid = t.userid AND a.date = t.date "
+        f"WHERE a.loyalty_category = '{category}' AND t.{days_filter}"
+    )
+
+
+def build_workload(num_questions, seed):
+    """Returns (conversations, recordings); each conversation is (scenario, [questions])."""
+    rng = random.Random(seed)
+    conversations, recordings, seen = [], [], set()
+    questions = 0
+    while questions < num_questions:
+        scenario = rng.choices(list(SCENARIO_MIX), weights=list(SCENARIO_MIX.values()))[0]
+        metric, category, days = rng.choice(METRICS), rng.choice(CATEGORIES), rng.randint(1, 365)
+        other = rng.choice([c for c in CATEGORIES if c != category])
+        question = f"What is the total {metric[0]} of {category} players over the last {days} days?"
+        follow_up = f"And for {other} players over those {days} days, what about the {metric[0]}?"
+        vague = f"Show me the numbers for {category} players over {days} days"
+        # Every question is asked once, so the query cache never short-circuits a run.
+        if {question, follow_up, vague} & seen:
+            continue
+        seen.update((question, follow_up, vague))
+        sql = metric_sql(metric, category, days)
+        answer = f"{category} players had this much {metric[0]} in the last {days} days."
+
+        if scenario == "single":
+            recordings.append({"question": question, "sql": sql, "answer": answer})
+            conversations.append((scenario, [question]))
+            questions += 1
+        elif scenario == "follow_up":
+            recordings.append({"question": question, "sql": sql, "answer": answer})
+            recordings.append({
+                "question": follow_up,
+                "sql": metric_sql(metric, other, days),
+                "answer": f"{other} players had this much {metric[0]} in those {days} days.",
+            })
+            conversations.append((scenario, [question, follow_up]))
+            questions += 2
+        elif scenario == "retry":
+            # First attempt names a column that does not exist, the second one is correct.
+            bad_sql = sql.replace("SUM(", "SUM(unknown_", 1)
+            recordings.append({"question": question, "sql": [bad_sql, sql], "answer": answer})
+            conversations.append((scenario, [question]))
+            questions += 1
+        elif scenario == "retry_twice":
+            # The first correction fails too (unknown table); the third attempt is correct.
+            bad_sql = sql.replace("SUM(", "SUM(unknown_", 1)
+            still_bad_sql = sql.replace("FROM ", "FROM missing_", 1)
+            recordings.append({"question": question, "sql": [bad_sql, still_bad_sql, sql], "answer": answer})
+            conversations.append((scenario, [question]))
+            questions += 1
+        else:
+            recordings.append({
+                "question": vague,
+                "sql": "CLARIFICATION_NEEDED: Which metric are you interested in?",
+            })
+            conversations.append((scenario, [vague]))
+            questions += 1
+    return conversations, recordings
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def latency_stats(values):
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+    }
+
+
+def ask(graph, question_input, config, stream):
+    """Runs one question and returns the final state."""
+    if not stream:
+        return graph.invoke(question_input, config=config)
+    final_state = None
+    for mode, step in graph.stream(question_input, config=config, stream_mode=["values", "messages"]):
+        if mode == "values":
+            final_state = step
+    return final_state
+
+
+def run_workload(graph, conversations, tracer, stream=False):
+    from core.graph_components import new_question_input
+    from core.history import ConversationHistory
+
+    traces = []
+    current = {}
+    listener = lambda trace: traces.append((current["scenario"], trace))
+    tracer.add_listener(listener)
+    start = time.perf_counter()
+    try:
+        for scenario, questions in conversations:
+            current["scenario"] = scenario
+            config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+            history = ConversationHistory()
+            for question in questions:
+                output = ask(graph, new_question_input(question, history.messages()), config, stream)
+                history.add_turn(question, output.get("answer", ""), sql=output.get("query"))
+    finally:
+        tracer.remove_listener(listener)
+    return traces, time.perf_counter() - start
+
+
+def speculative_retry_label():
+    from core.config import SPECULATIVE_RETRY_MODE, SPECULATIVE_RETRY_CANDIDATES
+
+    if SPECULATIVE_RETRY_MODE == "off":
+        return "off"
+    return f"{SPECULATIVE_RETRY_MODE} x{SPECULATIVE_RETRY_CANDIDATES}"
+
+
+def summarize(traces, elapsed_s):
+    node_durations, node_peaks, scenario_totals = defaultdict(list), defaultdict(int), defaultdict(list)
+    retries, first_tokens, streamed_totals = 0, [], []
+    for scenario, trace in traces:
+        scenario_totals[scenario].append(trace.total_ms)
+        retries += max((span.retry_count for span in trace.spans), default=0)
+        for span in trace.spans:
+            node_durations[span.node].append(span.duration_ms)
+            if span.node == "generate_answer" and span.first_token_ms is not None:
+                first_tokens.append(span.first_token_ms)
+                streamed_totals.append(trace.total_ms)
+            if span.peak_memory_bytes is not None:
+                node_peaks[span.node] = max(node_peaks[span.node], span.peak_memory_bytes)
+    return {
+        "questions": len(traces),
+        "elapsed_s": elapsed_s,
+        "questions_per_s": len(traces) / elapsed_s if elapsed_s else 0.0,
+        "retries": retries,
+        "speculative_retry_mode": speculative_retry_label(),
+        "nodes": {
+            node: {**latency_stats(values), "peak_memory_kib": node_peaks[node] / 1024 if node in node_peaks else None}
+            for node, values in node_durations.items()
+        },
+        "scenarios": {scenario: latency_stats(values) for scenario, values in scenario_totals.items()},
+        # Questions whose answer was streamed by the LLM: first answer token vs. done.
+        "first_answer_token": latency_stats(first_tokens) if first_tokens else None,
+        "streamed_answer_total": latency_stats(streamed_totals) if streamed_totals else None,
+    }
+
+
+def print_summary(summary, latency):
+    print(f"Questions: {summary['questions']}, fake LLM latency: {latency:.3f}s per call, retries: {summary['retries']}, "
+          f"speculative retries: {summary['speculative_retry_mode']}")
+    print(f"Elapsed: {summary['elapsed_s']:.2f}s  Throughput: {summary['questions_per_s']:.1f} questions/s")
+    print()
+    print(f"{'node':<18}{'runs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak KiB':>11}")
+    for node, stats in summary["nodes"].items():
+        peak = f"{stats['peak_memory_kib']:.0f}" if stats["peak_memory_kib"] is not None else "-"
+        print(f"{node:<18}{stats['count']:>6}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{peak:>11}")
+    print()
+    print(f"{'scenario':<18}{'count':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for scenario, stats in summary["scenarios"].items():
+        print(f"{scenario:<18}{stats['count']:>6}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+    if summary["first_answer_token"]:
+        print()
+        for name, key in (("first token", "first_answer_token"), ("full answer", "streamed_answer_total")):
+            stats = summary[key]
+            print(f"{name:<18}{stats['count']:>6}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline latency/throughput/memory benchmark of the pipeline.")
+    parser.add_argument("--questions", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake LLM latency per call (s).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Fake LLM latency per streamed word (s).")
+    parser.add_argument("--stream", action="store_true", help="Stream answer tokens like the UIs do.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip per-node memory tracking.")
+    parser.add_argument("--json", help="Also write the summary to this file.")
+    parser.add_argument("--speculative", choices=["off", "fan_out", "multi"],
+                        help="SPECULATIVE_RETRY_MODE for the run (default: from the environment).")
+    parser.add_argument("--candidates", type=int, help="SPECULATIVE_RETRY_CANDIDATES for the run.")
+    args = parser.parse_args()
+
+    conversations, recordings = build_workload(args.questions, args.seed)
+    tmp_dir = tempfile.mkdtemp()
+    recordings_path = os.path.join(tmp_dir, "recordings.json")
+    with open(recordings_path, "w", encoding="utf-8") as f:
+        json.dump(recordings, f)
+
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = str(args.latency)
+    os.environ["FAKE_LLM_TOKEN_LATENCY"] = str(args.token_latency)
+    os.environ["FAKE_LLM_RECORDINGS"] = recordings_path
+    # Keep benchmark queries out of the index advisor's log and the app's conversations.
+    os.environ["QUERY_LOG_PATH"] = ""
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tmp_dir, "checkpoints.db")
+    if args.speculative:
+        os.environ["SPECULATIVE_RETRY_MODE"] = args.speculative
+    if args.candidates:
+        os.environ["SPECULATIVE_RETRY_CANDIDATES"] = str(args.candidates)
+
+    try:
+        from core.graph import compiled_graph
+        from core.graph_components import warm_up
+        from core.tracing import tracer
+
+        # One-off setup (schema reflection, pools) happens lazily; keep it out of the timings.
+        with contextlib.redirect_stdout(io.StringIO()):
+            warm_up()
+        tracer.track_memory = not args.no_memory
+        if tracer.track_memory:
+            tracemalloc.start()
+        # Node logging is noisy at this volume; silence it while timing.
+        with contextlib.redirect_stdout(io.StringIO()):
+            traces, elapsed_s = run_workload(compiled_graph, conversations, tracer, stream=args.stream)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    summary = summarize(traces, elapsed_s)
+    print_summary(summary, args.latency)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Time from `python main.py run_cli` to its first "You: " prompt, with an `-X importtime`
+breakdown of where the import time goes.
+
+Each run starts a fresh interpreter with PYTHONPROFILEIMPORTTIME=1 (the environment
+form of `-X importtime`, so it reaches the CLI subprocess that main.py starts), waits
+for the prompt, then types "exit". Exits with status 1 when the median time to the
+prompt is over --budget, so it can guard against heavy imports creeping back in.
+
+Usage: python src/scripts/benchmark_startup.py [--runs 5] [--budget 0.5] [--live]
+"""
+import argparse
+import os
+import re
+import selectors
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROMPT = b"You: "
+_IMPORT_TIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_import_times(stderr: str) -> dict:
+    """Top-level module -> cumulative import time (µs), summed across processes."""
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        match = _IMPORT_TIME_RE.match(line)
+        if match and len(match.group(3)) == 1:  # One space: imported directly, not by another module
+            totals[match.group(4)] += int(match.group(2))
+    return dict(totals)
+
+
+def time_to_prompt(env: dict, timeout: float) -> tuple:
+    """Starts `main.py run_cli`; returns (seconds until the prompt, import times)."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "main.py", "run_cli"],
+        cwd=PROJECT_ROOT, env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    # -X importtime output goes to stderr; it is drained as it arrives so the pipe never fills.
+    selector = selectors.DefaultSelector()
+    selector.register(process.stdout, selectors.EVENT_READ)
+    selector.register(process.stderr, selectors.EVENT_READ)
+    output, errors = b"", b""
+    elapsed = None
+    while elapsed is None and time.perf_counter() - start < timeout:
+        for key, _ in selector.select(timeout=0.01):
+            chunk = os.read(key.fileobj.fileno(), 65536)
+            if key.fileobj is process.stderr:
+                errors += chunk
+                continue
+            output += chunk
+            if PROMPT in output:
+                elapsed = time.perf_counter() - start
+    selector.close()
+    if elapsed is None:
+        process.kill()
+        raise RuntimeError(f"No prompt within {timeout}s. Output:\n{output.decode(errors='replace')}")
+    # Only what was imported before the prompt counts; later (background) imports are dropped.
+    process.communicate(b"exit\n", timeout=60)
+    return elapsed, parse_import_times(errors.decode(errors="replace"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to the first prompt of `main.py run_cli`.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=0.5, help="Target median seconds to the first prompt.")
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list.")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--live", action="store_true", help="Use the configured LLM instead of the offline fake.")
+    args = parser.parse_args()
+
+    env = {**os.environ, "PYTHONPROFILEIMPORTTIME": "1", "PYTHONUNBUFFERED": "1", "QUERY_LOG_PATH": ""}
+    if not args.live:
+        env["LLM_PROVIDER"] = "fake"
+
+    timings = []
+    import_times = {}
+    for _ in range(args.runs):
+        elapsed, import_times = time_to_prompt(env, args.timeout)
+        timings.append(elapsed)
+
+    median = statistics.median(timings)
+    print(f"Time to first prompt over {args.runs} runs: median {median * 1000:.0f} ms, "
+          f"min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms")
+    print("Slowest top-level imports before the prompt (last run, both processes):")
+    for module, micros in sorted(import_times.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {micros / 1000:>8.1f} ms  {module}")
+
+    if median > args.budget:
+        print(f"Over budget: {median * 1000:.0f} ms > {args.budget * 1000:.0f} ms.")
+        sys.exit(1)
+    print(f"Within budget ({args.budget * 1000:.0f} ms).")
+
+
+if __name__ == "__main__":
+    main()
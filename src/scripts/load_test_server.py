@@ -0,0 +1,132 @@
+"""
+Measures requests/second of the HTTP API (`python main.py run_server`).
+
+Starts the server with the offline fake chat model (LLM_PROVIDER=fake) and an in-memory
+checkpointer, then sends `--requests` POST /ask requests from `--concurrency` keep-alive
+connections. Reports throughput, latency percentiles and the status codes returned;
+503s show the queue turning requests away, 504s requests that hit the timeout.
+Pass --url to load-test a server that is already running instead.
+
+Usage: python src/scripts/load_test_server.py --requests 500 --concurrency 32 --latency 0.2
+       [--workers 16] [--max-queue 64] [--timeout 60] [--url http://127.0.0.1:8000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from scripts.benchmark_pipeline import percentile
+
+
+def start_server(args) -> tuple[subprocess.Popen, str]:
+    """Starts `src/server.py` on a free port and returns it with its base URL."""
+    env = {
+        **os.environ,
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY": str(args.latency),
+        "CHECKPOINTER": "memory",
+        "QUERY_LOG_PATH": "",
+    }
+    command = [
+        sys.executable, "-W", "ignore", os.path.join(SRC_DIR, "server.py"), "--port", "0", "--quiet",
+        "--workers", str(args.workers), "--max-queue", str(args.max_queue), "--timeout", str(args.timeout),
+    ]
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=env, stdout=subprocess.PIPE, text=True)
+    for line in process.stdout:
+        if line.startswith("Serving on "):
+            return process, line.split()[2]
+    process.wait()
+    raise RuntimeError(f"Server exited with code {process.returncode} before it started serving.")
+
+
+async def post_json(reader, writer, host: str, path: str, payload: dict) -> tuple[int, bool]:
+    """Sends one request on an open connection; returns the status and whether it stays open."""
+    body = json.dumps(payload).encode()
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers.get("connection", "").lower() != "close"
+
+
+async def run_load(url: str, requests: int, concurrency: int) -> tuple[float, Counter, list]:
+    parts = urlsplit(url)
+    statuses, latencies_ms = Counter(), []
+    next_request = iter(range(requests))
+
+    async def client():
+        connection = None
+        for i in next_request:
+            if connection is None:
+                connection = await asyncio.open_connection(parts.hostname, parts.port)
+            # Distinct questions, so the question->SQL cache doesn't short-cut the LLM.
+            payload = {"question": f"How many activity rows are there? (#{i})"}
+            start = time.perf_counter()
+            status, keep_alive = await post_json(*connection, parts.netloc, "/ask", payload)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            statuses[status] += 1
+            if status == 200:
+                latencies_ms.append(elapsed_ms)
+            if not keep_alive:
+                connection[1].close()
+                connection = None
+        if connection is not None:
+            connection[1].close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - start, statuses, latencies_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the HTTP API.")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent client connections.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM latency per call (s).")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--url", help="Load-test this running server instead of starting one.")
+    args = parser.parse_args()
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_server(args)
+    try:
+        elapsed, statuses, latencies_ms = asyncio.run(run_load(url, args.requests, args.concurrency))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(f"Requests: {args.requests} from {args.concurrency} connections against {url}")
+    if process is not None:
+        print(f"Server: {args.workers} workers, queue {args.max_queue}, fake LLM latency {args.latency:.3f}s per call")
+    print(f"Elapsed: {elapsed:.2f}s, throughput: {args.requests / elapsed:.1f} requests/s "
+          f"({statuses[200] / elapsed:.1f} answered/s)")
+    print("Status codes: " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+    if latencies_ms:
+        print(f"Latency (200s): p50 {percentile(latencies_ms, 50):.0f} ms, "
+              f"p95 {percentile(latencies_ms, 95):.0f} ms, p99 {percentile(latencies_ms, 99):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Rebuilds the daily rollup tables from the base tables.
+
+Run it after the data changes (setup_database.py runs it after loading); until then the
+app keeps reading the base tables, because stale rollups are never used.
+
+Usage: python src/scripts/refresh_rollups.py [--db-path path/to/db]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.rollups import refresh_rollups
+
+DEFAULT_DB_PATH = os.path.join(PROJECT_ROOT, "data", "data_query_assistant.db")
+
+
+def run_refresh(db_path):
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        start = time.perf_counter()
+        counts = refresh_rollups(conn)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    for name, rows in counts.items():
+        print(f"Rollup '{name}': {rows} rows")
+    print(f"Rollups refreshed in {time.perf_counter() - start:.2f}s.")
+    print("-" * 30)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh the daily rollup tables.")
+    parser.add_argument("--db-path", default=DEFAULT_DB_PATH)
+    args = parser.parse_args(argv)
+    run_refresh(args.db_path)
+
+
+if __name__ == "__main__":
+    main()
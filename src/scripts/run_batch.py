@@ -0,0 +1,90 @@
+"""
+Answers a file of questions with the async pipeline and streams the answers to JSONL.
+
+Each input line is {"id": ..., "question": "..."} or a bare JSON string. Identical
+questions are answered once; results are written as they complete and a throughput
+report is printed at the end.
+
+Usage: python src/scripts/run_batch.py --input questions.jsonl [--output answers.jsonl]
+       [--concurrency 8] [--timeout 120] [--verbose]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.batch import BatchRunner, load_questions, format_report
+from core.config import BATCH_CONCURRENCY, BATCH_QUESTION_TIMEOUT_SECONDS
+
+
+def default_output_path(input_path: str) -> str:
+    root, _ = os.path.splitext(input_path)
+    return f"{root}.answers.jsonl"
+
+
+async def run(items, output, args):
+    from core.graph import create_async_sql_qa_graph
+    from core.graph_components import warm_up
+
+    graph = create_async_sql_qa_graph()
+    # Schema reflection, the LLM client and the SQL pool are shared by the whole batch.
+    warm_up()
+
+    def write_result(record):
+        output.write(json.dumps(record, default=str) + "\n")
+        output.flush()
+
+    runner = BatchRunner(graph, concurrency=args.concurrency, timeout=args.timeout)
+    return await runner.run(items, write_result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions.")
+    parser.add_argument("--input", required=True, help="JSONL file with one question per line.")
+    parser.add_argument("--output", help="JSONL answers ('-' for stdout). Default: <input>.answers.jsonl")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY,
+                        help="Questions in flight at once.")
+    parser.add_argument("--timeout", type=float, default=BATCH_QUESTION_TIMEOUT_SECONDS,
+                        help="Seconds before a question is reported as a timeout.")
+    parser.add_argument("--verbose", action="store_true", help="Keep the per-node logging.")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.input, encoding="utf-8") as f:
+            items = load_questions(f)
+    except (OSError, ValueError) as e:
+        parser.error(f"{args.input}: {e}")
+
+    output_path = args.output or default_output_path(args.input)
+    to_stdout = output_path == "-"
+    report_stream = sys.stderr if to_stdout else sys.stdout
+    print(f"Answering {len(items)} questions with concurrency {args.concurrency}...", file=report_stream)
+
+    with contextlib.ExitStack() as stack:
+        output = sys.stdout if to_stdout else stack.enter_context(open(output_path, "w", encoding="utf-8"))
+        if not args.verbose:
+            # Node logging would interleave with the answers; send it nowhere.
+            devnull = stack.enter_context(open(os.devnull, "w"))
+            if to_stdout:
+                output = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+                stack.callback(output.close)
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+        report = asyncio.run(run(items, output, args))
+
+    from core.graph_components import query_cache, result_cache
+
+    print(format_report(report), file=report_stream)
+    print(f"Query cache: {query_cache.stats()}, result cache: {result_cache.stats()}", file=report_stream)
+    if not to_stdout:
+        print(f"Answers written to {output_path}", file=report_stream)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,58 @@
+import argparse
+import multiprocessing
+import shutil
 import sqlite3
+import sys
 import random
+import tempfile
+import time
 from datetime import datetime, timedelta
 import uuid
 import os # Added for directory creation and path joining
 
+import numpy as np
+
 # --- Configuration ---
 # Adjusted DB_NAME to point to the data/ subdirectory
 DB_FILE_NAME = "data_query_assistant.db"
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Get project root (assuming script is in src/scripts/)
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.rollups import refresh_rollups
+
 DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 DB_PATH = os.path.join(DATA_DIR, DB_FILE_NAME) # Full path to the database file
 
 NUM_USERS = 10
 NUM_DAYS_OF_DATA = 30 # Generate data for the last X days
-START_DATE = datetime.now() - timedelta(days=NUM_DAYS_OF_DATA)
+DEFAULT_CHUNK_USERS = 1000 # Users generated and inserted per transaction
+LOYALTY_CATEGORIES = ['Bronze', 'Silver', 'Gold', 'Platinum', 'Diamond']
+
+INSERT_COLUMNS = {
+    "user_activity": ["userid", "date", "loyalty_category", "total_revenue", "total_withdrawls", "total_bonus"],
+    "user_game_summary": ["userid", "date", "games_count", "total_winnings", "wager", "point_game",
+                          "total_cashgamecount", "total_gamewon", "total_gamelost"],
+    "user_deposits": ["userid", "date", "total_deposit", "deposit_count"],
+}
+# Secondary indexes, created once the data is loaded (cheaper than maintaining them per insert).
+# Date-range and loyalty-tier filters are the common ones (see `advise_indexes`); the
+# (userid, date) primary keys only help per-user lookups.
+POST_LOAD_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_user_activity_date ON user_activity (date)",
+    "CREATE INDEX IF NOT EXISTS idx_user_activity_loyalty_date ON user_activity (loyalty_category, date)",
+    "CREATE INDEX IF NOT EXISTS idx_user_game_summary_date ON user_game_summary (date)",
+    "CREATE INDEX IF NOT EXISTS idx_user_deposits_date ON user_deposits (date)",
+]
 
 # --- Helper Functions ---
-def get_db_connection():
+def get_db_connection(db_path=DB_PATH):
     """Establishes a connection to the SQLite database."""
     # Ensure the data directory exists
-    os.makedirs(DATA_DIR, exist_ok=True)
-    print(f"Ensuring database will be created/accessed at: {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    print(f"Ensuring database will be created/accessed at: {db_path}")
+    conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row # Allows accessing columns by name
     return conn
 
@@ -75,66 +106,239 @@ def create_tables(conn):
     conn.commit()
     print("-" * 30)
 
-def generate_dummy_data(conn):
-    """Generates and inserts dummy data into the tables."""
+def make_user_ids(rng, first_user, count, total_users):
+    """
+    Builds uuid4-style user ids that sort in generation order.
+
+    The first 32 bits place each user in its own slice of the id space, in index order,
+    at a random offset within the slice; the rest is random. Users are inserted in
+    (userid, date) order, so the primary-key index is built by appending instead of
+    random b-tree inserts.
+    """
+    slice_width = 0xFFFFFFFF // max(total_users, 1)
+    index = np.arange(first_user, first_user + count, dtype=np.uint64)
+    offsets = rng.integers(0, max(slice_width, 1), count, dtype=np.uint64)
+    prefix = index * np.uint64(slice_width) + offsets
+    raw = np.frombuffer(rng.bytes(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+    raw[:, :4] = prefix.astype(">u4").view(np.uint8).reshape(count, 4)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    return [str(uuid.UUID(bytes=row.tobytes())) for row in raw]
+
+
+def generate_chunk(seed, chunk_index, first_user, num_users, total_users, dates):
+    """
+    Generates the rows of all three tables for one chunk of users, column by column
+    with NumPy. Each chunk has its own random stream derived from (seed, chunk_index),
+    so the output does not depend on how chunks are scheduled.
+    Returns {table_name: list of row tuples}.
+    """
+    rng = np.random.default_rng([seed, chunk_index])
+    num_days = len(dates)
+    user_ids = make_user_ids(rng, first_user, num_users, total_users)
+    categories = np.array(LOYALTY_CATEGORIES, dtype=object)
+
+    # Row-major grid: user 0 day 0..D-1, user 1 day 0..D-1, ...
+    grid_users = np.repeat(np.array(user_ids, dtype=object), num_days)
+    grid_dates = np.tile(np.array([d.strftime('%Y-%m-%d') for d in dates], dtype=object), num_users)
+    first_of_month = np.tile(np.array([d.day == 1 for d in dates]), num_users)
+    n = num_users * num_days
+
+    # --- user_activity data ---
+    active = rng.random(n) < 0.9  # assuming 90% chance of user activity
+    total_revenue = np.round(rng.uniform(0, 5000, n), 2)
+    total_withdrawls = np.round(rng.random(n) * np.minimum(total_revenue * 0.8, 200), 2)
+    total_bonus = np.round(rng.uniform(0, 500, n), 2)
+    # Loyalty may change on the 1st of a month (20% chance, only on active days) and
+    # sticks until the next change: forward-fill the change events per user.
+    changes = active & first_of_month & (rng.random(n) < 0.2)
+    new_category = rng.integers(0, len(LOYALTY_CATEGORIES), n)
+    initial_category = rng.integers(0, len(LOYALTY_CATEGORIES), num_users)
+    events = np.where(changes, new_category, -1).reshape(num_users, num_days)
+    events = np.concatenate([initial_category[:, None], events], axis=1)
+    last_event = np.where(events >= 0, np.arange(num_days + 1), 0)
+    np.maximum.accumulate(last_event, axis=1, out=last_event)
+    loyalty = categories[np.take_along_axis(events, last_event, axis=1)[:, 1:].ravel()]
+
+    activity_rows = list(zip(
+        grid_users[active], grid_dates[active], loyalty[active],
+        total_revenue[active].tolist(), total_withdrawls[active].tolist(), total_bonus[active].tolist(),
+    ))
+
+    # --- user_game_summary data ---
+    played = rng.random(n) < 0.85  # 85% chance of playing games
+    games_count = rng.integers(0, 51, n)
+    total_gamewon = np.floor(rng.random(n) * (games_count + 1)).astype(np.int64)
+    total_gamelost = games_count - total_gamewon
+    total_winnings = np.round(rng.random(n) * games_count * 25, 2)
+    wager = np.round(games_count * (0.5 + rng.random(n) * 9.5), 2)
+    point_game = np.floor(rng.random(n) * (games_count // 2 + 1)).astype(np.int64)
+    total_cashgamecount = games_count - point_game
+
+    game_rows = list(zip(
+        grid_users[played], grid_dates[played], games_count[played].tolist(),
+        total_winnings[played].tolist(), wager[played].tolist(), point_game[played].tolist(),
+        total_cashgamecount[played].tolist(), total_gamewon[played].tolist(), total_gamelost[played].tolist(),
+    ))
+
+    # --- user_deposits data ---
+    deposited = rng.random(n) < 0.3  # 30% chance of making a deposit
+    deposit_count = rng.integers(1, 6, n)
+    total_deposit = np.round(rng.uniform(10, 300, n) * deposit_count, 2)
+
+    deposit_rows = list(zip(
+        grid_users[deposited], grid_dates[deposited],
+        total_deposit[deposited].tolist(), deposit_count[deposited].tolist(),
+    ))
+
+    return {
+        "user_activity": activity_rows,
+        "user_game_summary": game_rows,
+        "user_deposits": deposit_rows,
+    }
+
+
+def write_chunk_file(task):
+    """
+    Worker entry point for parallel loading: generates one chunk and writes it to its
+    own temporary database (plain tables, no keys) for the parent to merge.
+    Returns (chunk_index, path, row_count).
+    """
+    seed, chunk_index, first_user, num_users, total_users, dates, tmp_dir = task
+    chunk_rows = generate_chunk(seed, chunk_index, first_user, num_users, total_users, dates)
+    path = os.path.join(tmp_dir, f"chunk_{chunk_index:06d}.db")
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        configure_for_bulk_load(conn)
+        for table, columns in INSERT_COLUMNS.items():
+            conn.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+        row_count = insert_chunk(conn, chunk_rows)
+    finally:
+        conn.close()
+    return chunk_index, path, row_count
+
+
+def merge_chunk_file(conn, path):
+    """Copies a worker's chunk into the main database with ATTACH + INSERT ... SELECT."""
+    conn.execute("ATTACH DATABASE ? AS chunk", (path,))
+    try:
+        conn.execute("BEGIN")
+        for table, columns in INSERT_COLUMNS.items():
+            column_list = ", ".join(columns)
+            conn.execute(f"INSERT INTO main.{table} ({column_list}) SELECT {column_list} FROM chunk.{table}")
+        conn.execute("COMMIT")
+    finally:
+        conn.execute("DETACH DATABASE chunk")
+    os.remove(path)
+
+
+def configure_for_bulk_load(conn):
+    """Trades durability for speed while loading; the file is rebuilt from scratch anyway."""
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")  # 256 MiB
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+
+def insert_chunk(conn, chunk_rows):
+    """Inserts one chunk inside a single transaction. Returns the number of rows written."""
     cursor = conn.cursor()
-    user_ids = [str(uuid.uuid4()) for _ in range(NUM_USERS)]
-    loyalty_categories = ['Bronze', 'Silver', 'Gold', 'Platinum', 'Diamond']
-    dates = [START_DATE + timedelta(days=i) for i in range(NUM_DAYS_OF_DATA)]
-
-    print(f"Generating data for {NUM_USERS} users over {NUM_DAYS_OF_DATA} days...")
-
-    for user_id in user_ids:
-        current_loyalty = random.choice(loyalty_categories)
-        for date_obj in dates:
-            date_str = date_obj.strftime('%Y-%m-%d')
-
-            # --- user_activity data ---
-            if random.random() < 0.9: # assuming 90% chance of user activity
-                total_revenue = round(random.uniform(0, 5000), 2)
-                total_withdrawls = round(random.uniform(0, min(total_revenue * 0.8, 200)), 2)
-                total_bonus = round(random.uniform(0, 500), 2)
-                if date_obj.day == 1 and random.random() < 0.2:
-                    current_loyalty = random.choice(loyalty_categories)
-
-                cursor.execute("""
-                INSERT INTO user_activity (userid, date, loyalty_category, total_revenue, total_withdrawls, total_bonus)
-                VALUES (?, ?, ?, ?, ?, ?)
-                ON CONFLICT(userid, date) DO NOTHING;
-                """, (user_id, date_str, current_loyalty, total_revenue, total_withdrawls, total_bonus))
-
-            # --- user_game_summary data ---
-            if random.random() < 0.85: # 85% chance of playing games
-                games_count = random.randint(0, 50)
-                if games_count > 0:
-                    total_gamewon = random.randint(0, games_count)
-                    total_gamelost = games_count - total_gamewon
-                    total_winnings = round(random.uniform(0, games_count * 25), 2)
-                    wager = round(random.uniform(games_count * 0.5, games_count * 10), 2)
-                    point_game = random.randint(0, games_count // 2)
-                    total_cashgamecount = games_count - point_game
-                else:
-                    total_gamewon, total_gamelost, total_winnings, wager, point_game, total_cashgamecount = 0,0,0,0,0,0
-
-                cursor.execute("""
-                INSERT INTO user_game_summary (userid, date, games_count, total_winnings, wager, point_game, total_cashgamecount, total_gamewon, total_gamelost)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(userid, date) DO NOTHING;
-                """, (user_id, date_str, games_count, total_winnings, wager, point_game, total_cashgamecount, total_gamewon, total_gamelost))
-
-            # --- user_deposits data ---
-            if random.random() < 0.3: # 30% chance of making a deposit
-                deposit_count = random.randint(1, 5)
-                total_deposit = round(random.uniform(10, 300) * deposit_count, 2)
-                cursor.execute("""
-                INSERT INTO user_deposits (userid, date, total_deposit, deposit_count)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(userid, date) DO NOTHING;
-                """, (user_id, date_str, total_deposit, deposit_count))
+    cursor.execute("BEGIN")
+    for table, rows in chunk_rows.items():
+        placeholders = ", ".join("?" * len(INSERT_COLUMNS[table]))
+        cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(INSERT_COLUMNS[table])}) VALUES ({placeholders})",
+            rows,
+        )
+    cursor.execute("COMMIT")
+    return sum(len(rows) for rows in chunk_rows.values())
+
 
+def build_indexes(conn):
+    """
+    Post-load step. The (userid, date) primary keys stay in the table definitions the
+    LLM sees, and are built by appends thanks to ordered user ids. The secondary indexes
+    in POST_LOAD_INDEXES (date, and loyalty tier then date) and planner statistics
+    (ANALYZE) are created after the data, in one pass each instead of per insert.
+    """
+    for statement in POST_LOAD_INDEXES:
+        conn.execute(statement)
+    conn.execute("ANALYZE")
     conn.commit()
+
+
+def _load_serial(conn, chunks, seed, num_users, dates, start):
+    total_rows = 0
+    for chunk_index, first_user, chunk_size in chunks:
+        chunk_rows = generate_chunk(seed, chunk_index, first_user, chunk_size, num_users, dates)
+        total_rows += insert_chunk(conn, chunk_rows)
+        elapsed = time.perf_counter() - start
+        print(f"  {first_user + chunk_size}/{num_users} users, {total_rows} rows "
+              f"({total_rows / elapsed:,.0f} rows/s)")
+    return total_rows
+
+
+def _load_parallel(conn, chunks, seed, num_users, dates, start, workers, tmp_parent):
+    """
+    Workers generate chunks into temporary databases; the parent merges them in chunk
+    order (so the output is identical to a serial run) while later chunks are generated.
+    """
+    tmp_dir = tempfile.mkdtemp(prefix="setup_chunks_", dir=tmp_parent)
+    tasks = [(seed, chunk_index, first_user, chunk_size, num_users, dates, tmp_dir)
+             for chunk_index, first_user, chunk_size in chunks]
+    total_rows = merged_users = 0
+    try:
+        with multiprocessing.Pool(processes=workers) as pool:
+            for (_, path, row_count), (_, _, chunk_size) in zip(
+                pool.imap(write_chunk_file, tasks), chunks
+            ):
+                merge_chunk_file(conn, path)
+                total_rows += row_count
+                merged_users += chunk_size
+                elapsed = time.perf_counter() - start
+                print(f"  {merged_users}/{num_users} users, {total_rows} rows "
+                      f"({total_rows / elapsed:,.0f} rows/s)")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return total_rows
+
+
+def generate_dummy_data(conn, num_users=NUM_USERS, num_days=NUM_DAYS_OF_DATA,
+                        seed=None, chunk_users=DEFAULT_CHUNK_USERS, workers=1, tmp_dir=None):
+    """
+    Generates and inserts dummy data into the tables in vectorized, batched chunks.
+    With workers > 1, chunks are generated by a process pool into temporary databases
+    under `tmp_dir` and merged into `conn`. For a given seed and chunk size the data is
+    the same whatever the number of workers.
+    """
+    if seed is None:
+        seed = random.randrange(2**32)
+    start_date = datetime.now() - timedelta(days=num_days)
+    dates = [start_date + timedelta(days=i) for i in range(num_days)]
+    chunks = [(chunk_index, first_user, min(chunk_users, num_users - first_user))
+              for chunk_index, first_user in enumerate(range(0, num_users, chunk_users))]
+
+    print(f"Generating data for {num_users} users over {num_days} days "
+          f"(seed={seed}, workers={workers})...")
+    configure_for_bulk_load(conn)
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None  # Explicit BEGIN/COMMIT per chunk
+
+    start = time.perf_counter()
+    if workers > 1 and len(chunks) > 1:
+        total_rows = _load_parallel(conn, chunks, seed, num_users, dates, start, workers, tmp_dir)
+    else:
+        total_rows = _load_serial(conn, chunks, seed, num_users, dates, start)
+
+    conn.isolation_level = previous_isolation
+    index_start = time.perf_counter()
+    build_indexes(conn)
+    load_seconds = index_start - start
+    print(f"Loaded {total_rows} rows in {load_seconds:.2f}s ({total_rows / max(load_seconds, 1e-9):,.0f} rows/s); "
+          f"indexes and statistics built in {time.perf_counter() - index_start:.2f}s.")
     print("Dummy data generation complete.")
     print("-" * 30)
+    return total_rows
 
 def verify_data_insertion(conn):
     """Prints counts from each table to verify insertion."""
@@ -148,21 +352,51 @@ def verify_data_insertion(conn):
     print("-" * 30)
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Create and populate the sample database.")
+    parser.add_argument("--users", type=int, default=NUM_USERS, help="Number of users to generate.")
+    parser.add_argument("--days", type=int, default=NUM_DAYS_OF_DATA, help="Days of data per user.")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible data.")
+    parser.add_argument("--chunk-users", type=int, default=DEFAULT_CHUNK_USERS,
+                        help="Users generated and inserted per transaction.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes generating chunks in parallel (e.g. the number of cores).")
+    parser.add_argument("--db-path", default=DB_PATH, help="Where to write the database.")
+    return parser.parse_args(argv)
+
+
+def build_rollups(conn):
+    """Builds the daily rollup tables that aggregate queries are routed to."""
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None
+    start = time.perf_counter()
+    counts = refresh_rollups(conn)
+    conn.isolation_level = previous_isolation
+    for name, rows in counts.items():
+        print(f"Rollup '{name}': {rows} rows")
+    print(f"Rollups built in {time.perf_counter() - start:.2f}s.")
+    print("-" * 30)
+
+
 # --- Main Execution ---
 if __name__ == "__main__":
+    args = parse_args()
     # Ensure the data directory exists before attempting to delete the DB file
-    os.makedirs(DATA_DIR, exist_ok=True)
+    os.makedirs(os.path.dirname(args.db_path), exist_ok=True)
 
-    if os.path.exists(DB_PATH):
-        print(f"Deleting existing database: {DB_PATH}")
-        os.remove(DB_PATH)
+    if os.path.exists(args.db_path):
+        print(f"Deleting existing database: {args.db_path}")
+        os.remove(args.db_path)
 
-    conn = get_db_connection()
+    conn = get_db_connection(args.db_path)
 
     create_tables(conn)
-    generate_dummy_data(conn)
+    generate_dummy_data(conn, num_users=args.users, num_days=args.days,
+                        seed=args.seed, chunk_users=args.chunk_users, workers=args.workers,
+                        tmp_dir=os.path.dirname(args.db_path))
     verify_data_insertion(conn)
+    build_rollups(conn)
 
     conn.close()
-    print(f"Database '{DB_PATH}' created and populated successfully.")
-    print(f"You can now inspect '{DB_PATH}' using a SQLite browser.")
\ No newline at end of file
+    print(f"Database '{args.db_path}' created and populated successfully.")
+    print(f"You can now inspect '{args.db_path}' using a SQLite browser.")
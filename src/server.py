@@ -0,0 +1,445 @@
+# src/server.py
+"""
+Async HTTP API over the question-answering graph.
+
+  POST /ask                 {"question": "...", "conversation_id": "..."} -> answer, SQL, row count
+  POST /stream              same body, answered as Server-Sent Events: "sql", "token"..., "answer"
+  GET  /conversations/<id>  the turns of a conversation
+  POST /conversations/<id>/cancel  stops the question the conversation is answering
+  GET  /health              running and queued request counts
+
+`conversation_id` is optional; a new conversation is started without one.
+
+Usage: python main.py run_server [--host 127.0.0.1] [--port 8000] [--workers 16]
+       [--max-queue 64] [--timeout 60] [--quiet]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from http import HTTPStatus
+from typing import Any, Callable, Dict, List, Optional
+
+from core.batch import record_from_state
+from core.config import (
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_WORKERS,
+    SERVER_MAX_QUEUE,
+    SERVER_REQUEST_TIMEOUT_SECONDS,
+    SERVER_MAX_CONVERSATIONS,
+    SERVER_MAX_BODY_BYTES,
+)
+from core.history import ConversationHistory, get_summarizer
+
+
+# --- HTTP Plumbing ---
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    headers: Dict[str, str]
+    body: bytes
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get("connection", "").lower() != "close"
+
+    def json(self) -> Dict[str, Any]:
+        try:
+            payload = json.loads(self.body or b"{}")
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise HTTPError(400, "Request body must be JSON.")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Request body must be a JSON object.")
+        return payload
+
+
+async def read_request(reader: asyncio.StreamReader, max_body_bytes: int) -> Optional[Request]:
+    """Reads one HTTP/1.1 request; None when the client has closed the connection."""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    parts = request_line.decode("latin-1").split()
+    if len(parts) != 3:
+        raise HTTPError(400, "Malformed request line.")
+    method, target, _ = parts
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length.")
+    if length > max_body_bytes:
+        raise HTTPError(413, f"Request body is over {max_body_bytes} bytes.")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), target.split("?", 1)[0], headers, body)
+
+
+def _response_head(status: int, headers: Dict[str, Any]) -> bytes:
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def send_json(
+    writer: asyncio.StreamWriter,
+    status: int,
+    payload: Any,
+    keep_alive: bool = True,
+    headers: Optional[Dict[str, str]] = None,
+) -> None:
+    body = json.dumps(payload, default=str).encode()
+    writer.write(_response_head(status, {
+        "Content-Type": "application/json",
+        "Content-Length": len(body),
+        "Connection": "keep-alive" if keep_alive else "close",
+        **(headers or {}),
+    }) + body)
+    await writer.drain()
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+
+
+# --- Admission Control ---
+class AdmissionControl:
+    """
+    At most `workers` requests run at once. Up to `max_queue` more wait, for a slot or
+    for their conversation's previous question; beyond that, requests that would have
+    to wait are turned away with 503 so callers back off instead of piling up behind a
+    saturated LLM or a busy conversation.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.running = 0
+        self.queued = 0
+        self._slots = asyncio.Semaphore(workers)
+
+    @asynccontextmanager
+    async def slot(self, lock: Optional[asyncio.Lock] = None):
+        """
+        Runs the request in a worker slot. `lock` (the conversation's) is taken first,
+        while the request counts as queued, so it holds no worker while it waits.
+        """
+        must_wait = self._slots.locked() or (lock is not None and lock.locked())
+        if must_wait and self.queued >= self.max_queue:
+            raise HTTPError(503, "Server is busy; retry later.", {"Retry-After": "1"})
+        self.queued += 1
+        try:
+            if lock is not None:
+                await lock.acquire()
+            try:
+                await self._slots.acquire()
+            except BaseException:
+                if lock is not None:
+                    lock.release()
+                raise
+        finally:
+            self.queued -= 1
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._slots.release()
+            if lock is not None:
+                lock.release()
+
+
+# --- Question Server ---
+@dataclass
+class Conversation:
+    history: ConversationHistory
+    # Questions of one conversation are answered one at a time, in order.
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class QuestionServer:
+    """
+    Serves the async graph over HTTP. `make_input(question, chat_history)` builds the
+    graph input (`new_question_input` in production) and `cancel(conversation_id)` stops
+    a conversation's in-flight question (`cancel_question`). Conversation state lives in
+    the graph's checkpointer under the conversation id; the bounded chat history for the
+    prompts is kept here, as the CLI and web app do.
+    """
+
+    def __init__(
+        self,
+        graph,
+        make_input: Callable[[str, List], Dict[str, Any]],
+        cancel: Optional[Callable[[str], None]] = None,
+        workers: int = SERVER_WORKERS,
+        max_queue: int = SERVER_MAX_QUEUE,
+        timeout: float = SERVER_REQUEST_TIMEOUT_SECONDS,
+        max_conversations: int = SERVER_MAX_CONVERSATIONS,
+        max_body_bytes: int = SERVER_MAX_BODY_BYTES,
+    ):
+        self._graph = graph
+        self._make_input = make_input
+        self._cancel = cancel
+        self.admission = AdmissionControl(workers, max_queue)
+        self.timeout = timeout
+        self.max_conversations = max_conversations
+        self.max_body_bytes = max_body_bytes
+        self._summarizer = get_summarizer()
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+
+    # --- Conversations ---
+    @staticmethod
+    def _config(conversation_id: str) -> Dict[str, Any]:
+        return {"configurable": {"thread_id": conversation_id}}
+
+    async def _conversation(self, conversation_id: str, create: bool = True) -> Optional[Conversation]:
+        conversation = self._conversations.get(conversation_id)
+        if conversation is not None:
+            self._conversations.move_to_end(conversation_id)
+            return conversation
+
+        # Not in memory (new, evicted or from before a restart): continue from the
+        # last checkpointed turn, if there is one.
+        snapshot = await self._graph.aget_state(self._config(conversation_id))
+        values = snapshot.values if snapshot else {}
+        if not values.get("answer") and not create:
+            return None
+        conversation = Conversation(ConversationHistory(summarizer=self._summarizer))
+        if values.get("answer"):
+            conversation.history.add_turn(values["question"], values["answer"], sql=values.get("query"))
+
+        conversation = self._conversations.setdefault(conversation_id, conversation)
+        while len(self._conversations) > self.max_conversations:
+            self._conversations.popitem(last=False)
+        return conversation
+
+    @staticmethod
+    def _question(request: Request) -> tuple[str, str]:
+        payload = request.json()
+        question = payload.get("question")
+        if not isinstance(question, str) or not question.strip():
+            raise HTTPError(400, "\"question\" must be a non-empty string.")
+        conversation_id = payload.get("conversation_id") or str(uuid.uuid4())
+        return question, str(conversation_id)
+
+    @asynccontextmanager
+    async def _deadline(self):
+        """The request timeout; it covers waiting for a slot as well as answering."""
+        try:
+            async with asyncio.timeout(self.timeout):
+                yield
+        except TimeoutError:
+            raise HTTPError(504, f"No answer within {self.timeout:g}s.")
+
+    # --- Handlers ---
+    async def ask(self, request: Request) -> Dict[str, Any]:
+        question, conversation_id = self._question(request)
+        conversation = await self._conversation(conversation_id)
+        async with self._deadline(), self.admission.slot(conversation.lock):
+            graph_input = self._make_input(question, conversation.history.messages())
+            state = await self._graph.ainvoke(graph_input, config=self._config(conversation_id))
+        record = record_from_state(state)
+        if record["answer"]:
+            conversation.history.add_turn(question, record["answer"], sql=record["sql"])
+        return {"conversation_id": conversation_id, **record}
+
+    async def stream(self, request: Request, writer: asyncio.StreamWriter) -> None:
+        """Answers over Server-Sent Events. Errors before the first event get a normal status."""
+        question, conversation_id = self._question(request)
+        conversation = await self._conversation(conversation_id)
+        started = False
+        try:
+            async with self._deadline(), self.admission.slot(conversation.lock):
+                writer.write(_response_head(200, {
+                    "Content-Type": "text/event-stream",
+                    "Cache-Control": "no-cache",
+                    "Connection": "close",
+                }))
+                started = True
+                graph_input = self._make_input(question, conversation.history.messages())
+                state = {}
+                async for mode, step in self._graph.astream(
+                    graph_input,
+                    config=self._config(conversation_id),
+                    stream_mode=["updates", "messages", "values"],
+                ):
+                    if mode == "values":
+                        state = step
+                    elif mode == "messages":
+                        message_chunk, metadata = step
+                        if metadata.get("langgraph_node") == "generate_answer" and isinstance(message_chunk.content, str):
+                            writer.write(sse_event("token", {"text": message_chunk.content}))
+                    else:
+                        for node in ("write_query", "speculative_retry"):
+                            if node in step:
+                                writer.write(sse_event("sql", {"sql": step[node].get("query")}))
+                    await writer.drain()
+        except Exception as e:
+            if not started:
+                raise
+            if not isinstance(e, HTTPError):
+                print(f"Error streaming an answer: {e}")
+                e = HTTPError(500, "Internal server error.")
+            writer.write(sse_event("error", {"status": e.status, "error": e.message}))
+        else:
+            record = record_from_state(state)
+            if record["answer"]:
+                conversation.history.add_turn(question, record["answer"], sql=record["sql"])
+            writer.write(sse_event("answer", {"conversation_id": conversation_id, **record}))
+        await writer.drain()
+
+    async def get_conversation(self, conversation_id: str) -> Dict[str, Any]:
+        conversation = await self._conversation(conversation_id, create=False)
+        if conversation is None:
+            raise HTTPError(404, f"Unknown conversation {conversation_id!r}.")
+        history = conversation.history
+        return {
+            "conversation_id": conversation_id,
+            "turns": [asdict(turn) for turn in history.turns],
+            "summary": history.summary,
+            "summarized_turns": history.summarized_turns,
+        }
+
+    async def cancel(self, conversation_id: str) -> Dict[str, Any]:
+        """Stops the running question; the answer it returns reports the cancellation."""
+        if self._cancel is None:
+            raise HTTPError(501, "Cancellation is not available on this server.")
+        if conversation_id not in self._conversations:
+            raise HTTPError(404, f"Unknown conversation {conversation_id!r}.")
+        self._cancel(conversation_id)
+        return {"conversation_id": conversation_id, "cancelled": True}
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "running": self.admission.running,
+            "queued": self.admission.queued,
+            "workers": self.admission.workers,
+            "max_queue": self.admission.max_queue,
+        }
+
+    async def _dispatch(self, request: Request) -> Any:
+        path = request.path.rstrip("/")
+        if path in ("/ask", "/stream") or (path.startswith("/conversations/") and path.endswith("/cancel")):
+            allowed = "POST"
+        elif path == "/health" or path.startswith("/conversations/"):
+            allowed = "GET"
+        else:
+            raise HTTPError(404, f"No route for {request.path}.")
+        if request.method != allowed:
+            raise HTTPError(405, f"Use {allowed} for {path}.", {"Allow": allowed})
+
+        if path == "/ask":
+            return await self.ask(request)
+        if path == "/health":
+            return self.health()
+        if path.endswith("/cancel"):
+            return await self.cancel(path[len("/conversations/"):-len("/cancel")])
+        return await self.get_conversation(path[len("/conversations/"):])
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serves requests on one (keep-alive) connection."""
+        try:
+            while True:
+                try:
+                    request = await read_request(reader, self.max_body_bytes)
+                except HTTPError as e:
+                    await send_json(writer, e.status, {"error": e.message}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                try:
+                    if request.method == "POST" and request.path.rstrip("/") == "/stream":
+                        await self.stream(request, writer)
+                        break  # Event streams end with the connection.
+                    status, payload, headers = 200, await self._dispatch(request), {}
+                except HTTPError as e:
+                    status, payload, headers = e.status, {"error": e.message}, e.headers
+                except Exception as e:
+                    print(f"Error handling {request.method} {request.path}: {e}")
+                    status, payload, headers = 500, {"error": "Internal server error."}, {}
+                await send_json(writer, status, payload, request.keep_alive, headers)
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # Client went away or sent an oversized header line.
+        finally:
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
+
+
+# --- Main Execution ---
+async def serve(args) -> None:
+    from core.graph import get_compiled_async_graph
+    from core.graph_components import cancel_question, new_question_input, warm_up
+
+    graph = get_compiled_async_graph()
+    warm_up()
+    app = QuestionServer(
+        graph,
+        new_question_input,
+        cancel=cancel_question,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        timeout=args.timeout,
+    )
+    server = await asyncio.start_server(app.handle_connection, args.host, args.port)
+    host, port = server.sockets[0].getsockname()[:2]
+    print(
+        f"Serving on http://{host}:{port} (workers: {args.workers}, queue: {args.max_queue}, "
+        f"timeout: {args.timeout:g}s)",
+        flush=True,
+    )
+    with contextlib.ExitStack() as stack:
+        if args.quiet:
+            # Per-node logging is too chatty under load.
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP API for text2SQL questions.")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="0 picks a free port.")
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="Questions answered at once.")
+    parser.add_argument("--max-queue", type=int, default=SERVER_MAX_QUEUE,
+                        help="Requests waiting (for a worker or their conversation) before new ones get 503.")
+    parser.add_argument("--timeout", type=float, default=SERVER_REQUEST_TIMEOUT_SECONDS,
+                        help="Seconds per request, queueing included, before it gets 504.")
+    parser.add_argument("--quiet", action="store_true", help="Silence the per-node logging.")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("Server stopped.")
+
+
+if __name__ == "__main__":
+    main()
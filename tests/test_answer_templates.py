@@ -0,0 +1,83 @@
+import os
+import sys
+
+import pytest
+
+# Ensure the src directory is in the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.answer_templates import (
+    ALL_SHAPES,
+    EMPTY_RESULT,
+    SCALAR_RESULT,
+    SHORT_LIST_RESULT,
+    SINGLE_ROW_RESULT,
+    column_label,
+    format_value,
+    render_template_answer,
+    result_shape,
+)
+from core.results import QueryResult
+
+
+@pytest.mark.parametrize(
+    "column, label",
+    [
+        ("total_revenue", "total revenue"),
+        ("SUM(total_revenue)", "total revenue"),
+        ("sum(t.wager)", "total wager"),
+        ("COUNT(*)", "count"),
+        ("COUNT(DISTINCT userid)", "number of userid"),
+        ("AVG(games_count)", "average games count"),
+    ],
+)
+def test_column_label(column, label):
+    assert column_label(column) == label
+
+
+def test_format_value():
+    assert format_value(12345.678) == "12,345.68"
+    assert format_value(3.0) == "3"
+    assert format_value(0.012345) == "0.01235"
+    assert format_value(1234567) == "1,234,567"
+    assert format_value(None) == "n/a"
+    assert format_value("Gold") == "Gold"
+
+
+def test_shapes():
+    def shape(columns, rows, truncated=False):
+        return result_shape(QueryResult.from_rows(columns, rows, truncated), max_rows=3, max_columns=2)
+
+    assert shape(["n"], []) == EMPTY_RESULT
+    assert shape(["SUM(x)"], [(None,)]) == EMPTY_RESULT
+    assert shape(["n"], [(1,)]) == SCALAR_RESULT
+    assert shape(["a", "b"], [(1, 2)]) == SINGLE_ROW_RESULT
+    assert shape(["a", "b"], [(1, 2), (3, 4), (5, 6)]) == SHORT_LIST_RESULT
+    assert shape(["a", "b"], [(1, 2)] * 4) is None
+    assert shape(["a", "b", "c"], [(1, 2, 3)]) is None
+    assert shape(["n"], [(1,)], truncated=True) is None
+
+
+def test_rendered_answers():
+    scalar = QueryResult.from_rows(["SUM(total_revenue)"], [(12345.67,)])
+    assert render_template_answer(scalar) == "The total revenue is 12,345.67."
+
+    row = QueryResult.from_rows(["loyalty_category", "total_games"], [("Gold", 42)])
+    assert render_template_answer(row) == "Here is the result:\n- **loyalty category**: Gold\n- **total games**: 42"
+
+    table = QueryResult.from_rows(["loyalty_category", "SUM(wager)"], [("Gold", 1.5), ("Silver", 2.0)])
+    assert render_template_answer(table) == (
+        "Found 2 results:\n\n| loyalty category | total wager |\n|---|---|\n| Gold | 1.50 |\n| Silver | 2 |"
+    )
+
+    assert render_template_answer(QueryResult.from_rows(["n"], [])) == "No data was found matching your question."
+
+
+def test_disabled_shapes_go_to_the_llm():
+    scalar = QueryResult.from_rows(["n"], [(1,)])
+    assert render_template_answer(scalar, shapes=[EMPTY_RESULT]) is None
+    assert render_template_answer(scalar, shapes=()) is None
+    assert set(ALL_SHAPES) == {EMPTY_RESULT, SCALAR_RESULT, SINGLE_ROW_RESULT, SHORT_LIST_RESULT}
@@ -92,16 +92,14 @@ def run_question(question: str, chat_history: list = None, conversation_id: str
     Sends a question to the compiled_graph and returns the final state.
     """
     from src.core.graph import compiled_graph # MOVED: Import compiled_graph here
+    from src.core.graph_components import new_question_input
     
     if chat_history is None:
         chat_history = []
     if conversation_id is None:
         conversation_id = str(uuid.uuid4())
 
-    graph_input = {
-        "question": question,
-        "chat_history": chat_history.copy()
-    }
+    graph_input = new_question_input(question, chat_history.copy())
     config = {"configurable": {"thread_id": conversation_id}}
 
     final_graph_output = None
@@ -216,7 +214,7 @@ def test_tc007_query_non_existent_column():
            "don't have information" in answer_lower or \
            "error" in answer_lower or \
            "column 'user_mood' does not exist" in answer_lower or \
-           "no such column" in output.get("result","").lower() # Check raw result if available
+           "no such column" in str(output.get("result","")).lower() # Check raw result if available
     
     # Also check if the query reflects the attempt or an error
     if "ERROR_GENERATING_QUERY" not in output.get("query", ""):
@@ -265,8 +263,9 @@ def test_tc011_empty_result_set():
            "no results" in answer_lower
     
     # The 'result' field in the state should also reflect this
-    # Langchain's SQL tool often returns "[]" or an empty list string for no results.
-    assert output.get("result") == "[]" or output.get("result") is None or not output.get("result")
+    # execute_query stores a structured QueryResult; an empty set has no rows.
+    result = output.get("result")
+    assert result is None or getattr(result, "row_count", None) == 0
 
 
 def test_tc017_top_k_results_limit():
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Ensure the src directory is in the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.batch import BatchItem, BatchRunner, load_questions
+
+
+class FakeGraph:
+    """Stands in for the async graph: answers after `delay` seconds and tracks concurrency."""
+
+    def __init__(self, delay=0.01, slow_questions=(), failing_questions=()):
+        self.delay = delay
+        self.slow_questions = set(slow_questions)
+        self.failing_questions = set(failing_questions)
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def ainvoke(self, graph_input, config=None):
+        question = graph_input["question"]
+        self.calls.append(question)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(10 if question in self.slow_questions else self.delay)
+            if question in self.failing_questions:
+                raise RuntimeError("LLM unavailable")
+            return {"question": question, "query": "SELECT 1", "answer": f"answer to {question}"}
+        finally:
+            self.in_flight -= 1
+
+
+def run_batch(graph, items, **kwargs):
+    records = []
+    runner = BatchRunner(graph, make_input=lambda q: {"question": q}, **kwargs)
+    report = asyncio.run(runner.run(items, records.append))
+    return records, report
+
+
+def test_load_questions_accepts_objects_and_strings():
+    items = load_questions(['{"id": "a", "question": "Total revenue?"}', "", '"List categories"'])
+    assert items == [BatchItem("a", "Total revenue?"), BatchItem(3, "List categories")]
+
+    with pytest.raises(ValueError, match="Line 2"):
+        load_questions(['"ok"', '{"id": 1}'])
+
+
+def test_duplicates_run_once_and_concurrency_is_bounded():
+    items = [BatchItem(i, f"Question {i % 10}") for i in range(30)]
+    items.append(BatchItem("dup", "  question 3 "))
+    graph = FakeGraph()
+
+    records, report = run_batch(graph, items, concurrency=4)
+
+    assert sorted(graph.calls) == sorted(f"Question {i}" for i in range(10))
+    assert graph.max_in_flight == 4
+    assert len(records) == 31 and {r["id"] for r in records} == {i.id for i in items}
+    duplicate = next(r for r in records if r["id"] == "dup")
+    assert duplicate["duplicate_of"] == 3 and duplicate["answer"] == "answer to Question 3"
+    assert (report.questions, report.unique, report.errors) == (31, 10, 0)
+    assert len(report.latencies_ms) == 10 and report.throughput > 0
+
+
+def test_results_stream_in_completion_order_with_errors_and_timeouts():
+    items = [BatchItem(1, "slow"), BatchItem(2, "fails"), BatchItem(3, "fast")]
+    graph = FakeGraph(slow_questions={"slow"}, failing_questions={"fails"})
+
+    records, report = run_batch(graph, items, concurrency=3, timeout=0.2)
+
+    assert [r["id"] for r in records] == [2, 3, 1]
+    assert records[0]["status"] == "error" and "LLM unavailable" in records[0]["error"]
+    assert records[1]["status"] == "ok"
+    assert records[2]["status"] == "timeout"
+    assert (report.errors, report.timeouts) == (1, 1)
@@ -0,0 +1,195 @@
+import os
+import sys
+import time
+import sqlite3
+
+import pytest
+
+# Ensure the src directory is in the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from langchain_community.utilities import SQLDatabase
+from langchain_core.messages import HumanMessage, AIMessage
+
+from core.cache import (
+    SchemaCache,
+    QueryCache,
+    ResultCache,
+    is_context_dependent,
+    make_query_cache_key,
+)
+from core.database import DataVersionProbe
+
+
+@pytest.fixture
+def sample_db(tmp_path):
+    """Creates a small SQLite database with one table."""
+    db_path = str(tmp_path / "sample.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE user_deposits (userid TEXT, date DATE, total_deposit REAL)")
+    conn.execute("INSERT INTO user_deposits VALUES ('u1', '2025-01-01', 10.5)")
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def make_db(db_path):
+    return SQLDatabase.from_uri(f"sqlite:///{db_path}")
+
+
+# --- SchemaCache ---
+
+def test_schema_cache_reuses_snapshot(sample_db):
+    cache = SchemaCache(make_db(sample_db), sample_db)
+
+    first = cache.get_table_info()
+    second = cache.get_table_info()
+
+    assert "user_deposits" in first
+    assert first == second
+    assert cache.stats() == {"hits": 1, "rebuilds": 1}
+
+
+def test_schema_snapshot_is_one_lookup(sample_db):
+    cache = SchemaCache(make_db(sample_db), sample_db)
+    cache.get_table_info()
+
+    snapshot = cache.snapshot()
+
+    assert snapshot.table_info == cache.get_table_info()
+    assert snapshot.table_columns["user_deposits"] == ["userid", "date", "total_deposit"]
+    assert snapshot.dialect == "sqlite" and snapshot.fingerprint
+    assert cache.stats() == {"hits": 2, "rebuilds": 1}
+
+
+def test_schema_cache_rebuilds_on_schema_change(sample_db):
+    cache = SchemaCache(make_db(sample_db), sample_db, db_factory=lambda: make_db(sample_db))
+    cache.get_table_info()
+    old_fingerprint = cache.fingerprint
+
+    conn = sqlite3.connect(sample_db)
+    conn.execute("CREATE TABLE user_activity (userid TEXT, date DATE)")
+    conn.commit()
+    conn.close()
+
+    table_info = cache.get_table_info()
+    assert "user_activity" in table_info
+    assert cache.fingerprint != old_fingerprint
+    assert cache.rebuilds == 2
+
+
+def test_schema_fingerprint_ignores_data_changes(sample_db):
+    cache = SchemaCache(make_db(sample_db), sample_db)
+    old_fingerprint = cache.fingerprint
+
+    conn = sqlite3.connect(sample_db)
+    conn.execute("INSERT INTO user_deposits VALUES ('u2', '2025-01-02', 3.0)")
+    conn.commit()
+    conn.close()
+    os.utime(sample_db, ns=(0, os.stat(sample_db).st_mtime_ns + 1_000_000))
+
+    assert cache.fingerprint == old_fingerprint
+
+
+# --- QueryCache ---
+
+def test_query_cache_key_normalizes_question():
+    key_a = make_query_cache_key("Top 10 depositors?", "2025-06-01", "abc")
+    key_b = make_query_cache_key("  top 10   DEPOSITORS ", "2025-06-01", "abc")
+    key_c = make_query_cache_key("Top 10 depositors?", "2025-06-02", "abc")
+
+    assert key_a == key_b
+    assert key_a != key_c
+
+
+def test_query_cache_lru_eviction():
+    cache = QueryCache(max_entries=2)
+    cache.put("a", "SELECT 1")
+    cache.put("b", "SELECT 2")
+    cache.get("a")  # "b" is now least recently used
+    cache.put("c", "SELECT 3")
+
+    assert cache.get("a") == "SELECT 1"
+    assert cache.get("b") is None
+    assert cache.get("c") == "SELECT 3"
+
+
+def test_query_cache_ttl_expiry():
+    cache = QueryCache(ttl_seconds=0)
+    cache.put("a", "SELECT 1")
+    time.sleep(0.01)
+
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_query_cache_persists_across_instances(tmp_path):
+    store = str(tmp_path / "query_cache.db")
+    QueryCache(persist_path=store).put("a", "SELECT 1")
+
+    assert QueryCache(persist_path=store).get("a") == "SELECT 1"
+
+
+def test_context_dependent_questions():
+    history = [HumanMessage(content="List Gold users"), AIMessage(content="...")]
+
+    assert not is_context_dependent("What about those users?", [])
+    assert is_context_dependent("What about those users?", history)
+    assert is_context_dependent("and Silver?", history)
+    assert not is_context_dependent("What is the total revenue yesterday?", history)
+
+
+# --- ResultCache ---
+
+def test_result_cache_key_ignores_formatting():
+    token = (1, 2, 3)
+    key_a = ResultCache.make_key("select  sum(total_revenue)\nfrom user_activity;", token)
+    key_b = ResultCache.make_key("SELECT SUM(total_revenue) FROM user_activity", token)
+    key_c = ResultCache.make_key("SELECT SUM(total_revenue) FROM user_activity", (1, 2, 4))
+
+    assert key_a == key_b
+    assert key_a != key_c
+
+
+def test_result_cache_literals_stay_case_sensitive():
+    token = (1, 2, 3)
+    key_a = ResultCache.make_key("SELECT 1 FROM t WHERE c = 'Gold'", token)
+    key_b = ResultCache.make_key("SELECT 1 FROM t WHERE c = 'GOLD'", token)
+
+    assert key_a != key_b
+
+
+def test_result_cache_evicts_by_size():
+    cache = ResultCache(max_bytes=100, max_entry_bytes=80, sizeof=len)
+    cache.put("a", "x" * 40)
+    cache.put("b", "y" * 40)
+    cache.put("c", "z" * 40)  # Pushes total to 120 bytes, "a" goes
+    cache.put("d", "w" * 90)  # Too big to cache at all
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "y" * 40
+    assert cache.get("d") is None
+    assert cache.stats()["bytes"] == 80
+    assert cache.stats()["evictions"] == 1
+
+
+def test_data_version_token_changes_on_write(sample_db):
+    probe = DataVersionProbe(sample_db)
+    before = probe.token()
+
+    conn = sqlite3.connect(sample_db)
+    conn.execute("INSERT INTO user_deposits VALUES ('u3', '2025-01-03', 1.0)")
+    conn.commit()
+    conn.close()
+
+    assert probe.token() != before
+
+
+def test_data_version_probe_connects_on_first_use(tmp_path):
+    probe = DataVersionProbe(str(tmp_path / "missing.db"))  # Nothing is opened yet
+
+    with pytest.raises(FileNotFoundError, match="setup_database.py"):
+        probe.token()
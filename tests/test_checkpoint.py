@@ -0,0 +1,126 @@
+import os
+import sys
+import time
+from typing import TypedDict
+
+import pytest
+
+# Ensure the src directory is in the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from langgraph.graph import END, START, StateGraph
+
+from core.checkpoint import SQLiteCheckpointSaver
+from core.results import QueryResult
+
+
+class CounterState(TypedDict):
+    question: str
+    count: int
+    result: QueryResult
+
+
+def build_graph(saver):
+    """A two-node graph; each run writes four checkpoints (input, start, two nodes)."""
+
+    def count(state):
+        return {"count": state.get("count", 0) + 1}
+
+    def answer(state):
+        rows = [(i, float(i), "x" * 20) for i in range(50)]
+        return {"result": QueryResult.from_rows(["a", "b", "c"], rows)}
+
+    builder = StateGraph(CounterState)
+    builder.add_node("increment", count)
+    builder.add_node("answer", answer)
+    builder.add_edge(START, "increment")
+    builder.add_edge("increment", "answer")
+    builder.add_edge("answer", END)
+    return builder.compile(checkpointer=saver)
+
+
+def config(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def test_state_survives_a_new_saver(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    graph = build_graph(SQLiteCheckpointSaver(path))
+    graph.invoke({"question": "first"}, config("a"))
+    graph.invoke({"question": "second"}, config("a"))
+
+    reopened = build_graph(SQLiteCheckpointSaver(path))
+    state = reopened.get_state(config("a")).values
+    assert state["question"] == "second"
+    assert state["count"] == 2
+    assert list(state["result"].rows())[3] == (3, 3.0, "x" * 20)
+
+
+def test_keep_last_checkpoints_per_thread(tmp_path):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.db"), keep_last=3)
+    graph = build_graph(saver)
+    for i in range(5):
+        graph.invoke({"question": f"q{i}"}, config("a"))
+    graph.invoke({"question": "other"}, config("b"))
+
+    assert len(list(graph.get_state_history(config("a")))) == 3
+    assert len(list(graph.get_state_history(config("b")))) == 3
+    assert graph.get_state(config("a")).values["count"] == 5
+    stale_writes = saver.conn.execute(
+        "SELECT COUNT(*) FROM writes WHERE checkpoint_id NOT IN (SELECT checkpoint_id FROM checkpoints)"
+    ).fetchone()[0]
+    assert stale_writes == 0
+
+
+def test_large_checkpoints_are_compressed(tmp_path):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.db"), compress_min_bytes=256)
+    build_graph(saver).invoke({"question": "q"}, config("a"))
+
+    types = {t for (t,) in saver.conn.execute("SELECT type FROM checkpoints")}
+    assert any(t.endswith("+zlib") for t in types)
+
+
+def test_idle_threads_are_pruned(tmp_path):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.db"), ttl_seconds=3600)
+    graph = build_graph(saver)
+    graph.invoke({"question": "old"}, config("old"))
+    graph.invoke({"question": "new"}, config("new"))
+    saver.conn.execute("UPDATE threads SET updated_at = ? WHERE thread_id = 'old'", (time.time() - 7200,))
+
+    assert saver.prune_idle() == 1
+    assert graph.get_state(config("old")).values == {}
+    assert graph.get_state(config("new")).values["question"] == "new"
+
+
+def test_list_filters_and_limits(tmp_path):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.db"), keep_last=10)
+    graph = build_graph(saver)
+    graph.invoke({"question": "q"}, config("a"))
+
+    history = list(saver.list(config("a")))
+    assert len(history) == 4
+    assert [c.metadata["step"] for c in history] == [2, 1, 0, -1]
+    assert len(list(saver.list(config("a"), limit=2))) == 2
+    assert [c.metadata["source"] for c in saver.list(config("a"), filter={"source": "input"})] == ["input"]
+    before = list(saver.list(config("a"), before=history[1].config))
+    assert [c.metadata["step"] for c in before] == [0, -1]
+
+    saver.delete_thread("a")
+    assert list(saver.list(config("a"))) == []
+
+
+@pytest.mark.parametrize("keep_last", [1, 2])
+def test_async_graph_with_small_retention(tmp_path, keep_last):
+    import asyncio
+
+    graph = build_graph(SQLiteCheckpointSaver(str(tmp_path / "checkpoints.db"), keep_last=keep_last))
+
+    async def run():
+        for i in range(3):
+            await graph.ainvoke({"question": f"q{i}"}, config("a"))
+        return (await graph.aget_state(config("a"))).values
+
+    assert asyncio.run(run())["count"] == 3
@@ -0,0 +1,96 @@
+import json
+import os
+import sys
+from typing import List, TypedDict
+
+# Ensure the src directory is in the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from core.fake_llm import FakeChatModel, load_recordings
+from scripts.benchmark_pipeline import build_workload, percentile
+
+RECORDINGS = [
+    {"question": "Total revenue?", "sql": ["SELECT SUM(revenu) FROM user_activity", "SELECT SUM(total_revenue) FROM user_activity"], "answer": "Revenue was 10."},
+    {"question": "Show me numbers", "sql": "CLARIFICATION_NEEDED: Which numbers?"},
+]
+
+
+def query_prompt(text):
+    return [SystemMessage(content="You are a highly accurate SQL generation engine."), HumanMessage(content=text)]
+
+
+def test_recordings_replay_sql_per_attempt_and_answers(tmp_path):
+    path = tmp_path / "recordings.json"
+    path.write_text(json.dumps(RECORDINGS))
+    llm = FakeChatModel(recordings=load_recordings(str(path)))
+
+    assert llm.invoke(query_prompt("Question: total  revenue?")).content == "SELECT SUM(revenu) FROM user_activity"
+    retry = (
+        "Previous attempt to answer the question: 'Total revenue?' failed with the following SQL error: "
+        "'no such column: revenu'. Please analyze the error and the schema to generate a corrected SQL query. "
+        "This is attempt 2."
+    )
+    assert llm.invoke(query_prompt(retry)).content == "SELECT SUM(total_revenue) FROM user_activity"
+    # Attempts past the end of the recording repeat the last query.
+    assert llm.invoke(query_prompt(retry.replace("attempt 2", "attempt 3"))).content.endswith("(total_revenue) FROM user_activity")
+    assert llm.invoke(query_prompt("Question: Show me numbers")).content.startswith("CLARIFICATION_NEEDED:")
+
+    answer_prompt = [SystemMessage(content="You explain results."), HumanMessage(content="Original User Question: Total revenue?\n\nResult from SQL Query:\n10")]
+    assert llm.invoke(answer_prompt).content == "Revenue was 10."
+
+
+def test_retry_prompts_can_ask_for_several_candidates(tmp_path):
+    path = tmp_path / "recordings.json"
+    path.write_text(json.dumps(RECORDINGS))
+    llm = FakeChatModel(recordings=load_recordings(str(path)))
+    retry = (
+        "Question: Previous attempt to answer the question: 'Total revenue?' failed with the following SQL error: "
+        "'no such column: revenu'. Please analyze the error and the schema to generate a corrected SQL query. "
+        "Return 3 alternative corrected queries, each fixing it in a different way, most likely first. "
+        "This is attempt 1."
+    )
+
+    class QueryCandidates(TypedDict):
+        queries: List[str]
+
+    candidates = llm.with_structured_output(QueryCandidates).invoke(query_prompt(retry))
+    assert candidates == {"queries": [RECORDINGS[0]["sql"][0]] + [RECORDINGS[0]["sql"][1]] * 2}
+
+
+def test_unrecorded_questions_use_canned_queries():
+    llm = FakeChatModel(queries={"deposit": "SELECT 1"})
+
+    assert llm.invoke(query_prompt("Question: How many deposits?")).content == "SELECT 1"
+    assert llm.invoke(query_prompt("Question: Anything else")).content == llm.default_query
+
+
+def test_benchmark_workload_is_deterministic_and_unique():
+    conversations, recordings = build_workload(200, seed=1)
+
+    assert (conversations, recordings) == build_workload(200, seed=1)
+    questions = [q for _, turns in conversations for q in turns]
+    assert len(questions) >= 200 and len(set(questions)) == len(questions)
+    assert {scenario for scenario, _ in conversations} == {"single", "follow_up", "retry", "retry_twice", "clarification"}
+    assert {r["question"] for r in recordings} == set(questions)
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert (percentile(values, 50), percentile(values, 95), percentile(values, 99)) == (50, 95, 99)
+    assert percentile([7.0], 99) == 7.0
+
+
+def test_streaming_matches_invoke():
+    llm = FakeChatModel(queries={"deposit": "SELECT SUM(total_deposit) FROM user_deposits"})
+    prompt = query_prompt("Question: Total deposits?")
+
+    chunks = list(llm.stream(prompt))
+    assert len(chunks) == 4
+    assert "".join(chunk.content for chunk in chunks) == llm.invoke(prompt).content
+    # Usage is reported once, on the last chunk.
+    assert [chunk.usage_metadata is not None for chunk in chunks] == [False, False, False, True]
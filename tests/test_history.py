@@ -0,0 +1,74 @@
+import os
+import sys
+
+# Ensure the src directory is in the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from core.fake_llm import FakeChatModel
+from core.history import ConversationHistory, Turn, llm_summarizer
+from core.prompts import format_chat_history_for_prompt
+
+
+def test_recent_turns_verbatim_older_turns_summarized():
+    history = ConversationHistory(max_turns=2, token_budget=1000, summary_token_budget=200)
+    for i in range(5):
+        history.add_turn(f"Question {i}?", f"Answer {i}. More detail.", sql=f"SELECT {i}")
+
+    messages = history.messages()
+    assert isinstance(messages[0], SystemMessage)
+    assert history.summary.splitlines() == [f"- User asked: Question {i}? -> Answer {i}." for i in range(3)]
+    assert [m.content for m in messages[1:]] == [
+        "Question 3?", "SQL Query: SELECT 3 \nAnswer: Answer 3. More detail.",
+        "Question 4?", "SQL Query: SELECT 4 \nAnswer: Answer 4. More detail.",
+    ]
+    assert isinstance(messages[1], HumanMessage) and isinstance(messages[2], AIMessage)
+    assert len(history) == 5
+
+    prompt_text = format_chat_history_for_prompt(messages)
+    assert prompt_text.startswith("SYSTEM: Summary of the earlier conversation:")
+
+
+def test_prompt_size_stays_within_budget():
+    history = ConversationHistory(max_turns=4, token_budget=400, summary_token_budget=100)
+    sizes = []
+    for i in range(300):
+        history.add_turn(f"What happened on day {i}? " * (i % 5 + 1), f"On day {i} revenue was {i * 10}. " * 20)
+        sizes.append(history.token_count())
+
+    assert max(sizes) <= 400
+    # Flat once the window is full: late turns cost the same as earlier ones.
+    assert abs(sum(sizes[200:]) / 100 - sum(sizes[100:200]) / 100) < 20
+
+
+def test_oversized_turn_is_truncated():
+    history = ConversationHistory(max_turns=4, token_budget=200, summary_token_budget=50)
+    history.add_turn("Show everything", "x" * 10_000)
+
+    assert history.token_count() <= 200
+    assert history.messages()[-1].content.endswith("...")
+
+
+def test_summary_is_computed_incrementally():
+    calls = []
+
+    def summarizer(summary, turn):
+        calls.append((summary, turn.question))
+        return f"{summary}|{turn.question}" if summary else turn.question
+
+    history = ConversationHistory(max_turns=1, summarizer=summarizer)
+    for question in ["a", "b", "c"]:
+        history.add_turn(question, "answer")
+
+    assert calls == [("", "a"), ("a", "b")]
+    assert history.summary == "a|b"
+
+
+def test_llm_summarizer_uses_the_model():
+    summarize = llm_summarizer(FakeChatModel())
+    summary = summarize("", Turn("What is Gold revenue?", "Gold revenue is 10."))
+    assert "Gold revenue" in summary
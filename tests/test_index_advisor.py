@@ -0,0 +1,140 @@
+import os
+import sys
+import sqlite3
+
+import pytest
+
+# Ensure the src directory is in the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.index_advisor import (
+    QueryLog,
+    IndexAdvisor,
+    IndexCandidate,
+    column_usage,
+    candidate_indexes,
+    explain_full_scans,
+)
+
+DATE_RANGE_SQL = (
+    "SELECT SUM(total_revenue) FROM user_activity WHERE date >= '2025-01-20'"
+)
+CATEGORY_SQL = (
+    "SELECT COUNT(*) FROM user_activity AS a "
+    "WHERE a.loyalty_category = 'Gold' AND a.date BETWEEN '2025-01-01' AND '2025-01-07'"
+)
+COLUMNS = ["userid", "date", "loyalty_category", "total_revenue"]
+ALIASES = {"user_activity": "user_activity", "a": "user_activity"}
+
+
+@pytest.fixture
+def activity_db(tmp_path):
+    """user_activity with a (userid, date) primary key: 200 users x 31 days."""
+    db_path = str(tmp_path / "activity.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE user_activity (userid TEXT NOT NULL, date DATE NOT NULL, "
+        "loyalty_category TEXT, total_revenue REAL, PRIMARY KEY (userid, date))"
+    )
+    categories = ["Bronze", "Silver", "Gold"]
+    conn.executemany(
+        "INSERT INTO user_activity VALUES (?, ?, ?, ?)",
+        [
+            (f"user-{u:03d}", f"2025-01-{d:02d}", categories[(u + d) % 3], float(u * d))
+            for u in range(200)
+            for d in range(1, 32)
+        ],
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def test_query_log_aggregates_by_canonical_sql(tmp_path):
+    log = QueryLog(str(tmp_path / "log.db"))
+    assert not (tmp_path / "log.db").exists()  # Created by the first record()
+    log.record("select count(*) from user_activity", 0.5)
+    log.record("SELECT COUNT(*)\nFROM user_activity;", 1.5)
+    log.record("SELECT 1", 0.1)
+
+    entries = log.entries()
+    assert entries[0][1:] == (2, 2.0)
+    assert len(entries) == 2
+
+
+def test_column_usage_and_candidates():
+    usage = column_usage(CATEGORY_SQL, "user_activity", COLUMNS, ALIASES)
+
+    assert usage.equality == ["loyalty_category"]
+    assert usage.range == ["date"]
+    assert candidate_indexes(usage, "user_activity") == [
+        IndexCandidate("user_activity", ("loyalty_category", "date"))
+    ]
+
+    usage = column_usage(DATE_RANGE_SQL, "user_activity", COLUMNS, ALIASES)
+    assert candidate_indexes(usage, "user_activity") == [
+        IndexCandidate("user_activity", ("date",)),
+        IndexCandidate("user_activity", ("date", "total_revenue")),
+    ]
+
+
+def test_date_filter_is_a_full_scan(activity_db):
+    conn = sqlite3.connect(activity_db)
+    assert explain_full_scans(conn, DATE_RANGE_SQL) == ["user_activity"]
+    assert explain_full_scans(conn, "SELECT * FROM user_activity WHERE userid = 'u'") == []
+
+
+def test_advisor_measures_without_changing_the_database(activity_db):
+    advisor = IndexAdvisor(activity_db, repeat=1)
+    recommendations = advisor.recommend([(CATEGORY_SQL, 10, 0.0)], min_saved_fraction=-1.0)
+    advisor.close()
+
+    assert recommendations[0].candidate.columns == ("loyalty_category", "date")
+    assert recommendations[0].queries == [CATEGORY_SQL]
+    conn = sqlite3.connect(activity_db)
+    assert conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE name LIKE 'idx_advisor_%'"
+    ).fetchone()[0] == 0
+
+
+def test_advisor_apply_creates_index(activity_db):
+    advisor = IndexAdvisor(activity_db, repeat=1)
+    recommendations = advisor.recommend([(DATE_RANGE_SQL, 1, 0.0)], min_saved_fraction=-1.0)
+    advisor.apply(recommendations)
+
+    conn = sqlite3.connect(activity_db)
+    assert explain_full_scans(conn, DATE_RANGE_SQL) == []
+    # Nothing left to recommend once the index exists.
+    assert advisor.recommend([(DATE_RANGE_SQL, 1, 0.0)], min_saved_fraction=-1.0) == []
+    advisor.close()
+
+
+def test_advisor_skips_queries_over_budget(activity_db):
+    cross_join = (
+        "SELECT COUNT(*) FROM user_activity a, user_activity b "
+        "WHERE a.total_revenue > 0 AND b.date >= '2025-01-20'"
+    )
+    advisor = IndexAdvisor(activity_db, repeat=1, max_instructions=100_000)
+    recommendations = advisor.recommend(
+        [(cross_join, 5, 0.0), (DATE_RANGE_SQL, 1, 0.0)], min_saved_fraction=-1.0
+    )
+    advisor.close()
+
+    assert "instructions" in advisor.skipped[cross_join]
+    assert DATE_RANGE_SQL not in advisor.skipped
+    assert all(cross_join not in r.queries for r in recommendations)
+    assert any(DATE_RANGE_SQL in r.queries for r in recommendations)
+
+
+def test_advisor_replays_logged_queries_read_only(activity_db):
+    delete = "DELETE FROM user_activity WHERE date >= '2025-01-20'"
+    advisor = IndexAdvisor(activity_db, repeat=1)
+    assert advisor.recommend([(delete, 1, 0.0)], min_saved_fraction=-1.0) == []
+    advisor.close()
+
+    assert delete in advisor.skipped
+    conn = sqlite3.connect(activity_db)
+    assert conn.execute("SELECT COUNT(*) FROM user_activity").fetchone()[0] == 200 * 31
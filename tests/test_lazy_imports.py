@@ -0,0 +1,46 @@
+import json
+import os
+import subprocess
+import sys
+
+# Ensure the src directory is in the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+def loaded_modules_after(code: str) -> set:
+    """Runs `code` in a fresh interpreter and returns the top-level packages it loaded."""
+    script = (
+        f"import sys, json; sys.path.insert(0, {SRC_DIR!r})\n{code}\n"
+        "print(json.dumps(sorted({name.split('.')[0] for name in sys.modules})))"
+    )
+    env = {**os.environ, "LLM_PROVIDER": "fake", "QUERY_LOG_PATH": ""}
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", script],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return set(json.loads(output.strip().splitlines()[-1]))
+
+
+def test_cli_prompt_needs_no_heavy_imports():
+    modules = loaded_modules_after("import main_cli")
+    assert not modules & {"langchain", "langchain_core", "langchain_community", "langgraph", "sqlalchemy"}
+
+
+def test_importing_the_graph_builds_nothing():
+    code = "import core.graph, core.llm, core.database"
+    modules = loaded_modules_after(code)
+    # LangGraph is needed to define the graph; the SQL and LLM integrations are not.
+    assert "langgraph" in modules
+    assert not modules & {"langchain_community", "sqlalchemy"}
+
+    code += (
+        "\nassert core.graph.get_compiled_graph.cache_info().currsize == 0"
+        "\nassert core.llm.get_llm.cache_info().currsize == 0"
+        "\nassert core.database.get_shared_db.cache_info().currsize == 0"
+        "\nassert core.graph.compiled_graph is core.graph.get_compiled_graph()"
+        "\nassert core.llm.llm_instance is core.llm.get_llm()"
+    )
+    loaded_modules_after(code)
@@ -0,0 +1,301 @@
+import json
+import os
+import subprocess
+import sys
+import sqlite3
+import threading
+import time
+from array import array
+
+import pytest
+
+# Ensure the src directory is in the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from core.results import QueryResult, result_to_prompt_text
+from core import database
+from core.database import ReadOnlyConnectionPool, get_execution_pool
+from core.executor import (
+    execute_sql,
+    QueryGuard,
+    QueryExecutionError,
+    cancel_queries,
+    clear_cancellation,
+)
+
+# 250^3 rows: far too slow to finish inside any of the budgets below.
+CROSS_JOIN_SQL = (
+    "SELECT COUNT(*) FROM user_activity a, user_activity b, user_activity c "
+    "WHERE a.total_revenue + b.total_revenue + c.total_revenue < 0"
+)
+
+
+@pytest.fixture
+def activity_db(tmp_path):
+    """A database with 250 user_activity rows."""
+    db_path = str(tmp_path / "activity.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE user_activity (userid TEXT, date DATE, total_revenue REAL)")
+    conn.executemany(
+        "INSERT INTO user_activity VALUES (?, ?, ?)",
+        [(f"user-{i}", "2025-01-01", float(i)) for i in range(250)],
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+# --- QueryResult ---
+
+def test_query_result_packs_numeric_columns():
+    rows = [("u1", 3, 1.5), ("u2", 4, 2.5)]
+    result = QueryResult.from_rows(["userid", "games_count", "wager"], rows)
+
+    assert result.kinds == ["text", "int", "float"]
+    assert result.row_count == 2
+    assert isinstance(result.column(1), array)
+    assert list(result.rows()) == rows
+    assert result.to_dict() == {
+        "userid": ["u1", "u2"],
+        "games_count": [3, 4],
+        "wager": [1.5, 2.5],
+    }
+
+
+def test_query_result_keeps_nulls_and_mixed_types():
+    rows = [(1, None), (2.5, "x")]
+    result = QueryResult.from_rows(["a", "b"], rows)
+
+    assert result.kinds == ["mixed", "mixed"]
+    assert list(result.rows()) == rows
+
+
+def test_query_result_prompt_text():
+    empty = QueryResult.from_rows(["total"], [])
+    truncated = QueryResult.from_rows(["total"], [(1,)], truncated=True)
+
+    assert empty.to_prompt_text() == "Columns: total\nRows: []"
+    assert "truncated" in truncated.to_prompt_text()
+    assert result_to_prompt_text("ERROR_EXECUTING_QUERY: boom") == "ERROR_EXECUTING_QUERY: boom"
+
+
+def test_query_result_survives_checkpoint_serialization():
+    serde = JsonPlusSerializer()
+    result = QueryResult.from_rows(["userid", "total"], [("u1", 10.5), ("u2", 3.0)])
+
+    restored = serde.loads_typed(serde.dumps_typed(result))
+
+    assert isinstance(restored, QueryResult)
+    assert list(restored.rows()) == list(result.rows())
+
+
+# --- Capped execution ---
+
+def test_execute_sql_returns_everything_under_the_cap(activity_db):
+    result = execute_sql("SELECT userid FROM user_activity", db_path=activity_db, max_rows=250)
+
+    assert result.row_count == 250
+    assert not result.truncated
+
+
+def test_execute_sql_stops_at_row_cap(activity_db):
+    result = execute_sql(
+        "SELECT userid, total_revenue FROM user_activity",
+        db_path=activity_db,
+        max_rows=30,
+        batch_size=7,
+    )
+
+    assert result.row_count == 30
+    assert result.truncated
+    assert list(result.column(1))[-1] == 29.0
+
+
+def test_execute_sql_stops_at_byte_cap(activity_db):
+    result = execute_sql(
+        "SELECT userid FROM user_activity", db_path=activity_db, max_bytes=60
+    )
+
+    # "user-0" .. "user-9" are 6 bytes each
+    assert result.row_count == 10
+    assert result.truncated
+
+
+# --- Budgets & cancellation ---
+
+def test_execute_sql_enforces_time_budget(activity_db):
+    start = time.monotonic()
+    with pytest.raises(QueryExecutionError) as exc_info:
+        execute_sql(CROSS_JOIN_SQL, db_path=activity_db, guard=QueryGuard(timeout_seconds=0.2))
+
+    assert exc_info.value.kind == "timeout"
+    assert time.monotonic() - start < 2
+
+
+def test_time_budget_starts_when_the_query_starts(activity_db):
+    guard = QueryGuard(timeout_seconds=0.2, interval=100)
+    time.sleep(0.3)  # e.g. queued behind other queries on the executor
+
+    result = execute_sql("SELECT COUNT(*) FROM user_activity a, user_activity b", db_path=activity_db, guard=guard)
+
+    assert result.row_count == 1 and guard.reason is None
+
+
+def test_execute_sql_enforces_instruction_budget(activity_db):
+    guard = QueryGuard(max_instructions=100_000, interval=1_000)
+    with pytest.raises(QueryExecutionError) as exc_info:
+        execute_sql(CROSS_JOIN_SQL, db_path=activity_db, guard=guard)
+
+    assert exc_info.value.kind == "instruction_budget"
+
+
+def test_reused_guard_gives_each_query_the_full_budget(activity_db):
+    guard = QueryGuard(max_instructions=20_000, interval=100)
+    with pytest.raises(QueryExecutionError):
+        execute_sql(CROSS_JOIN_SQL, db_path=activity_db, guard=guard)
+
+    # e.g. the base query run after a failed rollup query
+    result = execute_sql("SELECT SUM(total_revenue) FROM user_activity", db_path=activity_db, guard=guard)
+
+    assert result.row_count == 1 and guard.reason is None
+
+
+def test_execute_sql_can_be_cancelled_from_another_thread(activity_db):
+    timer = threading.Timer(0.2, cancel_queries, args=("conversation-1",))
+    timer.start()
+    try:
+        with pytest.raises(QueryExecutionError) as exc_info:
+            execute_sql(CROSS_JOIN_SQL, db_path=activity_db, cancel_key="conversation-1")
+    finally:
+        timer.cancel()
+        clear_cancellation("conversation-1")
+
+    assert exc_info.value.kind == "cancelled"
+
+
+def test_cancelling_an_idle_conversation_does_not_cancel_its_next_question():
+    # Runs the whole graph (fake LLM, bundled database) in a fresh interpreter, so the
+    # offline settings are in place before the config is read.
+    script = (
+        f"import asyncio, json, sys; sys.path.insert(0, {SRC_DIR!r})\n"
+        "from core.graph import get_compiled_async_graph, get_compiled_graph\n"
+        "from core.graph_components import cancel_question, new_question_input\n"
+        "question = new_question_input('How many activity rows are there?', [])\n"
+        "cancel_question('sync')\n"
+        "sync = get_compiled_graph().invoke(question, {'configurable': {'thread_id': 'sync'}})\n"
+        "cancel_question('async')\n"
+        "graph = get_compiled_async_graph()\n"
+        "aio = asyncio.run(graph.ainvoke(question, {'configurable': {'thread_id': 'async'}}))\n"
+        "print(json.dumps([sync['error_kind'], sync['answer'], aio['error_kind'], aio['answer']]))"
+    )
+    env = {**os.environ, "LLM_PROVIDER": "fake", "QUERY_LOG_PATH": "", "CHECKPOINTER": "memory"}
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", script],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    sync_kind, sync_answer, async_kind, async_answer = json.loads(output.strip().splitlines()[-1])
+
+    assert sync_kind is None and "cancelled" not in sync_answer.lower()
+    assert async_kind is None and "cancelled" not in async_answer.lower()
+
+
+# --- Read-only connection pool ---
+
+def test_pool_warm_up_does_not_block_other_pools(activity_db, tmp_path, monkeypatch):
+    # In mmap mode the main database's pool is warmed before it is shared.
+    monkeypatch.setattr(database, "_execution_pools", {})
+    monkeypatch.setattr(database, "DB_MMAP_MODE", True)
+    monkeypatch.setattr(database, "DB_PATH", activity_db)
+    warming, release = threading.Event(), threading.Event()
+
+    def slow_warm_up(pool, tables):
+        warming.set()
+        release.wait(5)
+        return {}
+
+    monkeypatch.setattr(ReadOnlyConnectionPool, "warm_up", slow_warm_up)
+    pools = []
+    threads = [threading.Thread(target=lambda: pools.append(get_execution_pool(activity_db))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    warming.wait(5)
+
+    start = time.monotonic()
+    other = get_execution_pool(str(tmp_path / "other.db"))
+    waited = time.monotonic() - start
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert waited < 1  # Not held up by the warm-up
+    assert other is not pools[0]
+    assert pools[0] is pools[1] is get_execution_pool(activity_db)
+
+
+def test_pool_connections_are_read_only(activity_db):
+    pool = ReadOnlyConnectionPool(activity_db, size=1)
+    with pool.connection() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM user_activity")
+        assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+
+
+def test_pool_hands_out_separate_connections_and_records_waits(activity_db):
+    pool = ReadOnlyConnectionPool(activity_db, size=2)
+    with pool.connection() as first, pool.connection() as second:
+        assert first is not second
+
+    released = threading.Event()
+
+    def hold_connection():
+        with pool.connection():
+            released.wait()
+
+    holders = [threading.Thread(target=hold_connection) for _ in range(2)]
+    for holder in holders:
+        holder.start()
+    threading.Timer(0.1, released.set).start()
+    time.sleep(0.02)
+    with pool.connection():
+        pass
+    for holder in holders:
+        holder.join()
+
+    stats = pool.stats()
+    assert stats["open"] == 2
+    assert stats["checkouts"] == 5
+    assert stats["max_wait_ms"] >= 50
+
+
+def test_shared_cache_pool_warm_up(activity_db):
+    pool = ReadOnlyConnectionPool(
+        activity_db, size=2, pragmas={"mmap_size": 1024 * 1024}, shared_cache=True
+    )
+    timings = pool.warm_up(["user_activity", "missing_table"])
+
+    assert list(timings) == ["user_activity"]
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA mmap_size").fetchone()[0] == 1024 * 1024
+        assert conn.execute("SELECT COUNT(*) FROM user_activity").fetchone()[0] == 250
+
+
+def test_warm_up_reads_the_primary_key_index(tmp_path):
+    db_path = str(tmp_path / "keyed.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE user_deposits (userid TEXT, date DATE, total_deposit REAL, PRIMARY KEY (userid, date))")
+    conn.execute("CREATE INDEX idx_deposits_date ON user_deposits (date)")  # Smaller than the key
+    conn.commit()
+    conn.close()
+    pool = ReadOnlyConnectionPool(db_path, size=1)
+    statements = []
+    with pool.connection() as conn:
+        conn.set_trace_callback(statements.append)
+
+    pool.warm_up(["user_deposits"])
+
+    assert any('INDEXED BY "sqlite_autoindex_user_deposits_1"' in sql for sql in statements)
@@ -0,0 +1,219 @@
+import math
+import os
+import sys
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+# Ensure the src directory is in the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.rollups import ROLLUPS, RollupRouter, refresh_rollups, rewrite_for_rollup
+from scripts.setup_database import create_tables, generate_dummy_data
+
+ACTIVITY, GAMES, DEPOSITS = ROLLUPS
+
+# Queries the LLM typically writes for "sum per day/week/month/category" questions.
+# Each one must be routed to a rollup and return the same result as the base table.
+EQUIVALENCE_CORPUS = [
+    "SELECT SUM(total_revenue) FROM user_activity",
+    "SELECT COUNT(*) FROM user_activity WHERE date >= DATE('now', '-7 days')",
+    "select loyalty_category, sum(total_revenue) as revenue from user_activity "
+    "group by loyalty_category order by revenue desc",
+    "SELECT date, SUM(total_bonus), COUNT(*) FROM user_activity GROUP BY date ORDER BY date",
+    "SELECT strftime('%Y-%m', date) AS month, loyalty_category, SUM(total_revenue) AS total_revenue "
+    "FROM user_activity GROUP BY month, loyalty_category ORDER BY month, total_revenue DESC",
+    "SELECT strftime('%Y-%W', ua.date) AS week, SUM(ua.total_withdrawls) FROM user_activity AS ua "
+    "WHERE ua.loyalty_category IN ('Gold', 'Platinum') GROUP BY week ORDER BY week",
+    "SELECT SUM(user_activity.total_revenue) * 1.0 / COUNT(*) FROM user_activity "
+    "WHERE loyalty_category = 'Diamond'",
+    "SELECT loyalty_category, COUNT(*) FROM user_activity GROUP BY loyalty_category "
+    "HAVING COUNT(*) > 10 ORDER BY loyalty_category",
+    "SELECT MIN(date), MAX(date), SUM(total_revenue) FROM user_activity;",
+    "SELECT COUNT(*) FROM user_activity WHERE date = '1999-01-01'",
+    "SELECT date, SUM(games_count), SUM(wager) FROM user_game_summary "
+    "GROUP BY date ORDER BY date DESC LIMIT 7",
+    "SELECT SUM(total_gamewon), SUM(total_gamelost) FROM user_game_summary "
+    "WHERE date BETWEEN DATE('now', '-30 days') AND DATE('now')",
+    "SELECT strftime('%Y-%m', date) AS month, SUM(total_deposit), SUM(deposit_count) "
+    "FROM user_deposits GROUP BY month ORDER BY month",
+    "SELECT SUM(total_deposit) / SUM(deposit_count) AS avg_deposit FROM user_deposits",
+    # Implicit (AS-less) table and column aliases.
+    "SELECT loyalty_category, COUNT(*) FROM user_activity ua GROUP BY loyalty_category",
+    "SELECT ua.loyalty_category, COUNT(*) cnt, SUM(ua.total_bonus) bonus FROM user_activity ua "
+    "WHERE ua.date >= DATE('now', '-30 days') GROUP BY ua.loyalty_category ORDER BY cnt DESC",
+    "SELECT date, SUM(total_revenue) total_revenue FROM user_activity GROUP BY date "
+    "ORDER BY total_revenue DESC LIMIT 5",
+]
+
+# Queries whose result depends on individual rows; they must run on the base tables.
+NOT_REWRITTEN = [
+    "SELECT userid, SUM(total_revenue) FROM user_activity GROUP BY userid",
+    "SELECT COUNT(DISTINCT userid) FROM user_activity",
+    "SELECT AVG(total_revenue) FROM user_activity",
+    "SELECT MAX(total_revenue) FROM user_activity",
+    "SELECT COUNT(loyalty_category) FROM user_activity",
+    "SELECT SUM(total_revenue * 2) FROM user_activity",
+    "SELECT COUNT(*) FROM user_activity WHERE total_revenue > 100",
+    "SELECT * FROM user_activity WHERE date = '2025-01-01'",
+    "SELECT loyalty_category FROM user_activity WHERE date = '2025-01-01'",
+    "SELECT loyalty_category, SUM(total_revenue) FROM user_activity",
+    "SELECT SUM(total_revenue) OVER (ORDER BY date) FROM user_activity",
+    "SELECT SUM(a.total_revenue) FROM user_activity a JOIN user_deposits d "
+    "ON a.userid = d.userid AND a.date = d.date",
+    "SELECT SUM(total_revenue) FROM user_activity, user_deposits",
+    "SELECT SUM(total_revenue) FROM user_activity WHERE date = (SELECT MAX(date) FROM user_activity)",
+]
+
+
+@pytest.fixture(scope="module")
+def rollup_db(tmp_path_factory):
+    """Synthetic data for 40 users over 90 days, with rollups built."""
+    db_path = str(tmp_path_factory.mktemp("rollups") / "rollups.db")
+    conn = sqlite3.connect(db_path)
+    create_tables(conn)
+    generate_dummy_data(conn, num_users=40, num_days=90, seed=7)
+    conn.isolation_level = None
+    refresh_rollups(conn)
+    conn.close()
+    return db_path
+
+
+def make_router(db_path):
+    @contextmanager
+    def connect():
+        conn = sqlite3.connect(db_path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    return RollupRouter(connect)
+
+
+def assert_same_result(expected, actual, ordered):
+    if not ordered:
+        expected, actual = sorted(expected, key=repr), sorted(actual, key=repr)
+    assert len(expected) == len(actual)
+    for expected_row, actual_row in zip(expected, actual):
+        for e, a in zip(expected_row, actual_row):
+            if isinstance(e, float) or isinstance(a, float):
+                assert math.isclose(e, a, rel_tol=1e-9, abs_tol=1e-6)
+            else:
+                assert e == a
+
+
+@pytest.mark.parametrize("sql", EQUIVALENCE_CORPUS)
+def test_rewrite_is_equivalent(rollup_db, sql):
+    rewritten = make_router(rollup_db).rewrite(sql)
+    assert rewritten is not None and "rollup_" in rewritten
+
+    conn = sqlite3.connect(rollup_db)
+    expected_cursor = conn.execute(sql)
+    expected = expected_cursor.fetchall()
+    actual_cursor = conn.execute(rewritten)
+    actual = actual_cursor.fetchall()
+
+    assert [d[0] for d in actual_cursor.description] == [d[0] for d in expected_cursor.description]
+    assert_same_result(expected, actual, ordered="ORDER BY" in sql.upper())
+
+
+@pytest.mark.parametrize("sql", NOT_REWRITTEN)
+def test_row_level_queries_are_not_rewritten(rollup_db, sql):
+    assert make_router(rollup_db).rewrite(sql) is None
+
+
+def test_count_star_becomes_row_count_sum():
+    rewritten = rewrite_for_rollup("SELECT COUNT(*) FROM user_deposits", DEPOSITS)
+
+    assert rewritten == (
+        'SELECT COALESCE(SUM(row_count), 0) AS "COUNT(*)" '
+        'FROM "rollup_deposits_daily" AS "user_deposits"'
+    )
+
+
+def test_stale_rollups_are_not_used(tmp_path):
+    db_path = str(tmp_path / "stale.db")
+    conn = sqlite3.connect(db_path)
+    create_tables(conn)
+    generate_dummy_data(conn, num_users=3, num_days=5, seed=1)
+    conn.isolation_level = None
+    refresh_rollups(conn)
+    router = make_router(db_path)
+    sql = "SELECT SUM(total_deposit) FROM user_deposits"
+    assert router.rewrite(sql, token=1) is not None
+
+    conn.execute("INSERT INTO user_deposits VALUES ('new-user', '2030-01-01', 5.0, 1)")
+    assert router.rewrite(sql, token=2) is None
+
+    refresh_rollups(conn)
+    assert router.rewrite(sql, token=3) is not None
+    conn.close()
+
+
+def test_in_place_measure_updates_make_rollups_stale(tmp_path):
+    db_path = str(tmp_path / "updated.db")
+    conn = sqlite3.connect(db_path)
+    create_tables(conn)
+    generate_dummy_data(conn, num_users=3, num_days=5, seed=1)
+    conn.isolation_level = None
+    refresh_rollups(conn)
+    router = make_router(db_path)
+    sql = "SELECT SUM(total_deposit) FROM user_deposits"
+    assert router.rewrite(sql, token=1) is not None
+
+    # Row count and row ids stay the same; only the measure changes.
+    conn.execute("UPDATE user_deposits SET total_deposit = total_deposit + 1 WHERE rowid = 1")
+    assert router.rewrite(sql, token=2) is None
+    conn.close()
+
+
+def test_delete_and_reinsert_makes_rollups_stale(tmp_path):
+    db_path = str(tmp_path / "reinserted.db")
+    conn = sqlite3.connect(db_path)
+    create_tables(conn)
+    generate_dummy_data(conn, num_users=3, num_days=5, seed=1)
+    conn.isolation_level = None
+    refresh_rollups(conn)
+    router = make_router(db_path)
+    sql = "SELECT SUM(total_deposit) FROM user_deposits"
+    assert router.rewrite(sql, token=1) is not None
+
+    # Same row count, same max rowid and same totals, but different rows.
+    row = conn.execute("SELECT rowid, * FROM user_deposits ORDER BY rowid DESC LIMIT 1").fetchone()
+    conn.execute("DELETE FROM user_deposits WHERE rowid = ?", (row[0],))
+    conn.execute("INSERT INTO user_deposits (rowid, userid, date, total_deposit, deposit_count) "
+                 "VALUES (?, 'moved-user', ?, ?, ?)", (row[0], *row[2:]))
+    assert router.rewrite(sql, token=2) is None
+    conn.close()
+
+
+def test_freshness_check_does_not_scan_the_sources(tmp_path):
+    db_path = str(tmp_path / "cheap.db")
+    conn = sqlite3.connect(db_path)
+    create_tables(conn)
+    generate_dummy_data(conn, num_users=3, num_days=5, seed=1)
+    conn.isolation_level = None
+    refresh_rollups(conn)
+    conn.close()
+
+    statements = []
+
+    @contextmanager
+    def connect():
+        traced = sqlite3.connect(db_path)
+        traced.set_trace_callback(statements.append)
+        try:
+            yield traced
+        finally:
+            traced.close()
+
+    router = RollupRouter(connect)
+    assert router.fresh_rollups(token=1) == list(ROLLUPS)
+    sources = {spec.source for spec in ROLLUPS}
+    assert statements
+    assert not any(source in sql for sql in statements for source in sources)
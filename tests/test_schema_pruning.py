@@ -0,0 +1,130 @@
+import os
+import sys
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+# Ensure the src directory is in the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from langchain_community.utilities import SQLDatabase
+
+from core.cache import SchemaCache
+from core.schema_pruning import (
+    SchemaPruner,
+    prune_table_info,
+    table_columns,
+    tokenize_text,
+)
+from scripts.setup_database import create_tables, generate_dummy_data
+
+
+@pytest.fixture(scope="module")
+def pruner(tmp_path_factory):
+    """A pruner over the app's three tables with a little data for the sample rows."""
+    db_path = str(tmp_path_factory.mktemp("pruning") / "pruning.db")
+    conn = sqlite3.connect(db_path)
+    create_tables(conn)
+    generate_dummy_data(conn, num_users=2, num_days=5, seed=3)
+    conn.close()
+    db = SQLDatabase.from_uri(f"sqlite:///{db_path}")
+    return SchemaPruner(SchemaCache(db, db_path))
+
+
+def test_tokenizer_stems_plurals_and_splits_identifiers():
+    assert tokenize_text("How many deposits were deposited?") == ["deposit", "deposit"]
+    assert tokenize_text("total_gamewon games losses") == ["gamewon", "game", "loss"]
+
+
+def test_question_selects_matching_table_and_columns(pruner):
+    selection = pruner.select("How many deposits were made last week?")
+
+    assert selection == {
+        "user_deposits": ["userid", "date", "total_deposit", "deposit_count"]
+    }
+
+
+def test_columns_are_pruned_but_keys_kept(pruner):
+    selection = pruner.select("Which loyalty tier has the highest revenue?")
+
+    assert selection == {
+        "user_activity": ["userid", "date", "loyalty_category", "total_revenue"]
+    }
+    table_info = pruner.table_info_for("Which loyalty tier has the highest revenue?")
+    assert "total_bonus" not in table_info
+    assert "PRIMARY KEY (userid, date)" in table_info
+
+
+def test_multi_table_question(pruner):
+    selection = pruner.select("Average wager for Platinum players")
+
+    assert set(selection) == {"user_activity", "user_game_summary"}
+    assert "wager" in selection["user_game_summary"]
+    assert "loyalty_category" in selection["user_activity"]
+
+
+def test_unmatched_question_falls_back_to_full_schema(pruner):
+    assert pruner.table_info_for("hello there") is None
+
+
+def test_prune_table_info_keeps_format(pruner):
+    table_info = pruner._schema_cache.get_table_infos()["user_deposits"]
+    columns, keys = table_columns(table_info)
+    assert columns == ["userid", "date", "total_deposit", "deposit_count"]
+    assert keys == ["userid", "date"]
+
+    pruned = prune_table_info(table_info, ["userid", "date", "deposit_count"])
+    lines = pruned.splitlines()
+
+    assert "\ttotal_deposit REAL DEFAULT 0, " not in lines
+    assert "\tdeposit_count INTEGER DEFAULT 0, " in lines
+    assert "userid\tdate\tdeposit_count" in lines
+    assert all(len(line.split("\t")) == 3 for line in lines[lines.index("userid\tdate\tdeposit_count"):-1])
+
+
+class AlternatingSchemaCache:
+    """Switches between two schemas on every lookup, as if the file kept changing."""
+
+    def __init__(self, versions):
+        self._versions = versions
+        self._lookups = 0
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        with self._lock:
+            self._lookups += 1
+            self._current = self._versions[self._lookups % 2]
+            return SimpleNamespace(fingerprint=str(self._lookups % 2))
+
+    def get_table_infos(self):
+        return self._current
+
+
+def test_concurrent_selects_during_rebuilds_see_one_schema(pruner):
+    table_infos = pruner._schema_cache.get_table_infos()
+    versions = [
+        {"user_deposits": table_infos["user_deposits"]},
+        {"user_activity": table_infos["user_activity"]},
+    ]
+    shared = SchemaPruner(AlternatingSchemaCache(versions))
+    errors = []
+
+    def ask():
+        for _ in range(200):
+            try:
+                shared.table_info_for("deposits and revenue per loyalty tier")
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=ask) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
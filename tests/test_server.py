@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Ensure the src directory is in the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from server import QuestionServer
+
+
+class FakeGraph:
+    """Async graph stand-in: answers after `delay` seconds and keeps the last state per thread."""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.inputs = []
+        self.states = {}
+
+    async def ainvoke(self, graph_input, config=None):
+        self.inputs.append(graph_input)
+        await asyncio.sleep(self.delay)
+        state = {**graph_input, "query": "SELECT 1", "answer": f"Answer {len(self.inputs)}."}
+        self.states[config["configurable"]["thread_id"]] = state
+        return state
+
+    async def astream(self, graph_input, config=None, stream_mode=None):
+        yield "updates", {"write_query": {"query": "SELECT 1"}}
+        node = {"langgraph_node": "generate_answer"}
+        for token in ("Forty", " two."):
+            yield "messages", (SimpleNamespace(content=token), node)
+        yield "values", {**graph_input, "query": "SELECT 1", "answer": "Forty two."}
+
+    async def aget_state(self, config):
+        return SimpleNamespace(values=self.states.get(config["configurable"]["thread_id"], {}))
+
+
+def make_input(question, chat_history):
+    return {"question": question, "chat_history": chat_history}
+
+
+async def request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    status = int(head.split()[1])
+    if b"text/event-stream" in head:
+        return status, body.decode()
+    return status, json.loads(body)
+
+
+def serve(graph, scenario, **kwargs):
+    """Runs `scenario(port, app)` against a QuestionServer on a free port."""
+    async def main():
+        app = QuestionServer(graph, make_input, **kwargs)
+        server = await asyncio.start_server(app.handle_connection, "127.0.0.1", 0)
+        async with server:
+            return await scenario(server.sockets[0].getsockname()[1], app)
+
+    return asyncio.run(main())
+
+
+def test_ask_keeps_the_conversation_history():
+    graph = FakeGraph()
+
+    async def scenario(port, app):
+        first = await request(port, "POST", "/ask", {"question": "How many users?"})
+        conversation_id = first[1]["conversation_id"]
+        second = await request(port, "POST", "/ask", {"question": "And yesterday?", "conversation_id": conversation_id})
+        conversation = await request(port, "GET", f"/conversations/{conversation_id}")
+        missing = await request(port, "GET", "/conversations/nope")
+        invalid = await request(port, "POST", "/ask", {"conversation_id": conversation_id})
+        return first, second, conversation, missing, invalid
+
+    first, second, conversation, missing, invalid = serve(graph, scenario)
+
+    assert first[0] == 200 and first[1]["answer"] == "Answer 1." and first[1]["sql"] == "SELECT 1"
+    assert second[0] == 200
+    assert [m.content for m in graph.inputs[1]["chat_history"]] == [
+        "How many users?", "SQL Query: SELECT 1 \nAnswer: Answer 1."
+    ]
+    assert [turn["question"] for turn in conversation[1]["turns"]] == ["How many users?", "And yesterday?"]
+    assert missing[0] == 404
+    assert invalid[0] == 400
+
+
+def test_conversation_continues_from_its_checkpoint():
+    graph = FakeGraph()
+    graph.states["old"] = {"question": "Total revenue?", "answer": "It was 10.", "query": "SELECT 10"}
+
+    async def scenario(port, app):
+        return await request(port, "GET", "/conversations/old")
+
+    status, conversation = serve(graph, scenario)
+
+    assert status == 200
+    assert conversation["turns"] == [{"question": "Total revenue?", "answer": "It was 10.", "sql": "SELECT 10"}]
+
+
+def test_stream_sends_sql_tokens_and_answer():
+    async def scenario(port, app):
+        return await request(port, "POST", "/stream", {"question": "How many users?", "conversation_id": "c1"})
+
+    status, body = serve(FakeGraph(), scenario)
+
+    events = [block.split("\n") for block in body.strip().split("\n\n")]
+    assert status == 200
+    assert [lines[0] for lines in events] == ["event: sql", "event: token", "event: token", "event: answer"]
+    assert json.loads(events[-1][1][len("data: "):])["answer"] == "Forty two."
+
+
+def test_full_queue_gets_503_and_slow_requests_get_504():
+    async def scenario(port, app):
+        asks = [request(port, "POST", "/ask", {"question": f"Q{i}"}) for i in range(4)]
+        return await asyncio.gather(*asks), app.health()
+
+    responses, health = serve(FakeGraph(delay=0.4), scenario, workers=1, max_queue=1, timeout=0.6)
+
+    # One runs, one waits for it and runs out of time, the other two are turned away.
+    assert sorted(status for status, _ in responses) == [200, 503, 503, 504]
+    assert health == {"status": "ok", "running": 0, "queued": 0, "workers": 1, "max_queue": 1}
+
+
+def test_requests_waiting_on_a_busy_conversation_count_as_queued():
+    async def scenario(port, app):
+        asks = [request(port, "POST", "/ask", {"question": f"Q{i}", "conversation_id": "c1"}) for i in range(3)]
+        other = request(port, "POST", "/ask", {"question": "Other?", "conversation_id": "c2"})
+        return await asyncio.gather(*asks, other)
+
+    *same, other = serve(FakeGraph(delay=0.2), scenario, workers=4, max_queue=1)
+
+    # One runs, one waits for it, the third is turned away; another conversation still gets a worker.
+    assert sorted(status for status, _ in same) == [200, 200, 503]
+    assert other[0] == 200
+
+
+def test_cancel_stops_the_running_question():
+    cancelled = []
+
+    async def scenario(port, app):
+        ask = asyncio.create_task(request(port, "POST", "/ask", {"question": "Slow?", "conversation_id": "c1"}))
+        await asyncio.sleep(0.1)
+        cancel = await request(port, "POST", "/conversations/c1/cancel")
+        unknown = await request(port, "POST", "/conversations/nope/cancel")
+        return cancel, unknown, await ask
+
+    cancel, unknown, ask = serve(FakeGraph(delay=0.3), scenario, cancel=cancelled.append)
+
+    assert cancel == (200, {"conversation_id": "c1", "cancelled": True})
+    assert cancelled == ["c1"]
+    assert unknown[0] == 404
+    assert ask[0] == 200
+
+
+@pytest.mark.parametrize("method, path, status", [
+    ("GET", "/ask", 405), ("GET", "/nothing", 404), ("GET", "/conversations/c1/cancel", 405),
+])
+def test_unknown_routes(method, path, status):
+    async def scenario(port, app):
+        return await request(port, method, path)
+
+    assert serve(FakeGraph(), scenario)[0] == status
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Ensure the src directory is in the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.speculative import afirst_success, first_success, unique_candidates
+
+
+def fake_runner(delays, failing=(), guards=None):
+    """Runs a candidate by sleeping `delays[query]` seconds; queries in `failing` raise."""
+    def run(query, guard):
+        if guards is not None:
+            guards[query] = guard
+        deadline = time.monotonic() + delays[query]
+        while time.monotonic() < deadline:
+            if guard.reason == "cancelled":
+                raise RuntimeError(f"{query} cancelled")
+            time.sleep(0.005)
+        if query in failing:
+            raise ValueError(f"{query} failed")
+        return f"rows of {query}"
+
+    return run
+
+
+def test_unique_candidates_drops_blank_and_reformatted_repeats():
+    queries = ["SELECT 1", "select  1;", "", "  ", "SELECT 2", "SELECT 1 -- again"]
+    assert unique_candidates(queries) == ["SELECT 1", "SELECT 2"]
+
+
+def test_first_successful_candidate_wins_and_the_rest_are_cancelled():
+    guards = {}
+    delays = {"a": 0.01, "b": 0.05, "c": 1.0}
+
+    winner, failures = first_success(["a", "b", "c"], fake_runner(delays, failing={"a"}, guards=guards))
+
+    assert (winner.index, winner.query, winner.result) == (1, "b", "rows of b")
+    assert [(f.query, str(f.error)) for f in failures] == [("a", "a failed")]
+    assert guards["c"].reason == "cancelled"
+
+
+def test_all_candidates_failing_returns_every_error_in_order():
+    delays = {"a": 0.05, "b": 0.01}
+
+    winner, failures = first_success(["a", "b"], fake_runner(delays, failing={"a", "b"}))
+
+    assert winner is None
+    assert [f.index for f in failures] == [0, 1]
+
+
+def test_async_first_success_matches_sync():
+    guards = {}
+    delays = {"a": 0.2, "b": 0.01, "c": 0.02}
+
+    winner, failures = asyncio.run(afirst_success(["a", "b", "c"], fake_runner(delays, guards=guards)))
+
+    assert winner.query == "b" and failures == []
+    assert guards["a"].reason == "cancelled"
+
+
+def test_async_cancellation_cancels_running_candidates():
+    guards = {}
+    started = threading.Event()
+
+    def run(query, guard):
+        guards[query] = guard
+        started.set()
+        return fake_runner({query: 1.0})(query, guard)
+
+    async def cancel_midway():
+        task = asyncio.create_task(afirst_success(["slow"], run))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    assert asyncio.run(cancel_midway())
+    assert guards["slow"].reason == "cancelled"
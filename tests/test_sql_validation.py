@@ -0,0 +1,146 @@
+import os
+import sys
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+from langchain_community.utilities import SQLDatabase
+
+# Ensure the src directory is in the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from core.cache import SchemaCache
+from core.sql_validation import SQLValidationError, SQLValidator, estimate_plan
+from scripts.setup_database import create_tables, generate_dummy_data
+
+# Queries in the shapes the LLM writes; all must pass validation and run.
+VALID = [
+    "SELECT SUM(total_revenue) FROM user_activity",
+    "select loyalty_category, sum(total_revenue) as revenue from user_activity "
+    "group by loyalty_category order by revenue desc;",
+    "SELECT strftime('%Y-%m', date) AS month, SUM(total_deposit) total FROM user_deposits "
+    "WHERE date >= DATE('now', '-30 days') GROUP BY month ORDER BY total DESC",
+    "SELECT ua.loyalty_category, SUM(d.total_deposit) FROM user_activity AS ua "
+    "JOIN user_deposits d ON d.userid = ua.userid AND d.date = ua.date GROUP BY 1",
+    "SELECT CASE WHEN total_revenue > 100 THEN 'high' ELSE 'low' END bucket, COUNT(*) "
+    "FROM user_activity GROUP BY bucket",
+    "SELECT userid FROM user_activity WHERE userid IN "
+    "(SELECT userid FROM user_deposits WHERE total_deposit > 10) LIMIT 5",
+    "WITH per_user AS (SELECT userid, SUM(games_count) AS games FROM user_game_summary GROUP BY userid) "
+    "SELECT p.userid, games FROM per_user p ORDER BY games DESC LIMIT 3",
+    "SELECT total FROM (SELECT SUM(total_revenue) total FROM user_activity)",
+    "SELECT AVG(wager) OVER (PARTITION BY userid ORDER BY date) FROM user_game_summary",
+    "SELECT CAST(total_revenue AS INTEGER), REPLACE(loyalty_category, 'Gold', 'gold') FROM user_activity",
+    "SELECT COUNT(DISTINCT userid) FROM user_game_summary WHERE games_count > 0 AND rowid > 0",
+    "SELECT SUM(total_revenue) FROM user_activity WHERE date = (SELECT MAX(date) FROM user_activity)",
+]
+
+REJECTED = [
+    ("DELETE FROM user_activity", "unsafe_sql", "DELETE"),
+    ("WITH x AS (SELECT 1) UPDATE user_activity SET total_bonus = 0", "unsafe_sql", "UPDATE"),
+    ("SELECT 1; DROP TABLE user_activity", "invalid_sql", "one SQL statement"),
+    ("PRAGMA table_info(user_activity)", "unsafe_sql", "PRAGMA"),
+    ("SELEC * FROM user_activity", "invalid_sql", "SELEC"),
+    ("SELECT COUNT(* FROM user_activity", "invalid_sql", "parentheses"),
+    ("SELECT * FROM users", "unknown_table", "no such table: users"),
+    ("SELECT SUM(total_revenue) FROM user_activty", "unknown_table", "Did you mean 'user_activity'?"),
+    ("SELECT SUM(revenue) FROM user_activity", "unknown_column", "Did you mean 'total_revenue'?"),
+    ("SELECT ua.deposit FROM user_activity ua", "unknown_column", "no such column: ua.deposit"),
+    ("SELECT x.userid FROM user_activity ua", "unknown_column", "'x' is not a table or alias"),
+    ("SELECT SUM(total_deposit) FROM user_activity", "unknown_column", "total_deposit"),
+    ("SELECT * FROM user_activity WHERE", "invalid_sql", "could not compile the query: incomplete input"),
+    ("SELECT userid FROM user_activity GROUP BY", "invalid_sql", "could not compile"),
+    ("SELECT SUM(a.total_revenue) FROM user_activity a, user_deposits d", "cross_join", "user_deposits (d)"),
+    ("SELECT COUNT(*) FROM user_activity CROSS JOIN user_game_summary", "cross_join", "cross join"),
+]
+
+
+@pytest.fixture(scope="module")
+def validation_db(tmp_path_factory):
+    """Synthetic data for 40 users over 30 days."""
+    db_path = str(tmp_path_factory.mktemp("validation") / "validation.db")
+    conn = sqlite3.connect(db_path)
+    create_tables(conn)
+    generate_dummy_data(conn, num_users=40, num_days=30, seed=3)
+    conn.close()
+    return db_path
+
+
+@pytest.fixture(scope="module")
+def table_columns(validation_db):
+    schema_cache = SchemaCache(
+        None, validation_db, db_factory=lambda: SQLDatabase.from_uri(f"sqlite:///{validation_db}")
+    )
+    return schema_cache.get_table_columns()
+
+
+def make_validator(db_path, table_columns, **kwargs):
+    @contextmanager
+    def connect():
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    kwargs.setdefault("max_cross_join_rows", 10_000)
+    return SQLValidator(lambda: table_columns, connect, **kwargs)
+
+
+def test_schema_cache_lists_table_columns(table_columns):
+    assert set(table_columns) == {"user_activity", "user_game_summary", "user_deposits"}
+    assert table_columns["user_deposits"] == ["userid", "date", "total_deposit", "deposit_count"]
+
+
+@pytest.mark.parametrize("sql", VALID)
+def test_valid_queries_pass_and_run(validation_db, table_columns, sql):
+    estimate = make_validator(validation_db, table_columns).validate(sql)
+
+    assert estimate.estimated_rows > 0
+    assert estimate.plan
+    sqlite3.connect(validation_db).execute(sql).fetchall()
+
+
+@pytest.mark.parametrize("sql, kind, fragment", REJECTED)
+def test_invalid_queries_are_rejected_with_a_precise_error(validation_db, table_columns, sql, kind, fragment):
+    with pytest.raises(SQLValidationError) as excinfo:
+        make_validator(validation_db, table_columns).validate(sql)
+
+    assert excinfo.value.kind == kind
+    assert fragment in str(excinfo.value)
+
+
+def test_small_cross_joins_and_row_limit(validation_db, table_columns):
+    sql = "SELECT COUNT(*) FROM user_activity, user_deposits"
+    rows = sqlite3.connect(validation_db).execute(
+        "SELECT (SELECT COUNT(*) FROM user_activity) * (SELECT COUNT(*) FROM user_deposits)"
+    ).fetchone()[0]
+
+    estimate = make_validator(validation_db, table_columns, max_cross_join_rows=rows).validate(sql)
+    assert estimate.cross_joins[0][2] == rows
+
+    with pytest.raises(SQLValidationError) as excinfo:
+        make_validator(validation_db, table_columns, max_estimated_rows=100).validate("SELECT * FROM user_activity")
+    assert excinfo.value.kind == "too_expensive"
+
+
+def test_plan_estimate_nests_loops_and_correlated_subqueries():
+    plan_rows = [
+        (2, 0, 0, "SCAN u USING COVERING INDEX sqlite_autoindex_user_activity_1"),
+        (5, 0, 0, "CORRELATED SCALAR SUBQUERY 1"),
+        (10, 5, 0, "SEARCH d USING COVERING INDEX sqlite_autoindex_user_deposits_1 (userid=?)"),
+        (12, 0, 0, "MATERIALIZE s"),
+        (13, 12, 0, "SCAN user_game_summary"),
+        (20, 0, 0, "SCAN s"),
+    ]
+    table_rows = {"user_activity": 1000, "user_deposits": 500, "user_game_summary": 30}.__getitem__
+
+    estimate = estimate_plan(plan_rows, table_rows, {"u": "user_activity", "d": "user_deposits"})
+
+    # 1000 outer rows, 10 lookups per row in the subquery, 30 rows materialized, 1000 x 30 nested scan.
+    assert estimate.estimated_rows == 1000 + 1000 * 10 + 30 + 1000 * 30
+    assert estimate.cross_joins == [(("user_activity (u)",), "s", 30_000)]
+    assert estimate.plan[2] == "  SEARCH d USING COVERING INDEX sqlite_autoindex_user_deposits_1 (userid=?)"
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+import sys
+
+# Ensure the src directory is in the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from core.fake_llm import FakeChatModel
+from core.results import QueryResult
+from core.tracing import TokenUsageCallback, Tracer, format_trace, traced
+
+CONFIG = {"configurable": {"thread_id": "conversation-1"}}
+
+
+def make_nodes(tracer, llm):
+    """Stand-ins for the graph nodes; write_query and generate_answer call the LLM."""
+
+    def write_query(state):
+        llm.invoke([SystemMessage(content="SQL generation engine"), HumanMessage(content=state["question"])])
+        return {"query": "SELECT 1"}
+
+    def execute_query(state, config=None):
+        assert config["configurable"]["thread_id"] == "conversation-1"
+        if state.get("fail"):
+            return {"error_kind": "sql_error", "retry_count": state.get("retry_count", 0) + 1}
+        return {"result": QueryResult.from_rows(["n"], [(1,), (2,)]), "retry_count": state.get("retry_count", 0)}
+
+    async def generate_answer(state):
+        await llm.ainvoke([HumanMessage(content="Result from SQL Query: 1")])
+        return {"answer": "done"}
+
+    return (
+        traced("write_query", write_query, tracer),
+        traced("execute_query", execute_query, tracer),
+        traced("generate_answer", generate_answer, tracer),
+    )
+
+
+def make_llm():
+    return FakeChatModel(callbacks=[TokenUsageCallback()])
+
+
+def test_spans_record_time_tokens_and_result_size(tmp_path):
+    export_path = str(tmp_path / "traces.jsonl")
+    tracer = Tracer(export_path)
+    write_query, execute_query, generate_answer = make_nodes(tracer, make_llm())
+
+    state = {"question": "How many users?", "retry_count": 0}
+    write_query(state, CONFIG)
+    execute_query(state, CONFIG)
+    asyncio.run(generate_answer(state, CONFIG))
+
+    trace = tracer.last_trace("conversation-1")
+    assert [span.node for span in trace.spans] == ["write_query", "execute_query", "generate_answer"]
+    write_span, execute_span, answer_span = trace.spans
+    assert write_span.llm_calls == 1 and write_span.prompt_tokens > 0 and write_span.completion_tokens > 0
+    assert answer_span.llm_calls == 1 and answer_span.prompt_tokens > 0
+    assert execute_span.llm_calls == 0 and execute_span.result_rows == 2 and execute_span.result_bytes > 0
+    assert trace.total_ms >= sum(span.duration_ms for span in trace.spans)
+    assert "execute_query" in format_trace(trace)
+
+    with open(export_path) as f:
+        exported = [json.loads(line) for line in f]
+    assert len(exported) == 1
+    assert exported[0]["trace_id"] == trace.trace_id
+    assert exported[0]["question"] == "How many users?"
+    assert len(exported[0]["spans"]) == 3
+
+
+def test_retries_stay_in_one_trace():
+    tracer = Tracer()
+    write_query, execute_query, generate_answer = make_nodes(tracer, make_llm())
+
+    state = {"question": "Broken question", "retry_count": 0, "fail": True}
+    write_query(state, CONFIG)
+    state.update(execute_query(state, CONFIG))
+    write_query(state, CONFIG)
+    state.update(execute_query(state, CONFIG))
+    asyncio.run(generate_answer(state, CONFIG))
+
+    trace = tracer.last_trace("conversation-1")
+    assert [span.node for span in trace.spans].count("write_query") == 2
+    assert trace.spans[1].error_kind == "sql_error"
+    assert trace.spans[3].retry_count == 2
+    assert trace.node_totals()["write_query"]["runs"] == 2
+    assert "2 retries" in format_trace(trace)
+
+    # The next question starts a new trace.
+    write_query({"question": "Next", "retry_count": 0}, CONFIG)
+    asyncio.run(generate_answer({"question": "Next"}, CONFIG))
+    assert tracer.last_trace("conversation-1").question == "Next"
+    assert len(tracer.last_trace("conversation-1").spans) == 2
+
+
+def test_streamed_answer_records_first_token():
+    tracer = Tracer()
+    llm = FakeChatModel(callbacks=[TokenUsageCallback()], latency=0.02, token_latency=0.01)
+
+    def generate_answer(state):
+        text = "".join(chunk.content for chunk in llm.stream([HumanMessage(content="Result from SQL Query: 1")]))
+        return {"answer": text}
+
+    traced("write_query", lambda state: {"query": "SELECT 1"}, tracer)({"question": "q"}, CONFIG)
+    traced("generate_answer", generate_answer, tracer)({"question": "q"}, CONFIG)
+
+    answer_span = tracer.last_trace("conversation-1").spans[-1]
+    assert answer_span.llm_calls == 1 and answer_span.completion_tokens > 0
+    assert answer_span.start_ms + 15 <= answer_span.first_token_ms
+    assert answer_span.first_token_ms + 5 <= answer_span.start_ms + answer_span.duration_ms
+    assert "first token at" in format_trace(tracer.last_trace("conversation-1"))